@@ -18,7 +18,9 @@ def main():
         except FileExistsError:
             continue
 
-    ms = Minesweeper(30, 16, 99, rnd_seed=42, save_path=os.path.join("tests", "resources", f"session_{num}"))
+    ms = Minesweeper(
+        30, 16, 99, rnd_seed=42, save_path=os.path.join("tests", "resources", f"session_{num}"), legacy_seeding=True
+    )
     ms.run()
 
 
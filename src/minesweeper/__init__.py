@@ -1,3 +1,6 @@
+from .batch import MinesweeperBatch
+from .chunked import MinesweeperChunked
+from .infinite import MinesweeperInfinite
 from .minesweeper_ import Minesweeper, MinesweeperHeadless
 from .utils import Action, CellState, GameState, Interaction
 
@@ -5,6 +8,9 @@ from .utils import Action, CellState, GameState, Interaction
 
 __all__ = (
     "MinesweeperHeadless",
+    "MinesweeperBatch",
+    "MinesweeperChunked",
+    "MinesweeperInfinite",
     "Minesweeper",
     "Action",
     "Interaction",
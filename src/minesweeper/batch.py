@@ -0,0 +1,249 @@
+from itertools import product
+from typing import Tuple, Union
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from .minefield import count_neighbour_mines
+from .utils import CELL_DTYPE, Action, CellState, GameState
+
+_CELL_0 = CellState.CELL_0.num()
+_UNOPENED = CellState.UNOPENED.num()
+_MINE = CellState.MINE.num()
+_FLAG = CellState.FLAG.num()
+
+_NO_ACTION = -1
+
+
+def _dilate(mask: NDArray) -> NDArray:
+    """Grows a stack of boolean masks by one cell in every direction, including diagonals"""
+    height, width = mask.shape[-2:]
+    padded = np.zeros((*mask.shape[:-2], height + 2, width + 2), dtype=np.bool)
+    padded[..., 1:-1, 1:-1] = mask
+    grown = np.zeros(mask.shape, dtype=np.bool)
+    for dy, dx in product((0, 1, 2), repeat=2):
+        grown |= padded[..., dy : dy + height, dx : dx + width]
+    return grown
+
+
+def label_empty_areas(empty: NDArray) -> NDArray:
+    """
+    Labels the 8-connected areas of empty cells in a stack of boards.
+
+    Every empty cell gets the smallest flat index of its area as the label, other cells get height * width. The
+    labels are propagated to the neighbours and then compressed by pointer jumping, which converges in a few passes
+    for typical boards.
+
+    Args:
+        empty: Boolean mask of the empty cells, of shape (n, height, width).
+
+    Returns:
+        An int32 array of labels with the same shape.
+    """
+    n, height, width = empty.shape
+    n_cells = height * width
+
+    labels = np.where(empty, np.arange(n_cells, dtype=np.int32).reshape(height, width), n_cells).astype(np.int32)
+    padded = np.full((n, height + 2, width + 2), n_cells, dtype=np.int32)
+    extended = np.full((n, n_cells + 1), n_cells, dtype=np.int32)
+    offsets = (np.arange(n, dtype=np.int32) * (n_cells + 1))[:, None]
+    while True:
+        # Smallest label in the 3x3 neighbourhood, as a minimum over the columns and then over the rows
+        padded[:, 1:-1, 1:-1] = labels
+        columns = np.minimum(np.minimum(padded[:, :, :-2], padded[:, :, 1:-1]), padded[:, :, 2:])
+        smallest = np.minimum(np.minimum(columns[:, :-2], columns[:, 1:-1]), columns[:, 2:])
+        smallest[~empty] = n_cells
+
+        # A label is the index of a cell of the same area, so it can be replaced with the label of that cell
+        extended[:, :-1] = smallest.reshape(n, n_cells)
+        smallest = extended.ravel()[smallest.reshape(n, n_cells) + offsets].reshape(n, height, width)
+
+        if np.array_equal(smallest, labels):
+            return labels
+        labels = smallest
+
+
+class MinesweeperBatch:
+    """Runs a batch of headless minesweeper games of the same shape as stacked arrays"""
+
+    def __init__(
+        self, n_games: int, width: int, height: int, n_mines: int, rnd_seed: Union[int, None] = None, auto_reset=True
+    ):
+        """
+        Args:
+            n_games: The amount of games in the batch.
+            width: The width of the minefields.
+            height: The height of the minefields.
+            n_mines: The amount of mines in each minefield.
+            rnd_seed: Seed for the random number generator shared by the games.
+            auto_reset: If True, a game that was won or lost is reset on the next step and its action is ignored.
+        """
+        self._n_games = n_games
+        self._width = width
+        self._height = height
+        self._n_mines = min(n_mines, width * height - 1)
+        self._auto_reset = auto_reset
+
+        self._rng = np.random.default_rng(rnd_seed)
+
+        shape = (n_games, height, width)
+        self._values = np.zeros(shape, dtype=CELL_DTYPE)
+        self._labels = np.zeros(shape, dtype=np.int32)
+        self._unopened = np.ones(shape, dtype=np.bool)
+        self._flagged = np.zeros(shape, dtype=np.bool)
+        self._obs = np.full(shape, _UNOPENED, dtype=CELL_DTYPE)
+
+        self._gamestates = np.full(n_games, GameState.NOT_STARTED.value, dtype=np.int8)
+        self._n_unopened = np.full(n_games, width * height, dtype=np.int64)
+        self._mines_left = np.full(n_games, self._n_mines, dtype=np.int64)
+
+        self._obs_view = self._obs.view()
+        self._obs_view.flags.writeable = False
+
+    @property
+    def n_games(self) -> int:
+        return self._n_games
+
+    @property
+    def gamestates(self) -> NDArray:
+        """The GameState values of the games"""
+        return self._gamestates.copy()
+
+    @property
+    def mines_left(self) -> NDArray:
+        """The amount of mines minus the amount of flags of each game"""
+        return self._mines_left.copy()
+
+    def observe(self) -> NDArray:
+        """Returns a read-only view of the visible boards as CellState codes, of shape (n_games, height, width)"""
+        return self._obs_view
+
+    def reset(self, games: Union[ArrayLike, None] = None):
+        """Starts new games, either for all of the games or the given game indices"""
+        games = np.arange(self._n_games) if games is None else np.asarray(games, dtype=np.intp)
+        self._unopened[games] = True
+        self._flagged[games] = False
+        self._obs[games] = _UNOPENED
+        self._gamestates[games] = GameState.NOT_STARTED.value
+        self._n_unopened[games] = self._width * self._height
+        self._mines_left[games] = self._n_mines
+
+    def step(self, xs: ArrayLike, ys: ArrayLike, actions: ArrayLike) -> Tuple[NDArray, NDArray, NDArray]:
+        """
+        Makes one action in every game.
+
+        Args:
+            xs: The x coordinates of the actions, one per game.
+            ys: The y coordinates of the actions, one per game.
+            actions: The Action values of the actions, one per game.
+
+        Returns:
+            The visible boards as a read-only view, the GameState values of the games and the rewards, which are 1
+            for a won game, -1 for a lost game and 0 otherwise.
+        """
+        xs = np.broadcast_to(np.asarray(xs, dtype=np.intp), (self._n_games,))
+        ys = np.broadcast_to(np.asarray(ys, dtype=np.intp), (self._n_games,))
+        actions = np.broadcast_to(np.asarray(actions, dtype=np.int8), (self._n_games,)).copy()
+
+        rewards = np.zeros(self._n_games, dtype=np.float32)
+
+        if self._auto_reset:
+            done = np.flatnonzero(self._gamestates >= GameState.LOST.value)
+            if len(done):
+                self.reset(done)
+                actions[done] = _NO_ACTION
+
+        on_cell = (actions == Action.OPEN.value) | (actions == Action.FLAG.value)
+        if (on_cell & ((xs < 0) | (ys < 0) | (xs >= self._width) | (ys >= self._height))).any():
+            raise ValueError("Out of bounds actions.")
+
+        self.reset(np.flatnonzero(actions == Action.NEW_GAME.value))
+
+        playing = self._gamestates == GameState.PLAYING.value
+        self._toggle_flags(np.flatnonzero((actions == Action.FLAG.value) & playing), xs, ys)
+
+        opening = (actions == Action.OPEN.value) & (playing | (self._gamestates == GameState.NOT_STARTED.value))
+        self._open_cells(np.flatnonzero(opening), xs, ys, rewards)
+
+        return self._obs_view, self._gamestates.copy(), rewards
+
+    def _toggle_flags(self, games: NDArray, xs: NDArray, ys: NDArray):
+        """Toggles the flag state of the unopened cells"""
+        xs = xs[games]
+        ys = ys[games]
+        unopened = self._unopened[games, ys, xs]
+        games, xs, ys = games[unopened], xs[unopened], ys[unopened]
+
+        flagged = ~self._flagged[games, ys, xs]
+        self._flagged[games, ys, xs] = flagged
+        self._obs[games, ys, xs] = np.where(flagged, _FLAG, _UNOPENED)
+        self._mines_left[games] -= np.where(flagged, 1, -1)
+
+    def _open_cells(self, games: NDArray, xs: NDArray, ys: NDArray, rewards: NDArray):
+        """Opens the cells, generating the minefields of the games that have not started yet"""
+        xs = xs[games]
+        ys = ys[games]
+
+        first = self._gamestates[games] == GameState.NOT_STARTED.value
+        if first.any():
+            self._new_minefields(games[first], xs[first], ys[first])
+            self._gamestates[games[first]] = GameState.PLAYING.value
+
+        closed = self._unopened[games, ys, xs] & ~self._flagged[games, ys, xs]
+        games, xs, ys = games[closed], xs[closed], ys[closed]
+
+        values = self._values[games, ys, xs]
+        self._unopened[games, ys, xs] = False
+        self._obs[games, ys, xs] = values
+        self._n_unopened[games] -= 1
+
+        lost = values == _MINE
+        self._gamestates[games[lost]] = GameState.LOST.value
+        rewards[games[lost]] = -1
+
+        empty = values == _CELL_0
+        if empty.any():
+            self._flood_fill(games[empty], xs[empty], ys[empty])
+
+        alive = games[~lost]
+        won = alive[self._n_unopened[alive] == self._n_mines]
+        if len(won):
+            self._gamestates[won] = GameState.WON.value
+            self._flagged[won] = self._unopened[won]
+            # Flags on cells a flood fill opened are dropped as well
+            self._obs[won] = np.where(self._unopened[won], _FLAG, self._values[won])
+            self._mines_left[won] = 0
+            rewards[won] = 1
+
+    def _flood_fill(self, games: NDArray, xs: NDArray, ys: NDArray):
+        """Opens the empty areas containing the given empty cells, including their borders"""
+        labels = self._labels[games]
+        area = labels == labels[np.arange(len(games)), ys, xs][:, None, None]
+        opened = _dilate(area) & self._unopened[games]
+
+        self._unopened[games] &= ~opened
+        # Like in MinesweeperBase, the flood fill also opens flagged cells but keeps their flags visible
+        self._obs[games] = np.where(opened & ~self._flagged[games], self._values[games], self._obs[games])
+        self._n_unopened[games] -= np.count_nonzero(opened, axis=(1, 2))
+
+    def _new_minefields(self, games: NDArray, xs: NDArray, ys: NDArray):
+        """Generates new minefields that don't have mines in a 3x3 area around the first clicks"""
+        n_cells = self._width * self._height
+        rows = np.arange(len(games))
+
+        # Every cell gets a random key and the cells with the smallest keys get the mines. The neighbours of the
+        # start only get mines when the other cells are full and the start never gets one.
+        near = np.zeros((len(games), self._height, self._width), dtype=np.bool)
+        for dy, dx in product((-1, 0, 1), repeat=2):
+            near[rows, np.clip(ys + dy, 0, self._height - 1), np.clip(xs + dx, 0, self._width - 1)] = True
+        keys = self._rng.random((len(games), self._height, self._width)) + near
+        keys[rows, ys, xs] = 3
+
+        keys = keys.reshape(len(games), n_cells)
+        mines = np.zeros((len(games), n_cells), dtype=np.bool)
+        if self._n_mines:
+            chosen = np.argpartition(keys, self._n_mines - 1, axis=1)[:, : self._n_mines]
+            np.put_along_axis(mines, chosen, True, axis=1)
+        mines = mines.reshape(len(games), self._height, self._width)
+
+        counts = count_neighbour_mines(mines)
+        self._values[games] = np.where(mines, _MINE, counts)
+        self._labels[games] = label_empty_areas(~mines & (counts == 0))
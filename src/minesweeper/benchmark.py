@@ -0,0 +1,226 @@
+import importlib.util
+import json
+import os
+import sys
+import time
+from typing import Annotated, Callable, Dict, Iterator, List, Tuple, Union
+import numpy as np
+from numpy.typing import NDArray
+import typer
+from .minefield import MineField
+from .minesweeper_ import MinesweeperHeadless
+from .recording import load_legacy_actions
+from .solver import play_games
+from .utils import Action, GameState, Interaction
+
+BOARD_SIZES: Dict[str, Tuple[int, int, int]] = {
+    "beginner": (9, 9, 10),
+    "intermediate": (16, 16, 40),
+    "expert": (30, 16, 99),
+    "huge": (1000, 1000, 150_000),
+}
+
+_SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "tests", "resources")
+
+# Boards larger than this are timed only once and not rendered, as a window for them would need gigabytes of memory
+_LARGE_BOARD_CELLS = 100 * 100
+
+type Result = Dict[str, Union[str, int, float]]
+
+app = typer.Typer()
+
+
+def _measure(func: Callable[[], int], repeat: int) -> Tuple[float, float, int]:
+    """Runs the function repeatedly and returns the best and mean durations and the amount of operations per run"""
+    durations = []
+    n_ops = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n_ops = func()
+        durations.append(time.perf_counter() - start)
+    return min(durations), sum(durations) / len(durations), n_ops
+
+
+def _result(name: str, size: str, spec: Tuple[int, int, int], repeat: int, func: Callable[[], int]) -> Result:
+    best, mean, n_ops = _measure(func, repeat)
+    width, height, n_mines = spec
+    return {
+        "benchmark": name,
+        "size": size,
+        "width": width,
+        "height": height,
+        "n_mines": n_mines,
+        "repeat": repeat,
+        "n_ops": n_ops,
+        "best_s": best,
+        "mean_s": mean,
+        "ops_per_s": n_ops / best if best > 0 else float("inf"),
+    }
+
+
+def bench_minefield(width: int, height: int, n_mines: int) -> Callable[[], int]:
+    """Construction of a single minefield"""
+    rng = np.random.default_rng(0)
+
+    def run() -> int:
+        MineField(width, height, n_mines, width // 2, height // 2, rng=rng)
+        return 1
+
+    return run
+
+
+def bench_interactions(width: int, height: int, n_mines: int, n_actions: int = 2000) -> Callable[[], int]:
+    """Random opens and flags through make_interaction, starting a new game whenever one ends"""
+    rng = np.random.default_rng(0)
+    xs = rng.integers(0, width, n_actions).tolist()
+    ys = rng.integers(0, height, n_actions).tolist()
+    flags = (rng.random(n_actions) < 0.1).tolist()
+
+    def run() -> int:
+        ms = MinesweeperHeadless(width, height, n_mines, rnd_seed=0)
+        for x, y, flag in zip(xs, ys, flags):
+            if ms.gamestate in {GameState.WON, GameState.LOST}:
+                ms.make_interaction(Interaction(-1, -1, Action.NEW_GAME))
+            ms.make_interaction(Interaction(x, y, Action.FLAG if flag else Action.OPEN))
+        return n_actions
+
+    return run
+
+
+def bench_flood_fill(width: int, height: int, n_mines: int) -> Callable[[], int]:
+    """Worst case flood fill, which opens the whole board of a game without mines from the centre"""
+
+    def run() -> int:
+        ms = MinesweeperHeadless(width, height, 0, rnd_seed=0)
+        ms.make_interaction(Interaction(width // 2, height // 2, Action.OPEN))
+        return width * height
+
+    return run
+
+
+def bench_solver(width: int, height: int, n_mines: int, n_games: int = 20) -> Callable[[], int]:
+    """Games played to the end by the solver"""
+
+    def run() -> int:
+        play_games(n_games, width, height, n_mines, rnd_seed=0)
+        return n_games
+
+    return run
+
+
+def bench_draw_frame(
+    width: int, height: int, n_mines: int, n_frames: int = 50, full_redraw: bool = False
+) -> Callable[[], int]:
+    """Drawing frames of a game in progress with SDL's dummy video driver, optionally redrawing the whole screen"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from .minesweeper_ui import MinesweeperUI
+
+    ms = MinesweeperHeadless(width, height, n_mines, rnd_seed=0)
+    ms.make_interaction(Interaction(width // 2, height // 2, Action.OPEN))
+    grid = ms.observe().copy()
+    ui = MinesweeperUI(width, height)
+
+    def run() -> int:
+        for i in range(n_frames):
+            if full_redraw:
+                ui.invalidate()
+            ui.draw_frame(grid, ms.gamestate, ms.mines_left - i % 2)
+        return n_frames
+
+    return run
+
+
+def bench_render(width: int, height: int, n_mines: int, n_frames: int = 64) -> Callable[[], int]:
+    """Rendering a batch of boards of a game in progress into RGB arrays, without SDL"""
+    from .render import BoardRenderer
+
+    ms = MinesweeperHeadless(width, height, n_mines, rnd_seed=0)
+    ms.make_interaction(Interaction(width // 2, height // 2, Action.OPEN))
+    boards = np.broadcast_to(ms.observe(), (n_frames, height, width))
+    renderer = BoardRenderer()
+    out = renderer.render(boards)
+
+    def run() -> int:
+        renderer.render(boards, out)
+        return n_frames
+
+    return run
+
+
+def bench_replay(acts: NDArray) -> Callable[[], int]:
+    """Full replay of a recorded session, one action at a time"""
+    interactions = [Interaction(int(act["x"]), int(act["y"]), Action(int(act["action"]))) for act in acts]
+
+    def run() -> int:
+        ms = MinesweeperHeadless(30, 16, 99, rnd_seed=42, legacy_seeding=True)
+        for act in interactions:
+            ms.make_interaction(act)
+        return len(interactions)
+
+    return run
+
+
+def bench_replay_bulk(acts: NDArray) -> Callable[[], int]:
+    """Full replay of a recorded session with a single call of make_interactions"""
+
+    def run() -> int:
+        ms = MinesweeperHeadless(30, 16, 99, rnd_seed=42, legacy_seeding=True)
+        return len(ms.make_interactions(acts, stop_on_loss=False))
+
+    return run
+
+
+def run_benchmarks(
+    sizes: Union[List[str], None] = None, repeat: int = 5, sessions_dir: str = _SESSIONS_DIR
+) -> Iterator[Result]:
+    """
+    Runs the benchmarks and yields one result per benchmark and board size.
+
+    Args:
+        sizes: Names of the board sizes in BOARD_SIZES to run, all of them by default.
+        repeat: How many times each benchmark is repeated. The huge board is only run once.
+        sessions_dir: Folder with the recorded sessions to replay. Skipped if it doesn't exist.
+    """
+    sizes = list(BOARD_SIZES) if sizes is None else sizes
+    for size in sizes:
+        spec = BOARD_SIZES[size]
+        n_repeat = 1 if spec[0] * spec[1] > _LARGE_BOARD_CELLS else repeat
+        yield _result("minefield", size, spec, n_repeat, bench_minefield(*spec))
+        yield _result("interactions", size, spec, n_repeat, bench_interactions(*spec))
+        yield _result("flood_fill", size, spec, n_repeat, bench_flood_fill(*spec))
+        if spec[0] * spec[1] <= _LARGE_BOARD_CELLS:
+            yield _result("solver", size, spec, repeat, bench_solver(*spec))
+            yield _result("render", size, spec, repeat, bench_render(*spec))
+
+    if importlib.util.find_spec("pygame") is not None:
+        for size in sizes:
+            spec = BOARD_SIZES[size]
+            if spec[0] * spec[1] <= _LARGE_BOARD_CELLS:
+                yield _result("draw_frame", size, spec, repeat, bench_draw_frame(*spec))
+                yield _result("draw_frame_full", size, spec, repeat, bench_draw_frame(*spec, full_redraw=True))
+
+    if os.path.isdir(sessions_dir):
+        for folder in sorted(os.listdir(sessions_dir)):
+            if folder.startswith("session"):
+                acts = load_legacy_actions(os.path.join(sessions_dir, folder, "acts.txt"))
+                yield _result("replay", folder, (30, 16, 99), repeat, bench_replay(acts))
+                yield _result("replay_bulk", folder, (30, 16, 99), repeat, bench_replay_bulk(acts))
+
+
+@app.command()
+def run(
+    sizes: Annotated[Union[List[str], None], typer.Option("--size", help="Board size to run, can be repeated.")] = None,
+    repeat: Annotated[int, typer.Option(help="Repetitions of each benchmark.", min=1)] = 5,
+    sessions_dir: Annotated[str, typer.Option(help="Folder of recorded sessions.")] = _SESSIONS_DIR,
+):
+    """Runs the benchmarks and prints the results as JSON lines"""
+    for size in sizes or []:
+        if size not in BOARD_SIZES:
+            raise typer.BadParameter(f"Unknown size {size}, choose from: {', '.join(BOARD_SIZES)}")
+
+    for result in run_benchmarks(sizes or None, repeat, sessions_dir):
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(app())
@@ -0,0 +1,583 @@
+from typing import Dict, List, Tuple, Union
+import numpy as np
+from numpy.typing import NDArray
+from .batch import label_empty_areas
+from .minefield import count_neighbour_mines
+from .utils import CELL_DTYPE, Action, CellState, GameState, Interaction
+
+_CELL_0 = CellState.CELL_0.num()
+_UNOPENED = CellState.UNOPENED.num()
+_MINE = CellState.MINE.num()
+_FLAG = CellState.FLAG.num()
+
+type ChunkKey = Tuple[int, int]
+# The labels of the empty areas of a chunk in ascending order, where the cells of every area start in the cells, and
+# the cells of the areas with their borders as flat indices into the chunk padded by a ring of cells
+type AreaIndex = Tuple[NDArray, NDArray, NDArray]
+
+
+def index_empty_areas(labels: NDArray) -> AreaIndex:
+    """
+    Lists the cells of every empty area of a chunk together with its border, so that a flood fill can open an area
+    without scanning the chunk.
+
+    Args:
+        labels: The labels of the empty areas of the chunk, see label_empty_areas.
+
+    Returns:
+        The labels, the start of the cells of every label and the cells. The cells of the area with labels[k] are
+        cells[starts[k]:starts[k + 1]], as flat indices into an array of shape (height + 2, width + 2).
+    """
+    height, width = labels.shape
+    n_cells = height * width
+    padded = np.full((height + 4, width + 4), n_cells, dtype=np.int32)
+    padded[2:-2, 2:-2] = labels
+
+    # The labels of the 3x3 neighbourhood of every cell of the padded chunk, each label once per cell
+    shifted = [
+        padded[1 + dy : height + 3 + dy, 1 + dx : width + 3 + dx].ravel() for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+    ]
+    area_labels = []
+    cells = []
+    for k, near in enumerate(shifted):
+        distinct = near < n_cells
+        for other in shifted[:k]:
+            distinct &= near != other
+        cells.append(np.flatnonzero(distinct))
+        area_labels.append(near[cells[-1]])
+
+    # Grouped by label
+    area_labels = np.concatenate(area_labels)
+    order = np.argsort(area_labels, kind="stable")
+    area_labels = area_labels[order]
+    cells = np.concatenate(cells)[order]
+    starts = np.flatnonzero(np.diff(area_labels, prepend=-1))
+    return area_labels[starts], np.append(starts, len(order)), cells.astype(np.int32)
+
+
+class ChunkedMineField:
+    """
+    The minefield of a large board, split into square chunks that are generated when they are first needed.
+
+    The amount of mines of every chunk is drawn up front from a multivariate hypergeometric distribution, which is the
+    same as placing all mines uniformly at once. The mines inside a chunk are placed with a generator seeded from the
+    chunk index, so the layout doesn't depend on the order in which the chunks are generated.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        n_mines: int,
+        x: int,
+        y: int,
+        seed: np.random.SeedSequence,
+        chunk_size: int = 256,
+    ):
+        """
+        Args:
+            width: The width of the minefield.
+            height: The height of the minefield.
+            n_mines: The amount of mines in the minefield.
+            x: The x coordinate of the first click, which has no mines in the 3x3 area around it.
+            y: The y coordinate of the first click.
+            seed: The seed of the layout.
+            chunk_size: The width and height of the chunks.
+        """
+        self.width = width
+        self.height = height
+        self.n_mines = n_mines
+        self.chunk_size = chunk_size
+        self._n_chunks_x = -(-width // chunk_size)
+        self._n_chunks_y = -(-height // chunk_size)
+        self._seed = seed
+        self._mines: Dict[ChunkKey, NDArray] = {}
+        self._values: Dict[ChunkKey, NDArray] = {}
+        self._labels: Dict[ChunkKey, NDArray] = {}
+        self._areas: Dict[ChunkKey, AreaIndex] = {}
+
+        # Keep a 3x3 clear around the start
+        self._excluded = [
+            (i, j) for j in range(max(y - 1, 0), min(y + 2, height)) for i in range(max(x - 1, 0), min(x + 2, width))
+        ]
+        far_mines = min(n_mines, width * height - len(self._excluded))
+        near_mines = min(n_mines - far_mines, len(self._excluded) - 1)
+
+        chunk_widths = np.minimum(chunk_size, width - chunk_size * np.arange(self._n_chunks_x))
+        chunk_heights = np.minimum(chunk_size, height - chunk_size * np.arange(self._n_chunks_y))
+        capacities = np.outer(chunk_heights, chunk_widths)
+        for i, j in self._excluded:
+            capacities[j // chunk_size, i // chunk_size] -= 1
+
+        rng = np.random.default_rng(seed)
+        self._chunk_mines = rng.multivariate_hypergeometric(capacities.ravel(), far_mines, method="marginals").reshape(
+            capacities.shape
+        )
+
+        # If too many mines to keep 3x3 empty, add the rest of the mines to the neighbours
+        nbrs = [cell for cell in self._excluded if cell != (x, y)]
+        self._near = [nbrs[i] for i in rng.choice(len(nbrs), near_mines, replace=False)] if near_mines else []
+
+    @classmethod
+    def from_mines(cls, mines: NDArray, chunk_size: int = 256) -> "ChunkedMineField":
+        """Creates a minefield with the given boolean mine layout of shape (height, width)"""
+        height, width = mines.shape
+        mf = cls.__new__(cls)
+        mf.width = width
+        mf.height = height
+        mf.n_mines = int(np.count_nonzero(mines))
+        mf.chunk_size = chunk_size
+        mf._n_chunks_x = -(-width // chunk_size)
+        mf._n_chunks_y = -(-height // chunk_size)
+        mf._values = {}
+        mf._labels = {}
+        mf._areas = {}
+        mf._mines = {
+            (cx, cy): mines[cy * chunk_size : (cy + 1) * chunk_size, cx * chunk_size : (cx + 1) * chunk_size].copy()
+            for cy in range(mf._n_chunks_y)
+            for cx in range(mf._n_chunks_x)
+        }
+        return mf
+
+    @property
+    def n_chunks_generated(self) -> int:
+        """The amount of chunks whose mines have been placed"""
+        return len(self._mines)
+
+    def _chunk_shape(self, key: ChunkKey) -> Tuple[int, int]:
+        cx, cy = key
+        size = self.chunk_size
+        return min(size, self.height - cy * size), min(size, self.width - cx * size)
+
+    def chunk_mines(self, key: ChunkKey) -> NDArray:
+        """Returns the boolean mine layout of the chunk at the given chunk coordinates"""
+        mines = self._mines.get(key)
+        if mines is not None:
+            return mines
+
+        cx, cy = key
+        size = self.chunk_size
+        chunk_height, chunk_width = self._chunk_shape(key)
+        x0 = cx * size
+        y0 = cy * size
+        excluded = [(j - y0) * chunk_width + i - x0 for i, j in self._excluded if i // size == cx and j // size == cy]
+
+        index = cy * self._n_chunks_x + cx
+        rng = np.random.default_rng(
+            np.random.SeedSequence(self._seed.entropy, spawn_key=(*self._seed.spawn_key, index))
+        )
+        n_cells = chunk_height * chunk_width
+        n_mines = int(self._chunk_mines[cy, cx])
+        if excluded:
+            inds = rng.choice(np.setdiff1d(np.arange(n_cells), excluded), n_mines, replace=False)
+        else:
+            inds = rng.choice(n_cells, n_mines, replace=False)
+
+        mines = np.zeros(n_cells, dtype=np.bool)
+        mines[inds] = True
+        mines = mines.reshape(chunk_height, chunk_width)
+        for i, j in self._near:
+            if i // size == cx and j // size == cy:
+                mines[j - y0, i - x0] = True
+        self._mines[key] = mines
+        return mines
+
+    def _mines_region(self, x0: int, y0: int, width: int, height: int) -> NDArray:
+        """The mines of a region of the board, which may extend past its edges, generating the chunks it overlaps"""
+        region = np.zeros((height, width), dtype=np.bool)
+        size = self.chunk_size
+        for cy in range(max(y0, 0) // size, min(y0 + height, self.height) // size + 1):
+            for cx in range(max(x0, 0) // size, min(x0 + width, self.width) // size + 1):
+                if cx >= self._n_chunks_x or cy >= self._n_chunks_y:
+                    continue
+                mines = self.chunk_mines((cx, cy))
+                # Overlap of the chunk and the region in board coordinates
+                left = max(x0, cx * size)
+                right = min(x0 + width, cx * size + mines.shape[1])
+                top = max(y0, cy * size)
+                bottom = min(y0 + height, cy * size + mines.shape[0])
+                if left < right and top < bottom:
+                    region[top - y0 : bottom - y0, left - x0 : right - x0] = mines[
+                        top - cy * size : bottom - cy * size, left - cx * size : right - cx * size
+                    ]
+        return region
+
+    def chunk_values(self, key: ChunkKey) -> NDArray:
+        """Returns the CellState codes of the chunk, which needs the mines of its neighbouring chunks at the edges"""
+        values = self._values.get(key)
+        if values is not None:
+            return values
+
+        cx, cy = key
+        chunk_height, chunk_width = self._chunk_shape(key)
+        x0 = cx * self.chunk_size
+        y0 = cy * self.chunk_size
+        mines = self._mines_region(x0 - 1, y0 - 1, chunk_width + 2, chunk_height + 2)
+        counts = count_neighbour_mines(mines)[1:-1, 1:-1]
+        values = np.where(mines[1:-1, 1:-1], _MINE, counts).astype(CELL_DTYPE)
+        self._values[key] = values
+        return values
+
+    def chunk_labels(self, key: ChunkKey) -> NDArray:
+        """Returns the labels of the areas of empty cells within the chunk, see label_empty_areas"""
+        labels = self._labels.get(key)
+        if labels is None:
+            labels = self._labels[key] = label_empty_areas((self.chunk_values(key) == _CELL_0)[None])[0]
+        return labels
+
+    def chunk_areas(self, key: ChunkKey) -> AreaIndex:
+        """Returns the cells of the empty areas of the chunk with their borders, see index_empty_areas"""
+        areas = self._areas.get(key)
+        if areas is None:
+            areas = self._areas[key] = index_empty_areas(self.chunk_labels(key))
+        return areas
+
+
+class MinesweeperChunked:
+    """
+    Runs minesweeper without an user interface on boards too large for dense arrays.
+
+    The board is split into chunks, and the minefield and the cell states of a chunk are only created once an action
+    reaches it, so an action costs time proportional to the cells it changes rather than to the size of the board.
+    The actions behave like those of MinesweeperHeadless.
+    """
+
+    # Tells if the board has no edges, so that it can't be won and has no amount of unopened cells
+    is_unbounded = False
+    # Subclasses with unbounded empty areas stop flood fills after about this many cells
+    _max_flood_cells: Union[int, None] = None
+
+    def __init__(self, width: int, height: int, n_mines: int, rnd_seed: Union[int, None] = None, chunk_size: int = 256):
+        """
+        Args:
+            width: The width of the minefield.
+            height: The height of the minefield.
+            n_mines: The amount of mines in the minefield.
+            rnd_seed: The root seed of the minefields of all games.
+            chunk_size: The width and height of the chunks.
+        """
+        self._width = width
+        self._height = height
+        self._n_mines = min(n_mines, width * height - 1)
+        self._chunk_size = chunk_size
+
+        self._seed = np.random.SeedSequence(rnd_seed)
+        self._n_games = 0
+        self._mf: Union[ChunkedMineField, None] = None
+        self._next_mines: Union[NDArray, None] = None
+
+        # The cell states of the chunks that actions have reached, all other cells are unopened and not flagged
+        self._unopened: Dict[ChunkKey, NDArray] = {}
+        self._flagged: Dict[ChunkKey, NDArray] = {}
+
+        self._mines_left = self._n_mines
+        self._n_unopened = width * height
+        self._n_revealed = 0
+        self._n_correct_flags = 0
+        # The cells opened by the last action as (y, x) rows, converted to a list only when asked for
+        self._last_opened: List[NDArray] = []
+        # The cells that flood fills handed over to chunks without visiting them yet, per chunk as (y, x) rows
+        self._fill_pending: Dict[ChunkKey, List[NDArray]] = {}
+
+        self.gamestate = GameState.NOT_STARTED
+
+    @property
+    def n_unopened(self) -> int:
+        """The amount of cells that are still unopened"""
+        return self._n_unopened
+
+    @property
+    def n_revealed(self) -> int:
+        """The amount of safe cells that have been revealed"""
+        return self._n_revealed
+
+    @property
+    def n_correct_flags(self) -> int:
+        """The amount of flags that are placed on mines"""
+        return self._n_correct_flags
+
+    @property
+    def mines_left(self) -> int:
+        """The amount of mines minus the amount of flags"""
+        return self._mines_left
+
+    @property
+    def last_opened(self) -> List[Tuple[int, int]]:
+        """The (x, y) cells opened by the most recent action"""
+        if not self._last_opened:
+            return []
+        return [(x, y) for y, x in np.concatenate(self._last_opened).tolist()]
+
+    @property
+    def n_chunks_materialized(self) -> int:
+        """The amount of chunks that have cell states"""
+        return len(self._unopened)
+
+    def set_next_minefield(self, mines: NDArray):
+        """Uses the given boolean mine layout of shape (height, width) for the next game instead of generating one"""
+        if mines.shape != (self._height, self._width) or np.count_nonzero(mines) != self._n_mines:
+            raise ValueError(f"Mine layout of shape {mines.shape} doesn't match the grid specs.")
+        self._next_mines = mines
+
+    def _new_minefield(self, x: int, y: int):
+        if self._next_mines is not None:
+            self._mf = ChunkedMineField.from_mines(self._next_mines, self._chunk_size)
+            self._next_mines = None
+        else:
+            seed = np.random.SeedSequence(self._seed.entropy, spawn_key=(self._n_games,))
+            self._mf = ChunkedMineField(
+                self._width, self._height, self._n_mines, x, y, seed=seed, chunk_size=self._chunk_size
+            )
+        self._n_games += 1
+
+    def _new_game(self):
+        self.gamestate = GameState.NOT_STARTED
+        self._mf = None
+        self._unopened.clear()
+        self._flagged.clear()
+        self._fill_pending.clear()
+        self._mines_left = self._n_mines
+        self._n_unopened = self._width * self._height
+        self._n_revealed = 0
+        self._n_correct_flags = 0
+
+    def _chunk_shape(self, key: ChunkKey) -> Tuple[int, int]:
+        cx, cy = key
+        size = self._chunk_size
+        return min(size, self._height - cy * size), min(size, self._width - cx * size)
+
+    def _chunk_state(self, states: Dict[ChunkKey, NDArray], key: ChunkKey, fill: bool) -> NDArray:
+        """Returns the unopened or flagged states of the chunk, creating them if needed"""
+        state = states.get(key)
+        if state is None:
+            state = states[key] = np.full(self._chunk_shape(key), fill, dtype=np.bool)
+        return state
+
+    def _find_states(self, key: ChunkKey) -> Tuple[Union[NDArray, None], Union[NDArray, None]]:
+        """Returns the unopened and flagged states of the chunk without creating them, None if it wasn't reached"""
+        return self._unopened.get(key), self._flagged.get(key)
+
+    def _on_board(self, cells: NDArray) -> NDArray:
+        """Tells which of the (y, x) rows are inside the board"""
+        return (cells[:, 0] >= 0) & (cells[:, 0] < self._height) & (cells[:, 1] >= 0) & (cells[:, 1] < self._width)
+
+    def _contains(self, x: int, y: int) -> bool:
+        """Tells if the cell is on the board"""
+        return 0 <= x < self._width and 0 <= y < self._height
+
+    def _check_if_won(self) -> bool:
+        return self._n_unopened == self._n_mines
+
+    def _chunk(self, x: int, y: int) -> Tuple[ChunkKey, int, int]:
+        """The chunk of a cell and the coordinates of the cell in it"""
+        cx, i = divmod(x, self._chunk_size)
+        cy, j = divmod(y, self._chunk_size)
+        return (cx, cy), i, j
+
+    def cell(self, x: int, y: int) -> int:
+        """The visible CellState code of the cell"""
+        key, i, j = self._chunk(x, y)
+        unopened, flagged = self._find_states(key)
+        if self.gamestate == GameState.WON:
+            # All unopened cells are flagged on a win, and only those
+            if unopened is None or unopened.item(j, i):
+                return _FLAG
+            return int(self._mf.chunk_values(key).item(j, i))  # type: ignore
+
+        if flagged is not None and flagged.item(j, i):
+            return _FLAG
+        if unopened is None or unopened.item(j, i):
+            return _UNOPENED
+        return int(self._mf.chunk_values(key).item(j, i))  # type: ignore
+
+    def observe(self, x: int, y: int, width: int, height: int) -> NDArray:
+        """Returns the visible CellState codes of a region of the board, without creating chunks for it"""
+        size = self._chunk_size
+        won = self.gamestate == GameState.WON
+        hidden = _FLAG if won else _UNOPENED
+        region = np.full((height, width), hidden, dtype=CELL_DTYPE)
+        for cy in range(y // size, (y + height - 1) // size + 1):
+            for cx in range(x // size, (x + width - 1) // size + 1):
+                unopened, flagged = self._find_states((cx, cy))
+                if unopened is None:
+                    continue
+                left = max(x, cx * size)
+                right = min(x + width, cx * size + unopened.shape[1])
+                top = max(y, cy * size)
+                bottom = min(y + height, cy * size + unopened.shape[0])
+                chunk_slice = (slice(top - cy * size, bottom - cy * size), slice(left - cx * size, right - cx * size))
+                region_slice = (slice(top - y, bottom - y), slice(left - x, right - x))
+
+                values = self._mf.chunk_values((cx, cy))[chunk_slice]  # type: ignore
+                visible = np.where(unopened[chunk_slice], hidden, values)
+                if flagged is not None and not won:
+                    visible[flagged[chunk_slice]] = _FLAG
+                region[region_slice] = visible
+        return region
+
+    def make_interaction(self, act: Interaction):
+        """
+        Makes the given action.
+
+        Raises:
+            ValueError: If an open or a flag is outside of the board.
+        """
+        if act.action in (Action.OPEN, Action.FLAG) and not self._contains(act.x, act.y):
+            raise ValueError(f"Out of bounds: x={act.x}, y={act.y}.")
+        self._last_opened = []
+        if act.action == Action.OPEN and self.gamestate in (GameState.PLAYING, GameState.NOT_STARTED):
+            if self.gamestate == GameState.NOT_STARTED:
+                self.gamestate = GameState.PLAYING
+                self._new_minefield(act.x, act.y)
+
+            key, i, j = self._chunk(act.x, act.y)
+            if not self._chunk_state(self._flagged, key, False).item(j, i):
+                self._last_opened = self._open_cell(act.x, act.y)
+
+            if self.gamestate == GameState.LOST:
+                return
+
+            if self._check_if_won():
+                self._handle_win()
+
+        elif act.action == Action.FLAG and self.gamestate == GameState.PLAYING:
+            key, i, j = self._chunk(act.x, act.y)
+            if self._chunk_state(self._unopened, key, True).item(j, i):
+                self._toggle_flag(act.x, act.y)
+
+        elif act.action == Action.NEW_GAME:
+            self._new_game()
+
+    def _open_cell(self, x: int, y: int) -> List[NDArray]:
+        """Opens the given cell and the empty area around it. Returns the cells that were opened as (y, x) rows."""
+        key, i, j = self._chunk(x, y)
+        unopened = self._chunk_state(self._unopened, key, True)
+        self._chunk_state(self._flagged, key, False)
+        if not unopened.item(j, i):
+            return []
+
+        value = self._mf.chunk_values(key).item(j, i)  # type: ignore
+        if value == _CELL_0:
+            # The flood fill opens the cell itself with its area
+            self._fill_pending.setdefault(key, []).append(np.array([[y, x]]))
+            return self._flood_fill()
+
+        unopened[j, i] = False
+        self._n_unopened -= 1
+        if value == _MINE:
+            self.gamestate = GameState.LOST
+        else:
+            self._n_revealed += 1
+        return [np.array([[y, x]])]
+
+    def _flood_fill(self) -> List[NDArray]:
+        """
+        Opens the pending cells and blows open the empty areas of the empty cells among them, including their borders.
+
+        The areas are filled a chunk at a time with the empty areas of the chunk, whose cells and borders are listed in
+        advance, so that a visit of a chunk only costs time for the cells it reaches. The parts of the borders that fall
+        into neighbouring chunks are handed over to them, and empty cells among those continue the fill there. Only
+        the areas of cells that a visit opens are expanded, as the areas of empty cells opened before have been as well.
+
+        When the fill stops at the limit of cells, the cells that were handed over but not visited stay pending.
+
+        Returns:
+            The cells that were opened as arrays of (y, x) rows.
+        """
+        mf: ChunkedMineField = self._mf  # type: ignore
+        size = self._chunk_size
+        opened: List[NDArray] = []
+        n_opened = 0
+
+        # Cells to open per chunk in board coordinates
+        pending = self._fill_pending
+        limit = self._max_flood_cells
+        while pending and (limit is None or n_opened < limit):
+            key, cells = pending.popitem()
+            cx, cy = key
+            x0 = cx * size
+            y0 = cy * size
+            cells = np.concatenate(cells) - (y0, x0)
+
+            unopened = self._chunk_state(self._unopened, key, True)
+            self._chunk_state(self._flagged, key, False)
+            height, width = unopened.shape
+            padded_width = width + 2
+
+            # The handed over cells that are still unopened, then the empty areas they reach with their borders. Each
+            # of those lists a cell once, so a cell is only opened once when the cells that are still unopened are
+            # opened list by list.
+            flat_unopened = unopened.reshape(-1)
+            seeds = np.unique(cells[:, 0] * width + cells[:, 1])
+            seeds = seeds[flat_unopened[seeds]]
+            reached = [seeds]
+            outside = []
+            labels = mf.chunk_labels(key).reshape(-1)[seeds]
+            new_labels = np.unique(labels[labels < height * width])
+            if len(new_labels):
+                area_labels, starts, area_cells = mf.chunk_areas(key)
+                for k in np.searchsorted(area_labels, new_labels).tolist():
+                    py, px = np.divmod(area_cells[starts[k] : starts[k + 1]], padded_width)
+                    inside = (py >= 1) & (py <= height) & (px >= 1) & (px <= width)
+                    reached.append((py[inside] - 1) * width + px[inside] - 1)
+                    outside.append(np.column_stack((py[~inside] + y0 - 1, px[~inside] + x0 - 1)))
+
+            for flat in reached:
+                flat = flat[flat_unopened[flat]]
+                flat_unopened[flat] = False
+                n_opened += len(flat)
+                opened.append(np.column_stack(np.divmod(flat, width)) + (y0, x0))
+
+            if not outside:
+                continue
+            outside = np.concatenate(outside)
+            outside = outside[self._on_board(outside)]
+            for ky, kx in np.unique(outside // size, axis=0).tolist():
+                in_chunk = outside[(outside[:, 0] // size == ky) & (outside[:, 1] // size == kx)]
+                pending.setdefault((kx, ky), []).append(in_chunk)
+
+        # Empty areas and their borders never contain mines
+        self._n_unopened -= n_opened
+        self._n_revealed += n_opened
+        return opened
+
+    @property
+    def flood_fill_pending(self) -> bool:
+        """Tells if a flood fill stopped at the limit of cells with parts of its area unopened, see continue_flood_fill"""
+        return bool(self._fill_pending)
+
+    def continue_flood_fill(self) -> int:
+        """
+        Continues the flood fills that stopped at the limit of cells, for up to the limit again. The opened cells are
+        available in last_opened like those of an action.
+
+        Returns:
+            The amount of cells that were opened.
+        """
+        self._last_opened = []
+        if self.gamestate != GameState.PLAYING or not self._fill_pending:
+            return 0
+        self._last_opened = self._flood_fill()
+        if self._check_if_won():
+            self._handle_win()
+        return sum(len(cells) for cells in self._last_opened)
+
+    def _toggle_flag(self, x: int, y: int):
+        """Toggles the flag state of an unopened cell"""
+        key, i, j = self._chunk(x, y)
+        flagged = self._chunk_state(self._flagged, key, False)
+        on_mine = bool(self._mf.chunk_mines(key).item(j, i))  # type: ignore
+        if not flagged.item(j, i):
+            flagged[j, i] = True
+            self._mines_left -= 1
+            self._n_correct_flags += on_mine
+        else:
+            flagged[j, i] = False
+            self._mines_left += 1
+            self._n_correct_flags -= on_mine
+
+    def _handle_win(self):
+        # The remaining unopened cells are shown as flags without touching their chunks
+        self.gamestate = GameState.WON
+        self._mines_left = 0
+        self._n_correct_flags = self._n_mines
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import List, Tuple, Union
+import numpy as np
+from numpy.typing import NDArray
+from .utils import CELL_DTYPE, CellState, GameState
+
+_UNOPENED = CellState.UNOPENED.num()
+
+
+@dataclass(frozen=True, slots=True)
+class Frame:
+    """What the ui shows of a game at one moment, published by the game thread"""
+
+    version: int
+    gamestate: GameState
+    mines_left: int
+    # The perf_counter time of the oldest input whose result the frame shows, if any
+    input_time: Union[float, None]
+    # The buffer of the visible board and its sequence number at the time of publishing
+    buffer: int
+    seq: int
+
+
+class FrameBuffer:
+    """
+    Hands the latest frame of a game from the game thread to the ui thread without locks.
+
+    The visible board is written alternately into one of two buffers, so the buffer of the latest frame isn't touched
+    by the next publish. Every buffer has a sequence number that is odd while it is being written. A reader copies the
+    board of the latest frame and checks the sequence number afterwards, and tries again with a newer frame if the
+    buffer was overwritten in the meantime, so a board is never seen half-updated and the writer never waits.
+    """
+
+    def __init__(self, shape: Tuple[int, int], mines_left: int):
+        """
+        Args:
+            shape: The shape of the visible board.
+            mines_left: The amount of mines left shown by the first frame.
+        """
+        self._grids = (np.full(shape, _UNOPENED, dtype=CELL_DTYPE), np.full(shape, _UNOPENED, dtype=CELL_DTYPE))
+        self._seqs: List[int] = [0, 0]
+        self._latest = Frame(0, GameState.NOT_STARTED, mines_left, None, 0, 0)
+
+    @property
+    def latest(self) -> Frame:
+        return self._latest
+
+    def publish(self, grid: NDArray, gamestate: GameState, mines_left: int, input_time: Union[float, None] = None):
+        """Publishes a new frame with a copy of the visible board. Must only be called from one thread."""
+        version = self._latest.version + 1
+        buffer = version % 2
+        self._seqs[buffer] += 1
+        np.copyto(self._grids[buffer], grid)
+        self._seqs[buffer] += 1
+        self._latest = Frame(version, gamestate, mines_left, input_time, buffer, self._seqs[buffer])
+
+    def read(self, out: NDArray, after: int = -1) -> Union[Frame, None]:
+        """
+        Copies the visible board of the latest frame into out, if the frame is newer than the given version.
+
+        Returns:
+            The frame whose board was copied, or None if there is no newer frame.
+        """
+        while True:
+            frame = self._latest
+            if frame.version <= after:
+                return None
+            np.copyto(out, self._grids[frame.buffer])
+            if self._seqs[frame.buffer] == frame.seq:
+                return frame
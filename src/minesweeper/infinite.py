@@ -0,0 +1,273 @@
+from collections import OrderedDict
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Tuple, Union
+import zlib
+import numpy as np
+from numpy.typing import NDArray
+from .batch import label_empty_areas
+from .chunked import AreaIndex, ChunkKey, MinesweeperChunked, index_empty_areas
+from .minefield import count_neighbour_mines
+from .utils import CELL_DTYPE, CellState
+
+_CELL_0 = CellState.CELL_0.num()
+_MINE = CellState.MINE.num()
+
+
+def _zigzag(n: int) -> int:
+    """Maps integers to non-negative integers, as the entropy of a SeedSequence can't be negative"""
+    return 2 * n if n >= 0 else -2 * n - 1
+
+
+def _cached[T](cache: OrderedDict, key: ChunkKey, make: Callable[[ChunkKey], T], size: int) -> T:
+    """Looks the chunk up in a least recently used cache, making and adding it if it is missing"""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+        return value
+    value = cache[key] = make(key)
+    if len(cache) > size:
+        cache.popitem(last=False)
+    return value
+
+
+class InfiniteMineField:
+    """
+    The mines of an unbounded board, where every cell is a mine with the given density.
+
+    The mines of a chunk are generated from a hash of the seed and the chunk coordinates, so any chunk can be
+    generated again at any time. The generated chunks are only cached up to a limit.
+    """
+
+    def __init__(self, density: float, seed: Tuple[int, ...], x: int, y: int, chunk_size: int = 64, cache_size=256):
+        """
+        Args:
+            density: The probability of a mine in a cell.
+            seed: The integers the chunk seeds are derived from.
+            x: The x coordinate of the first click, which has no mines in the 3x3 area around it.
+            y: The y coordinate of the first click.
+            chunk_size: The width and height of the chunks.
+            cache_size: The amount of chunks of mines, values, labels and areas that are kept each.
+        """
+        self.density = density
+        self.chunk_size = chunk_size
+        self._seed = seed
+        self._excluded = [(x + dx, y + dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+        self._cache_size = cache_size
+        self._mines: OrderedDict[ChunkKey, NDArray] = OrderedDict()
+        self._values: OrderedDict[ChunkKey, NDArray] = OrderedDict()
+        self._labels: OrderedDict[ChunkKey, NDArray] = OrderedDict()
+        self._areas: OrderedDict[ChunkKey, AreaIndex] = OrderedDict()
+
+    def _make_mines(self, key: ChunkKey) -> NDArray:
+        cx, cy = key
+        size = self.chunk_size
+        rng = np.random.default_rng(np.random.SeedSequence([*self._seed, _zigzag(cx), _zigzag(cy)]))
+        mines = rng.random((size, size)) < self.density
+        for i, j in self._excluded:
+            if i // size == cx and j // size == cy:
+                mines[j % size, i % size] = False
+        return mines
+
+    def chunk_mines(self, key: ChunkKey) -> NDArray:
+        """Returns the boolean mine layout of the chunk at the given chunk coordinates"""
+        return _cached(self._mines, key, self._make_mines, self._cache_size)
+
+    def _make_values(self, key: ChunkKey) -> NDArray:
+        cx, cy = key
+        size = self.chunk_size
+        mines = np.zeros((size + 2, size + 2), dtype=np.bool)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                # The part of the neighbouring chunk that borders this one
+                rows = slice(0, size) if dy == 0 else slice(size - 1, size) if dy < 0 else slice(0, 1)
+                cols = slice(0, size) if dx == 0 else slice(size - 1, size) if dx < 0 else slice(0, 1)
+                top = 1 if dy == 0 else 0 if dy < 0 else size + 1
+                left = 1 if dx == 0 else 0 if dx < 0 else size + 1
+                part = self.chunk_mines((cx + dx, cy + dy))[rows, cols]
+                mines[top : top + part.shape[0], left : left + part.shape[1]] = part
+
+        counts = count_neighbour_mines(mines)[1:-1, 1:-1]
+        return np.where(mines[1:-1, 1:-1], _MINE, counts).astype(CELL_DTYPE)
+
+    def chunk_values(self, key: ChunkKey) -> NDArray:
+        """Returns the CellState codes of the chunk, which needs the mines of its neighbouring chunks at the edges"""
+        return _cached(self._values, key, self._make_values, self._cache_size)
+
+    def chunk_labels(self, key: ChunkKey) -> NDArray:
+        """Returns the labels of the areas of empty cells within the chunk, see label_empty_areas"""
+        return _cached(
+            self._labels,
+            key,
+            lambda key: label_empty_areas((self.chunk_values(key) == _CELL_0)[None])[0],
+            self._cache_size,
+        )
+
+    def chunk_areas(self, key: ChunkKey) -> AreaIndex:
+        """Returns the cells of the empty areas of the chunk with their borders, see index_empty_areas"""
+        return _cached(self._areas, key, lambda key: index_empty_areas(self.chunk_labels(key)), self._cache_size)
+
+
+class MinesweeperInfinite(MinesweeperChunked):
+    """
+    Runs minesweeper without an user interface on an unbounded board, which can't be won.
+
+    Only the cell states of the most recently used chunks are kept in memory. Chunks that are evicted are compressed
+    and kept in memory up to a budget of bytes, past which the oldest of them are written to a temporary folder, and
+    restored when they are used again, so the memory stays bounded however far the board is explored. Since there is
+    no amount of mines, mines_left is minus the amount of flags, and n_unopened raises as there is no amount of
+    unopened cells either.
+
+    Flood fills stop after about max_flood_cells cells, as the empty areas of sparse boards can be unbounded. Then
+    flood_fill_pending is True, and continue_flood_fill opens more of the area.
+    """
+
+    is_unbounded = True
+
+    def __init__(
+        self,
+        density: float = 0.2,
+        rnd_seed: Union[int, None] = None,
+        chunk_size: int = 64,
+        max_chunks: int = 256,
+        spill_dir: Union[str, os.PathLike, None] = None,
+        max_flood_cells: int = 1_000_000,
+        max_spilled_bytes: int = 64 * 2**20,
+    ):
+        """
+        Args:
+            density: The probability of a mine in a cell.
+            rnd_seed: The root seed of the minefields of all games.
+            chunk_size: The width and height of the chunks.
+            max_chunks: The amount of chunks whose cell states are kept uncompressed in memory.
+            spill_dir: The folder in which the temporary folder for evicted chunks is created, by default the
+                temporary folder of the system. It is only created once the chunks exceed max_spilled_bytes.
+            max_flood_cells: Flood fills stop after about this many cells, see continue_flood_fill.
+            max_spilled_bytes: The amount of compressed bytes of evicted chunks that are kept in memory. The least
+                recently evicted chunks past it are written to disk, so with 0 all evicted chunks are.
+        """
+        if not 0 < density < 1:
+            raise ValueError(f"The density must be between 0 and 1, got {density}.")
+        if max_chunks < 2:
+            raise ValueError("At least two chunks need to fit in memory.")
+
+        super().__init__(0, 0, 0, rnd_seed, chunk_size)
+        self._n_mines = 0
+        self._mines_left = 0
+        self._density = density
+        self._max_chunks = max_chunks
+        self._max_flood_cells = max_flood_cells
+
+        # Order of use of the chunks in memory and the compressed states of the evicted ones
+        self._lru: OrderedDict[ChunkKey, None] = OrderedDict()
+        self._spilled: OrderedDict[ChunkKey, bytes] = OrderedDict()
+        self._spilled_bytes = 0
+        self._max_spilled_bytes = max_spilled_bytes
+        self._spill_parent = spill_dir
+        self._spill_dir: Union[str, None] = None
+        self.n_evictions = 0
+
+    @property
+    def n_unopened(self) -> int:
+        """An unbounded board has infinitely many unopened cells, which is not an amount, see is_unbounded"""
+        raise ValueError("An unbounded board has no amount of unopened cells.")
+
+    def set_next_minefield(self, mines: NDArray):
+        raise ValueError("The mines of an unbounded board can't be given.")
+
+    def _new_minefield(self, x: int, y: int):
+        seed = (int(self._seed.entropy), self._n_games)  # type: ignore
+        self._mf = InfiniteMineField(self._density, seed, x, y, self._chunk_size, self._max_chunks)  # type: ignore
+        self._n_games += 1
+
+    def _new_game(self):
+        super()._new_game()
+        self._lru.clear()
+        self._spilled.clear()
+        self._spilled_bytes = 0
+        self.close()
+
+    def close(self):
+        """Removes the chunks written to disk"""
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    @property
+    def spilled_bytes(self) -> int:
+        """The amount of compressed bytes of evicted chunks that are kept in memory"""
+        return self._spilled_bytes
+
+    def _chunk_shape(self, key: ChunkKey) -> Tuple[int, int]:
+        return self._chunk_size, self._chunk_size
+
+    def _on_board(self, cells: NDArray) -> NDArray:
+        return np.ones(len(cells), dtype=np.bool)
+
+    def _contains(self, x: int, y: int) -> bool:
+        return True
+
+    def _check_if_won(self) -> bool:
+        return False
+
+    def _spill_path(self, key: ChunkKey) -> str:
+        return os.path.join(self._spill_dir, f"{key[0]}_{key[1]}.bin")  # type: ignore
+
+    def _evict(self, key: ChunkKey):
+        """Compresses the states of the chunk and drops them from memory, unless they are still untouched"""
+        unopened = self._unopened.pop(key)
+        flagged = self._flagged.pop(key)
+        self.n_evictions += 1
+        if unopened.all() and not flagged.any():
+            return
+
+        self._spilled[key] = zlib.compress(np.packbits(np.stack((unopened, flagged))).tobytes())
+        self._spilled_bytes += len(self._spilled[key])
+        while self._spilled_bytes > self._max_spilled_bytes:
+            old_key, data = self._spilled.popitem(last=False)
+            self._spilled_bytes -= len(data)
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix="minesweeper-", dir=self._spill_parent)
+            with open(self._spill_path(old_key), "wb") as f:
+                f.write(data)
+
+    def _restore(self, key: ChunkKey) -> bool:
+        """Brings the states of an evicted chunk back into memory. Returns False if it was never evicted."""
+        data = self._spilled.pop(key, None)
+        if data is not None:
+            self._spilled_bytes -= len(data)
+        elif self._spill_dir is not None and os.path.exists(self._spill_path(key)):
+            with open(self._spill_path(key), "rb") as f:
+                data = f.read()
+            os.remove(self._spill_path(key))
+        else:
+            return False
+
+        size = self._chunk_size
+        bits = np.unpackbits(np.frombuffer(zlib.decompress(data), dtype=np.uint8), count=2 * size * size)
+        unopened, flagged = bits.astype(np.bool).reshape(2, size, size)
+        self._unopened[key] = unopened.copy()
+        self._flagged[key] = flagged.copy()
+        self._touch(key)
+        return True
+
+    def _touch(self, key: ChunkKey):
+        """Marks the chunk as used most recently and evicts the least recently used chunks over the limit"""
+        self._lru[key] = None
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._max_chunks:
+            self._evict(self._lru.popitem(last=False)[0])
+
+    def _chunk_state(self, states: Dict[ChunkKey, NDArray], key: ChunkKey, fill: bool) -> NDArray:
+        if key not in self._unopened and not self._restore(key):
+            shape = self._chunk_shape(key)
+            self._unopened[key] = np.ones(shape, dtype=np.bool)
+            self._flagged[key] = np.zeros(shape, dtype=np.bool)
+        self._touch(key)
+        return states[key]
+
+    def _find_states(self, key: ChunkKey) -> Tuple[Union[NDArray, None], Union[NDArray, None]]:
+        if key in self._unopened or self._restore(key):
+            self._touch(key)
+        return self._unopened.get(key), self._flagged.get(key)
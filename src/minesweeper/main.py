@@ -1,15 +1,78 @@
-from typing import Annotated
+import asyncio
+import os
+from typing import Annotated, Union
 import typer
 from .minesweeper_ import Minesweeper
+from .no_guess import NoGuessPool
+from .server import serve as serve_games
 
 app = typer.Typer()
 
-width_type = Annotated[int, typer.Argument(help="The width of the grid.", min=3, max=30, clamp=True)]
-height_type = Annotated[int, typer.Argument(help="The height of the grid", min=3, max=16, clamp=True)]
-n_mines_type = Annotated[int, typer.Argument(help="The amount of mines.", min=0, max=99, clamp=True)]
+# The largest board that fits on a typical screen, unless the limits are lifted
+MAX_WIDTH = 30
+MAX_HEIGHT = 16
+MAX_MINES = 99
+
+# The largest board whose window fits on a 4K screen, for --no-clamp. Larger boards can only be played headless.
+MAX_UI_WIDTH = 120
+MAX_UI_HEIGHT = 64
+
+BOARD_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "minesweeper", "boards")
+
+width_type = Annotated[int, typer.Argument(help=f"The width of the grid, at most {MAX_WIDTH}.", min=3, clamp=True)]
+height_type = Annotated[int, typer.Argument(help=f"The height of the grid, at most {MAX_HEIGHT}.", min=3, clamp=True)]
+n_mines_type = Annotated[int, typer.Argument(help=f"The amount of mines, at most {MAX_MINES}.", min=0, clamp=True)]
+
+
+event_driven_type = Annotated[
+    bool, typer.Option(help="Sleep until there is input instead of redrawing at a fixed frame rate.")
+]
+no_clamp_type = Annotated[
+    bool,
+    typer.Option(help=f"Allow boards larger than the usual limits, up to {MAX_UI_WIDTH}x{MAX_UI_HEIGHT} cells."),
+]
+no_guess_type = Annotated[
+    bool, typer.Option(help="Only play boards that can be solved from the first click without guessing.")
+]
+serve_type = Annotated[
+    Union[str, None],
+    typer.Option(help="Host headless games over line-delimited JSON on host:port or unix:path instead of playing."),
+]
 
 
 @app.command()
-def run(width: width_type = 30, height: height_type = 16, n_mines: n_mines_type = 99):
-    ms = Minesweeper(width, height, n_mines)
-    ms.run()
+def run(
+    width: width_type = 30,
+    height: height_type = 16,
+    n_mines: n_mines_type = 99,
+    event_driven: event_driven_type = False,
+    no_clamp: no_clamp_type = False,
+    no_guess: no_guess_type = False,
+    serve: serve_type = None,
+):
+    if serve is not None:
+        try:
+            asyncio.run(serve_games(serve))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if not no_clamp:
+        width = min(width, MAX_WIDTH)
+        height = min(height, MAX_HEIGHT)
+        n_mines = min(n_mines, MAX_MINES)
+    elif width > MAX_UI_WIDTH or height > MAX_UI_HEIGHT:
+        raise typer.BadParameter(
+            f"A board of {width}x{height} doesn't fit in a window, the largest is {MAX_UI_WIDTH}x{MAX_UI_HEIGHT}. "
+            "Larger boards can be played headless with MinesweeperChunked."
+        )
+    ms = Minesweeper(width, height, n_mines, event_driven=event_driven)
+    if not no_guess:
+        ms.run()
+        return
+
+    # Boards are generated ahead of time and kept between runs
+    with NoGuessPool(BOARD_CACHE_DIR, width, height, n_mines) as pool:
+        pool.start()
+        ms.set_board_source(pool.take)
+        ms.run()
@@ -2,49 +2,157 @@ from itertools import product
 from typing import Set, Tuple, Union
 import numpy as np
 from numpy.typing import NDArray
-from .utils import CellState
+from .utils import CELL_DTYPE, CellState, as_cellstates
+
+_UNOPENED = CellState.UNOPENED.num()
+_MINE = CellState.MINE.num()
+_WALL = CellState.WALL.num()
+
+type RandomSource = Union[np.random.Generator, np.random.RandomState]
+
+
+def make_rng(rnd_seed: Union[int, np.random.BitGenerator, None] = None, legacy_seeding: bool = False) -> RandomSource:
+    """
+    Creates an instance-local random number generator for placing mines.
+
+    Args:
+        rnd_seed: A seed or a bit generator to draw the random numbers from.
+        legacy_seeding: If True, returns a RandomState that reproduces the layouts of the old global np.random.seed
+            based seeding.
+    """
+    if legacy_seeding:
+        return np.random.RandomState(rnd_seed)
+    return np.random.default_rng(rnd_seed)
+
+
+def count_neighbour_mines(mines: NDArray) -> NDArray:
+    """
+    Counts the mines in the 8-neighbourhood of every cell.
+
+    Args:
+        mines: Boolean mine mask, the last two axes being (height, width). Leading axes are treated as a batch.
+
+    Returns:
+        An int8 array of the same shape with the neighbour mine count of each cell.
+    """
+    padded = np.zeros((*mines.shape[:-2], mines.shape[-2] + 2, mines.shape[-1] + 2), dtype=CELL_DTYPE)
+    padded[..., 1:-1, 1:-1] = mines
+    height, width = mines.shape[-2:]
+
+    counts = np.zeros(mines.shape, dtype=CELL_DTYPE)
+    for dy, dx in product((0, 1, 2), repeat=2):
+        if dy == dx == 1:
+            continue
+        counts += padded[..., dy : dy + height, dx : dx + width]
+    return counts
 
 
 class MineField:
     """Represents a minesweeper grid that has does not have mines in a 3x3 area around the given point"""
 
-    def __init__(self, width: int, height: int, n_mines: int, x: int, y: int, rnd_seed: Union[int, None] = None):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        n_mines: int,
+        x: int,
+        y: int,
+        rnd_seed: Union[int, None] = None,
+        rng: Union[RandomSource, None] = None,
+        legacy_seeding: bool = False,
+    ):
+        """
+        Args:
+            width: The width of the minefield.
+            height: The height of the minefield.
+            n_mines: The amount of mines in the minefield.
+            x: The x coordinate of the first click.
+            y: The y coordinate of the first click.
+            rnd_seed: Seed for the random number generator, ignored if rng is given.
+            rng: The random number generator used to place the mines. A RandomState uses the legacy placement.
+            legacy_seeding: Reproduce the layouts of the old np.random.seed based placement with the given seed.
+        """
         self._width = width
         self._n_mines = n_mines
         self._height = height
 
         self._mf: NDArray
 
-        if rnd_seed is not None:
-            np.random.seed(rnd_seed)
+        self._rng = rng if rng is not None else make_rng(rnd_seed, legacy_seeding)
 
         self._new_minefield(x, y)
+        # The layout never changes, so games and their clones can share it
+        self._mf.flags.writeable = False
+
+    @classmethod
+    def from_mines(cls, mines: NDArray) -> "MineField":
+        """Creates a minefield with the given boolean mine layout of shape (height, width)"""
+        height, width = mines.shape
+        mf = cls.__new__(cls)
+        mf._width = width
+        mf._height = height
+        mf._n_mines = int(np.count_nonzero(mines))
+        mf._rng = None
+        mf._init_grid()
+        mf._mf[1:-1, 1:-1][mines] = _MINE
+        mf._define_cell_values()
+        mf._mf.flags.writeable = False
+        return mf
 
     def get_minefield(self) -> NDArray:
+        """Returns the walled minefield as an array of CellState codes"""
         return self._mf[:]
 
     def print_mf(self):
         print()
         with np.printoptions(linewidth=200):
-            print(self._mf)
+            print(as_cellstates(self._mf))
         print()
 
     def _new_minefield(self, x: int, y: int):
         self._in_bounds_check(x, y)
         self._init_grid()
-        self._mine_randomizer(x, y)
+        if isinstance(self._rng, np.random.RandomState):
+            self._legacy_mine_randomizer(x, y)
+        else:
+            self._mine_randomizer(x, y)
         self._define_cell_values()
 
     def _init_grid(self):
         """Creates new minefield with walls around it"""
-        self._mf = np.array([[CellState.UNOPENED for x in range(self._width)] for y in range(self._height)])
-        self._mf = np.insert(self._mf, self._width, CellState.WALL, axis=1)  # type: ignore
-        self._mf = np.insert(self._mf, 0, CellState.WALL, axis=1)  # type: ignore
-        self._mf = np.insert(self._mf, self._height, CellState.WALL, axis=0)  # type: ignore
-        self._mf = np.insert(self._mf, 0, CellState.WALL, axis=0)  # type: ignore
+        self._mf = np.full((self._height + 2, self._width + 2), _WALL, dtype=CELL_DTYPE)
+        self._mf[1:-1, 1:-1] = _UNOPENED
 
     def _mine_randomizer(self, x: int, y: int):
-        """Inserts mines randomly to the minefield."""
+        """Inserts mines randomly to the minefield by sampling flat indices outside the 3x3 around the start."""
+        n_cells = self._width * self._height
+
+        # Keep a 3x3 clear around the start
+        excluded = [
+            j * self._width + i
+            for j in range(max(y - 1, 0), min(y + 2, self._height))
+            for i in range(max(x - 1, 0), min(x + 2, self._width))
+        ]
+        n_nbrs = len(excluded) - 1
+        far_mines = min(self._n_mines, n_cells - n_nbrs - 1)
+        near_mines = min(self._n_mines - far_mines, n_nbrs)
+
+        # Sample ranks among the valid cells and shift them past the excluded cells, which are in ascending order
+        inds = self._rng.choice(n_cells - len(excluded), far_mines, replace=False)
+        for excluded_ind in excluded:
+            inds[inds >= excluded_ind] += 1
+
+        # If too many mines to keep 3x3 empty, add the rest of the mines to the neighours
+        if near_mines:
+            nbrs = [ind for ind in excluded if ind != y * self._width + x]
+            inds = np.concatenate((inds, self._rng.choice(nbrs, near_mines, replace=False)))
+
+        mines = np.zeros(n_cells, dtype=np.bool)
+        mines[inds] = True
+        self._mf[1:-1, 1:-1][mines.reshape(self._height, self._width)] = _MINE
+
+    def _legacy_mine_randomizer(self, x: int, y: int):
+        """Inserts mines randomly to the minefield, reproducing the layouts of the original implementation."""
 
         valid_coordinates = [(i, j) for i, j in product(range(self._width), range(self._height))]
 
@@ -61,27 +169,25 @@ class MineField:
         n_nbrs = len(self.get_nbr_inds_of_types(x, y, CellState.UNOPENED))
         far_mines = min(self._n_mines, self._width * self._height - n_nbrs - 1)
         near_mines = min(self._n_mines - far_mines, n_nbrs)
-        for ind in np.random.choice(len(valid_coordinates), far_mines, replace=False):
-            self._mf[valid_coordinates[ind][1] + 1][valid_coordinates[ind][0] + 1] = CellState.MINE
+        for ind in self._rng.choice(len(valid_coordinates), far_mines, replace=False):
+            self._mf[valid_coordinates[ind][1] + 1, valid_coordinates[ind][0] + 1] = _MINE
 
         # If too many mines to keep 3x3 empty, add the rest of the mines to the neighours
         if near_mines:
             nbrs = list(self.get_nbr_inds_of_types(x, y, CellState.UNOPENED))
-            for ind in np.random.choice(len(nbrs), near_mines, replace=False):
-                self._mf[nbrs[ind][1] + 1][nbrs[ind][0] + 1] = CellState.MINE
+            for ind in self._rng.choice(len(nbrs), near_mines, replace=False):
+                self._mf[nbrs[ind][1] + 1, nbrs[ind][0] + 1] = _MINE
 
     def _define_cell_values(self):
         """Defines the correct state for each cell"""
-        for j in range(self._height):
-            for i in range(self._width):
-                if self.cell_at(i, j) != CellState.MINE:
-                    mines_near = len(self.get_nbr_inds_of_types(i, j, CellState.MINE))
-                    self._mf[j + 1][i + 1] = CellState.by_mine_amount(mines_near)
+        inner = self._mf[1:-1, 1:-1]
+        mines = inner == _MINE
+        inner[...] = np.where(mines, _MINE, count_neighbour_mines(mines))
 
     def cell_at(self, x: int, y: int) -> CellState:
         """Returns the cell at the given coordinates"""
         self._in_bounds_check(x, y)
-        return self._mf[y + 1][x + 1]
+        return CellState.by_num(self._mf[y + 1, x + 1])
 
     def _in_bounds_check(self, x: int, y: int):
         if x < 0 or y < 0 or y >= self._height or x >= self._width:
@@ -90,27 +196,16 @@ class MineField:
     def get_nbr_inds_of_types(self, x: int, y: int, celltype: CellState) -> Set[Tuple[int, int]]:
         """Returns a set of the neighbouring indices with the given celltype"""
         self._in_bounds_check(x, y)
+        code = celltype.num()
         inds: Set[Tuple[int, int]] = set()
         for dy, row in enumerate(self.neighbours(x, y), start=-1):
             for dx, nbr in enumerate(row, start=-1):
-                if (dy == dx == 0) or (nbr != celltype):
+                if (dy == dx == 0) or (nbr != code):
                     continue
                 inds.add((x + dx, y + dy))
         return inds
 
     def neighbours(self, x: int, y: int) -> NDArray:
-        """Returns a 3x3 matrix of the neighbours surrounding the given cell."""
+        """Returns a 3x3 matrix of the cell codes of the neighbours surrounding the given cell."""
         self._in_bounds_check(x, y)
-        nbs = np.empty((3, 3), dtype=object)
-        for dx, dy in product((-1, 0, 1), repeat=2):
-            i = x + dx
-            j = y + dy
-
-            if -1 in (i, j) or i == self._width or j == self._height:
-                value = CellState.WALL
-            else:
-                value = self.cell_at(i, j)
-
-            nbs[dy + 1][dx + 1] = value
-
-        return nbs
+        return self._mf[y : y + 3, x : x + 3].copy()
@@ -1,27 +1,89 @@
+from collections import deque
+import copy
+from dataclasses import dataclass
 from itertools import product
 import os
-from queue import Queue
 from threading import Event, Thread
-from typing import Set, Tuple, Union
+import time
+from typing import Any, Callable, Dict, List, Protocol, Self, Tuple, Union
 import numpy as np
 from numpy.typing import NDArray
-from .minefield import CellState, MineField
-from .minesweeper_ui import MinesweeperUI
-from .utils import Action, GameState, Interaction
+from .frames import FrameBuffer
+from .minefield import CellState, MineField, make_rng
+from .recording import SessionWriter
+from .stats import ActionHook, Instrumentation
+from .utils import CELL_DTYPE, OUTCOME_DTYPE, Action, GameState, Interaction, InteractionsLike, as_interaction_array
 
-type index_set = Set[Tuple[int, int]]
+_CELL_0 = CellState.CELL_0.num()
+_UNOPENED = CellState.UNOPENED.num()
+_MINE = CellState.MINE.num()
+_FLAG = CellState.FLAG.num()
+_WALL = CellState.WALL.num()
+
+_NBR_OFFSETS = tuple(product((-1, 0, 1), repeat=2))
+
+# Gives the boolean mine layout of a new game for the first click at x, y
+type BoardSource = Callable[[int, int], NDArray]
+
+# The actions by their values, which are consecutive
+_ACTIONS = tuple(Action)
+_ACTION_CODES = np.array([action.value for action in _ACTIONS])
+# The actions on a cell, whose coordinates need to be on the minefield
+_CELL_ACTIONS = frozenset((Action.OPEN, Action.FLAG))
+
+
+class UserInterface(Protocol):
+    """What the game needs of its user interface, which MinesweeperUI provides"""
+
+    @property
+    def invalidated(self) -> bool: ...
+
+    def draw_frame(self, visible_grid: NDArray, gamestate: GameState, mines: int): ...
+
+    def get_interaction(self) -> Union[Interaction, None]: ...
+
+    def wait_interaction(self) -> Union[Interaction, None]: ...
+
+    def wake(self): ...
+
+
+def _load_ui_class() -> Callable[[int, int], UserInterface]:
+    """Imports the user interface lazily, so that headless use never imports pygame"""
+    try:
+        from .minesweeper_ui import MinesweeperUI
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            "The user interface requires pygame, install it with: pip install minesweeper[ui]", name=e.name
+        ) from e
+    return MinesweeperUI
+
+
+@dataclass(frozen=True, slots=True)
+class GameSnapshot:
+    """The state of a game, with the minefield shared and the unopened and flagged cells bit-packed together"""
+
+    mf: Union[MineField, None]
+    cells: bytes
+    gamestate: GameState
+    mines_left: int
+    n_unopened: int
+    n_revealed: int
+    n_correct_flags: int
 
 
 class MinesweeperBase:
     """Base class for the minesweeper game"""
 
-    def __init__(self, width: int, height: int, n_mines: int, rnd_seed: Union[int, None] = None):
+    def __init__(
+        self, width: int, height: int, n_mines: int, rnd_seed: Union[int, None] = None, legacy_seeding: bool = False
+    ):
         """
         Args:
             width: The width of the minefield.
             height: The height of the minefield.
             n_mines: The amount of mines in the minefield.
             rnd_seed: An initial starting point for the seed used in random number generators.
+            legacy_seeding: Reproduce the minefields of the old seeding, where every game reseeded with rnd_seed + i.
         """
 
         self._mf: MineField
@@ -36,23 +98,221 @@ class MinesweeperBase:
 
         self._unopened = np.ones((height, width), dtype=np.bool)
         self._flagged = np.zeros((height, width), dtype=np.bool)
+        self._unopened_view = self._unopened.view()
+        self._unopened_view.flags.writeable = False
+        self._flagged_view = self._flagged.view()
+        self._flagged_view.flags.writeable = False
+        self._last_opened: List[Tuple[int, int]] = []
+
+        # The board as the player sees it, updated only where cells change
+        self._obs = np.full((height, width), _UNOPENED, dtype=CELL_DTYPE)
+        self._obs_view = self._obs.view()
+        self._obs_view.flags.writeable = False
+
+        # Running counters, kept up to date as cells change so that the board never needs to be scanned
+        self._n_unopened = self._width * self._height
+        self._n_revealed = 0
+        self._n_correct_flags = 0
 
         self.gamestate = GameState.NOT_STARTED
 
         self._rnd_seed = rnd_seed
+        self._legacy_seeding = legacy_seeding
+        self._rng = make_rng(rnd_seed)
+        # Clones share the generator until one of them needs it, see clone()
+        self._rng_shared = False
+
+        self._instrumentation: Union[Instrumentation, None] = None
+
+        self._next_mines: Union[NDArray, None] = None
+        self._board_source: Union[BoardSource, None] = None
+
+    def enable_instrumentation(self, hook: Union[ActionHook, None] = None):
+        """
+        Starts collecting counters and timings of the games, which can be read with stats().
+
+        Args:
+            hook: Called after every action with the game, the interaction and the amount of cells it revealed.
+        """
+        self._instrumentation = Instrumentation(hook)
+
+    def disable_instrumentation(self):
+        self._instrumentation = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters of the current game and the totals since the instrumentation was enabled"""
+        if self._instrumentation is None:
+            raise RuntimeError("Instrumentation is not enabled.")
+        return self._instrumentation.stats()
+
+    @property
+    def width(self) -> int:
+        """The width of the minefield"""
+        return self._width
+
+    @property
+    def height(self) -> int:
+        """The height of the minefield"""
+        return self._height
+
+    @property
+    def n_mines(self) -> int:
+        """The amount of mines in the minefield"""
+        return self._n_mines
+
+    @property
+    def n_unopened(self) -> int:
+        """The amount of cells that are still unopened"""
+        return self._n_unopened
+
+    @property
+    def n_revealed(self) -> int:
+        """The amount of safe cells that have been revealed"""
+        return self._n_revealed
+
+    @property
+    def n_correct_flags(self) -> int:
+        """The amount of flags that are placed on mines"""
+        return self._n_correct_flags
+
+    @property
+    def mines_left(self) -> int:
+        """The amount of mines minus the amount of flags"""
+        return self._mines_left
+
+    @property
+    def unopened(self) -> NDArray:
+        """Read-only view of the unopened cells, of shape (height, width)"""
+        return self._unopened_view
+
+    @property
+    def flagged(self) -> NDArray:
+        """Read-only view of the flagged cells, of shape (height, width)"""
+        return self._flagged_view
+
+    @property
+    def last_opened(self) -> List[Tuple[int, int]]:
+        """The (x, y) cells opened by the most recent action"""
+        return self._last_opened
+
+    def observe(self, out: Union[NDArray, None] = None) -> NDArray:
+        """
+        Gives the visible board as CellState codes, of shape (height, width), without the hidden mines.
+
+        Args:
+            out: An array of shape (height, width) the board is copied into. If not given, a read-only view of the
+                board is returned, which changes with the game.
+        """
+        if out is None:
+            return self._obs_view
+        np.copyto(out, self._obs)
+        return out
+
+    def _sync_obs(self):
+        """Rebuilds the visible board from the cell states, after they have been set directly"""
+        if self.gamestate == GameState.NOT_STARTED:
+            self._obs.fill(_UNOPENED)
+            return
+        np.copyto(self._obs, np.where(self._unopened, _UNOPENED, self.get_grid()))
+        self._obs[self._flagged] = _FLAG
+
+    def snapshot(self) -> GameSnapshot:
+        """Captures the state of the current game, which restore() can return to"""
+        return GameSnapshot(
+            getattr(self, "_mf", None),
+            np.packbits(np.stack((self._unopened, self._flagged))).tobytes(),
+            self.gamestate,
+            self._mines_left,
+            self._n_unopened,
+            self._n_revealed,
+            self._n_correct_flags,
+        )
+
+    def restore(self, snapshot: GameSnapshot):
+        """Returns to the state of a snapshot of this game or of a game with the same grid specs"""
+        n_cells = self._width * self._height
+        if len(snapshot.cells) != -(-2 * n_cells // 8):
+            raise ValueError("The snapshot is of a game with other grid specs.")
+        bits = np.unpackbits(np.frombuffer(snapshot.cells, dtype=np.uint8), count=2 * n_cells)
+        self._unopened.reshape(-1)[:] = bits[:n_cells]
+        self._flagged.reshape(-1)[:] = bits[n_cells:]
+        if snapshot.mf is not None:
+            self._mf = snapshot.mf
+        self.gamestate = snapshot.gamestate
+        self._mines_left = snapshot.mines_left
+        self._n_unopened = snapshot.n_unopened
+        self._n_revealed = snapshot.n_revealed
+        self._n_correct_flags = snapshot.n_correct_flags
+        self._last_opened = []
+        self._next_mines = None
+        self._sync_obs()
+
+    def clone(self) -> Self:
+        """
+        Copies the game, sharing the immutable minefield with it.
+
+        The clone continues with the same minefields in new games, and has no instrumentation.
+        """
+        other = copy.copy(self)
+        other._unopened = self._unopened.copy()
+        other._flagged = self._flagged.copy()
+        other._obs = self._obs.copy()
+        for name in ("_unopened", "_flagged", "_obs"):
+            view = getattr(other, name).view()
+            view.flags.writeable = False
+            setattr(other, f"{name}_view", view)
+        other._last_opened = list(self._last_opened)
+        # Copying the generator is costly, so it is copied once either game starts a new minefield
+        self._rng_shared = other._rng_shared = True
+        other._instrumentation = None
+        return other
 
     def _clamp_grid_specs(self):
         """Adjusts the parameters if needed to ensure a valid minefield"""
 
         self._n_mines = min(self._n_mines, self._width * self._height - 1)
 
+    def set_next_minefield(self, mines: NDArray):
+        """Uses the given boolean mine layout of shape (height, width) for the next game instead of generating one"""
+        if mines.shape != (self._height, self._width) or np.count_nonzero(mines) != self._n_mines:
+            raise ValueError(f"Mine layout of shape {mines.shape} doesn't match the grid specs.")
+        self._next_mines = mines
+
+    def set_board_source(self, source: Union[BoardSource, None]):
+        """
+        Takes the minefields of new games from the given source instead of generating them, e.g. NoGuessPool.take.
+
+        Args:
+            source: Called with the first click and returns a boolean mine layout of shape (height, width), which
+                must not have a mine at the first click. None generates the minefields again.
+        """
+        self._board_source = source
+
     def _new_minefield(self, x: int, y: int):
-        self._mf = MineField(self._width, self._height, self._n_mines, x, y, rnd_seed=self._rnd_seed)
-        if self._rnd_seed is not None:
-            self._rnd_seed += 1
+        start = time.perf_counter() if self._instrumentation is not None else 0.0
+
+        if self._next_mines is not None:
+            self._mf = MineField.from_mines(self._next_mines)
+            self._next_mines = None
+        elif self._board_source is not None:
+            self._mf = MineField.from_mines(self._board_source(x, y))
+        elif not self._legacy_seeding:
+            if self._rng_shared:
+                self._rng = copy.deepcopy(self._rng)
+                self._rng_shared = False
+            self._mf = MineField(self._width, self._height, self._n_mines, x, y, rng=self._rng)
+        else:
+            self._mf = MineField(
+                self._width, self._height, self._n_mines, x, y, rnd_seed=self._rnd_seed, legacy_seeding=True
+            )
+            if self._rnd_seed is not None:
+                self._rnd_seed += 1
+
+        if self._instrumentation is not None:
+            self._instrumentation.add_generation_time(time.perf_counter() - start)
 
     def get_grid(self) -> NDArray:
-        """Gives the minefield without the walls"""
+        """Gives the minefield without the walls as an array of CellState codes"""
         grid = self._mf.get_minefield()
         grid = grid[1:-1, 1:-1]
         return grid
@@ -62,223 +322,383 @@ class MinesweeperBase:
         self._mines_left = self._n_mines
         self._unopened.fill(True)
         self._flagged.fill(False)
+        self._obs.fill(_UNOPENED)
+        self._n_unopened = self._width * self._height
+        self._n_revealed = 0
+        self._n_correct_flags = 0
+        if self._instrumentation is not None:
+            self._instrumentation.new_game()
+
+    def _open_cell(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """Opens the given cell and the empty area around it. Returns the cells that were opened."""
+        opened = self._reveal(x, y)
+        if self._mf.get_minefield()[y + 1, x + 1] == _CELL_0:
+            if self._instrumentation is None:
+                opened += self._flood_fill(x, y)
+            else:
+                start = time.perf_counter()
+                opened += self._flood_fill(x, y)
+                self._instrumentation.add_flood_fill_time(time.perf_counter() - start)
+        return opened
 
-    def _open_cell(self, x: int, y: int):
-        self._reveal(x, y)
-        if self._mf.cell_at(x, y) == CellState.CELL_0:
-            _ = self._reveal_3x3(x, y)
-
-    def _reveal(self, x: int, y: int):
+    def _reveal(self, x: int, y: int) -> List[Tuple[int, int]]:
         """Reveal single cell"""
-        if not bool(self._unopened[y][x]):
-            return
-
-        self._unopened[y][x] = False
-        if self._mf.cell_at(x, y) == CellState.MINE:
+        if not self._unopened.item(y, x):
+            return []
+
+        code = self._mf.get_minefield().item(y + 1, x + 1)
+        self._unopened[y, x] = False
+        self._obs[y, x] = code
+        self._n_unopened -= 1
+        if code == _MINE:
             self.gamestate = GameState.LOST
+        else:
+            self._n_revealed += 1
+        return [(x, y)]
+
+    def _flood_fill(self, x: int, y: int) -> List[Tuple[int, int]]:
+        """
+        Blows open the connected area of empty cells containing the given empty cell, including its border.
 
-    def _reveal_3x3(self, x: int, y: int, checked: Union[index_set, None] = None) -> index_set:
-        """Recursively blow open the empty caverns"""
-        if checked is None:
-            checked = set()
+        Every empty cell is expanded only once, so the cost is linear in the amount of cells revealed.
+
+        Returns:
+            The cells that were opened.
+        """
+        grid = self._mf.get_minefield()
+        unopened = self._unopened
+        flagged = self._flagged
+        obs = self._obs
+        opened: List[Tuple[int, int]] = []
+
+        expanded = {(x, y)}
+        stack = [(x, y)]
+        while stack:
+            cx, cy = stack.pop()
+            for dx, dy in _NBR_OFFSETS:
+                i = cx + dx
+                j = cy + dy
+
+                code = grid.item(j + 1, i + 1)
+                if code == _WALL:
+                    continue
 
-        for i, j in self._nbr_inds(x, y):
-            self._unopened[j][i] = False
+                if unopened.item(j, i):
+                    unopened[j, i] = False
+                    # Flagged cells are opened as well, but their flags stay visible
+                    obs[j, i] = _FLAG if flagged.item(j, i) else code
+                    opened.append((i, j))
 
-        # Hop to neighbouring zero cell that hasn't been checked yet
-        for i, j in self._mf.get_nbr_inds_of_types(x, y, CellState.CELL_0):
-            if (i, j) not in checked:
-                checked.add((i, j))
-                checked |= self._reveal_3x3(i, j, checked)
+                # Hop to neighbouring empty cell that hasn't been expanded yet
+                if code == _CELL_0 and (i, j) not in expanded:
+                    expanded.add((i, j))
+                    stack.append((i, j))
 
-        return checked
+        # The border of an empty area never contains mines
+        self._n_unopened -= len(opened)
+        self._n_revealed += len(opened)
+        return opened
 
     def _toggle_flag(self, x: int, y: int):
         """Toggles the flag state of an unopened cell"""
-        if not self._flagged[y][x]:
-            self._flagged[y][x] = True
+        on_mine = self._mf.get_minefield().item(y + 1, x + 1) == _MINE
+        if not self._flagged.item(y, x):
+            self._flagged[y, x] = True
+            self._obs[y, x] = _FLAG
             self._mines_left -= 1
+            self._n_correct_flags += on_mine
         else:
-            self._flagged[y][x] = False
+            self._flagged[y, x] = False
+            self._obs[y, x] = _UNOPENED
             self._mines_left += 1
+            self._n_correct_flags -= on_mine
 
-    def _nbr_inds(self, x: int, y: int):
-        """Returns the indices of the non-wall neighbours of the given cell"""
-        res = set()
-        for dx, dy in product((-1, 0, 1), repeat=2):
-            i = x + dx
-            j = y + dy
-
-            if -1 in (i, j) or i == self._width or j == self._height:
-                continue
-            else:
-                res.add((i, j))
-        return res
+    def _check_if_won(self) -> bool:
+        if self._instrumentation is None:
+            return self._n_unopened == self._n_mines
 
-    def _check_if_won(self):
-        return len(np.transpose((self._unopened).nonzero())) == self._n_mines
+        start = time.perf_counter()
+        won = self._n_unopened == self._n_mines
+        self._instrumentation.add_win_check_time(time.perf_counter() - start)
+        return won
 
     def _handle_win(self):
         self.gamestate = GameState.WON
+        # Flags on cells a flood fill opened are dropped, so those cells show their numbers
+        dropped = self._flagged & ~self._unopened
+        if dropped.any():
+            self._obs[dropped] = self.get_grid()[dropped]
         self._flagged[:] = self._unopened[:]
+        self._obs[self._unopened] = _FLAG
         self._mines_left = 0
+        self._n_correct_flags = self._n_mines
 
     def _handle_loss(self):
         pass
 
-
-class MinesweeperHeadless(MinesweeperBase):
-    """Runs minesweeper without an user interface"""
-
-    def make_interaction(self, act: Interaction):
-        """Makes the given action"""
-
-        if act.action == Action.OPEN and self.gamestate in {GameState.PLAYING, GameState.NOT_STARTED}:
-            all_unnopened = not np.logical_not(self._unopened).any()
+    def _make_interaction(self, x: int, y: int, action: Action) -> bool:
+        """Makes the action. Returns False if it was ignored, e.g. an open of a flagged cell or a flag after a loss."""
+        self._last_opened = []
+        if action == Action.OPEN and self.gamestate in {GameState.PLAYING, GameState.NOT_STARTED}:
+            all_unnopened = self._n_unopened == self._width * self._height
 
             if self.gamestate == GameState.NOT_STARTED and all_unnopened:
                 self.gamestate = GameState.PLAYING
-                self._new_minefield(act.x, act.y)
+                self._new_minefield(x, y)
 
-            if not self._flagged[act.y][act.x]:
-                self._open_cell(act.x, act.y)
+            if self._flagged.item(y, x):
+                return False
+            self._last_opened = self._open_cell(x, y)
 
             if self.gamestate == GameState.LOST:
-                return
-
-            if self._check_if_won():
+                self._handle_loss()
+            elif self._check_if_won():
                 self._handle_win()
 
-        elif act.action == Action.FLAG and self.gamestate == GameState.PLAYING:
-            if self._unopened[act.y][act.x]:
-                self._toggle_flag(act.x, act.y)
+        elif action == Action.FLAG and self.gamestate == GameState.PLAYING:
+            if self._unopened.item(y, x):
+                self._toggle_flag(x, y)
 
-        elif act.action == Action.NEW_GAME:
+        elif action == Action.NEW_GAME:
             self._new_game()
 
+        else:
+            return False
+        return True
+
+
+class MinesweeperHeadless(MinesweeperBase):
+    """Runs minesweeper without an user interface"""
+
+    def make_interaction(self, act: Interaction):
+        """
+        Makes the given action.
+
+        Raises:
+            ValueError: If an open or a flag is outside of the minefield.
+        """
+        if act.action in _CELL_ACTIONS and not (0 <= act.x < self._width and 0 <= act.y < self._height):
+            raise ValueError(f"Out of bounds: x={act.x}, y={act.y}.")
+        if self._instrumentation is None:
+            self._make_interaction(act.x, act.y, act.action)
+            return
+
+        gamestate = self.gamestate
+        n_unopened = self._n_unopened
+        self._make_interaction(act.x, act.y, act.action)
+        self._instrumentation.record_action(self, act, max(n_unopened - self._n_unopened, 0), gamestate)
+
+    def make_interactions(self, acts: InteractionsLike, stop_on_loss: bool = True) -> NDArray:
+        """
+        Makes the given actions in order.
+
+        The actions are validated before any of them is made, so that invalid input leaves the game untouched.
+
+        Args:
+            acts: The actions as a structured array with the fields x, y and action, like INTERACTION_DTYPE, or a
+                sequence of Interactions or (x, y, action) tuples.
+            stop_on_loss: Stop after the action that loses a game. Replays of sessions that continue with new games
+                turn this off.
+
+        Returns:
+            A structured array of OUTCOME_DTYPE with one row per action made, which has the amount of cells the action
+            opened and the game state and the amount of mines left after it.
+        """
+        acts = as_interaction_array(acts)
+        xs, ys, codes = acts["x"], acts["y"], acts["action"]
+        if not np.isin(codes, _ACTION_CODES).all():
+            raise ValueError("Unknown actions.")
+        on_cell = (codes == Action.OPEN.value) | (codes == Action.FLAG.value)
+        if (on_cell & ((xs < 0) | (ys < 0) | (xs >= self._width) | (ys >= self._height))).any():
+            raise ValueError("Out of bounds actions.")
+
+        make_interaction = self._make_interaction if self._instrumentation is None else self._make_recorded_interaction
+        lost = GameState.LOST if stop_on_loss else None
+        rows: List[Tuple[int, GameState, int]] = []
+        for x, y, code in zip(xs.tolist(), ys.tolist(), codes.tolist()):
+            n_unopened = self._n_unopened
+            make_interaction(x, y, _ACTIONS[code])
+            rows.append((n_unopened - self._n_unopened, self.gamestate, self._mines_left))
+            if self.gamestate is lost:
+                break
+
+        outcomes = np.empty(len(rows), dtype=OUTCOME_DTYPE)
+        if rows:
+            n_opened, gamestates, mines_left = zip(*rows)
+            # New games close the cells again
+            outcomes["n_opened"] = np.maximum(n_opened, 0)
+            outcomes["gamestate"] = [gamestate.value for gamestate in gamestates]
+            outcomes["mines_left"] = mines_left
+        return outcomes
+
+    def _make_recorded_interaction(self, x: int, y: int, action: Action):
+        self.make_interaction(Interaction(x, y, action))
+
 
 class Minesweeper(MinesweeperBase):
     """Runs minesweeper with an user interface"""
 
-    def __init__(self, width: int, height: int, n_mines: int, rnd_seed: int | None = None, save_path=""):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        n_mines: int,
+        rnd_seed: int | None = None,
+        save_path="",
+        legacy_seeding: bool = False,
+        event_driven: bool = False,
+    ):
         """
         Args:
             width: The width of the minefield.
             height: The height of the minefield.
             n_mines: The amount of mines in the minefield.
             rnd_seed: An initial starting point for the seed used in random number generators.
-            save_path: Path to a folder, where gamedata will be stored. If not provided, nothing is saved.
+            save_path: Path to a folder, where the session is recorded into session.msr, replacing an earlier
+                recording. If not provided, nothing is saved.
+            legacy_seeding: Reproduce the minefields of the old seeding, where every game reseeded with rnd_seed + i.
+            event_driven: If True, the ui sleeps until there is input or the game state changes, instead of polling
+                at a fixed rate.
         """
-        super().__init__(width, height, n_mines, rnd_seed)
-        self._ui = None  # MinesweeperUI(width, height)
-        self._ui_grid = None
+        super().__init__(width, height, n_mines, rnd_seed, legacy_seeding)
+        self._ui: Union[UserInterface, None] = None
+        self._ui_class: Union[Callable[[int, int], UserInterface], None] = None
         self.fps = 60
+        self._event_driven = event_driven
 
         self._save_path = save_path
+        self._recorder: Union[SessionWriter, None] = None
+        # The seed the session starts with, as the legacy seeding changes it with every minefield
+        self._session_seed = self._rnd_seed
 
         self._running = False
-        self._interactions = Queue(maxsize=100)
+        # Inputs with their times, appended by the ui thread and taken by the game thread, which never blocks the ui
+        self._interactions: deque[Tuple[Interaction, float]] = deque()
+        self._input_event = Event()
+        self._frames = FrameBuffer((height, width), self._mines_left)
         self._redraw_event = Event()
 
-    def _new_game(self):
-        super()._new_game()
-        self._ui_grid = self._init_ui_grid()
-
-    def _init_ui_grid(self) -> NDArray:
-        return np.array(
-            [[CellState.UNOPENED for x in range(self._width)] for y in range(self._height)],
-            dtype=object,
-        )
+        # Input-to-screen latencies of the drawn frames
+        self._latencies: deque[float] = deque(maxlen=1000)
 
     def _save(self, act: Interaction, minefield: Union[NDArray, None] = None):
-        """Saves the grid state for testing reasons"""
+        """Records the action and the cells it changed, or the minefield of a new game, for testing reasons"""
         if not self._save_path:
             return
 
+        if self._recorder is None:
+            self._recorder = SessionWriter(
+                os.path.join(self._save_path, "session.msr"),
+                self._width,
+                self._height,
+                self._n_mines,
+                rnd_seed=self._session_seed,
+                legacy_seeding=self._legacy_seeding,
+            )
+
         if minefield is not None:
-            with open(os.path.join(self._save_path, f"minefield.npy"), "ab") as f:
-                np.save(f, minefield)
+            self._recorder.write_game(minefield == _MINE, act.x, act.y)
             return
 
-        with open(os.path.join(self._save_path, f"acts.txt"), "a") as f:
-            f.write(";".join([str(act.x), str(act.y), str(act.action.value)]) + "\n")
-
-        with open(os.path.join(self._save_path, f"states.npy"), "ab") as f:
-            np.save(f, self._unopened)
-            np.save(f, self._flagged)
+        self._recorder.write_action(act, self.gamestate, self._unopened, self._flagged)
 
-    def _get_interaction(self):
+    def _get_interaction(self, ui: UserInterface) -> Union[Interaction, None]:
         """Returns the next action to take"""
-        return self._ui.get_interaction()  # type: ignore
+        if self._event_driven:
+            return ui.wait_interaction()
+        return ui.get_interaction()
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Returns statistics of the time from an input to the frame showing its result, in milliseconds"""
+        if not self._latencies:
+            return {"n": 0}
+        latencies = np.array(self._latencies) * 1000
+        return {
+            "n": len(latencies),
+            "mean_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "max_ms": float(latencies.max()),
+        }
+
+    def _notify_ui(self):
+        """Tells the ui that the game state has changed"""
+        self._redraw_event.set()
+        if self._event_driven and self._ui is not None:
+            self._ui.wake()
 
     def run(self):
         """Starts the game"""
+        self._ui_class = _load_ui_class()
 
         # Run the ui in a separate thread
         t = Thread(target=self._update_ui, daemon=True)
         t.start()
 
         self._running = True
-        self._run()
+        try:
+            self._run()
+        finally:
+            if self._recorder is not None:
+                self._recorder.close()
+
+    def _send_interaction(self, act: Interaction):
+        """Passes an input from the ui thread to the game thread"""
+        self._interactions.append((act, time.perf_counter()))
+        self._input_event.set()
 
     def _update_ui(self):
         """Updates the ui"""
-        self._ui = MinesweeperUI(self._width, self._height)
-        self._ui_grid = self._init_ui_grid()
+        ui = self._ui = self._ui_class(self._width, self._height)  # type: ignore
+        # The ui draws its own copy of the latest frame, so the game thread is free to publish the next one
+        grid = np.empty((self._height, self._width), dtype=CELL_DTYPE)
+        version = -1
 
         while self._running:
-            act = self._get_interaction()
+            # Frames that were replaced before the ui got to them are skipped. The latest frame is drawn before waiting
+            # for input, so the window isn't blank at the start, and again when the ui lost what it showed.
+            frame = self._frames.read(grid, -1 if ui.invalidated else version)
+            if frame is not None:
+                version = frame.version
+                ui.draw_frame(grid, frame.gamestate, frame.mines_left)
+                if frame.input_time is not None:
+                    self._latencies.append(time.perf_counter() - frame.input_time)
+
+            # In event-driven mode this sleeps until there is input, or until the game thread wakes the ui up once the
+            # state has changed
+            act = self._get_interaction(ui)
             if act is not None:
                 if act.action == Action.EXIT:
                     self._running = False
-                self._interactions.put(act)
-            self._ui.draw_frame(self._ui_grid, self.gamestate, self._mines_left)
-            self._redraw_event.wait(timeout=1 / self.fps)
-            self._redraw_event.clear()
+                self._send_interaction(act)
 
-    def _run(self):
-        """The gameloop"""
-
-        minefield = None
+            if not self._event_driven:
+                self._redraw_event.wait(timeout=1 / self.fps)
+                self._redraw_event.clear()
 
+    def _run(self):
+        """The gameloop, which makes all inputs that have arrived and then publishes a single frame"""
         while self._running:
-            act = self._interactions.get()
+            self._input_event.wait()
+            self._input_event.clear()
 
-            if self.gamestate == GameState.LOST and act.action != Action.NEW_GAME:
-                continue
+            input_time = None
+            while self._interactions:
+                act, act_time = self._interactions.popleft()
+                if self._apply_interaction(act) and input_time is None:
+                    input_time = act_time
 
-            if act.action == Action.OPEN and self.gamestate != GameState.LOST:
-                all_unnopened = not np.logical_not(self._unopened).any()
+            if input_time is not None:
+                self._frames.publish(self._obs, self.gamestate, self._mines_left, input_time)
+                self._notify_ui()
 
-                if self.gamestate == GameState.NOT_STARTED and all_unnopened:
-                    self.gamestate = GameState.PLAYING
-                    self._new_minefield(act.x, act.y)
-                    minefield = self.get_grid()
-                    self._save(act, minefield)
-
-                elif self._flagged[act.y][act.x]:
-                    continue
-
-                self._open_cell(act.x, act.y)
-
-                if self.gamestate == GameState.LOST:
-                    self._handle_loss()
-                elif self._check_if_won():
-                    self._handle_win()
-
-            elif act.action == Action.FLAG and self.gamestate == GameState.PLAYING:
-                if self._unopened[act.y][act.x]:
-                    self._toggle_flag(act.x, act.y)
-
-            elif act.action == Action.NEW_GAME:
-                self._new_game()
-
-            else:
-                continue
-
-            self._save(act)
-
-            self._ui_grid = np.where(self._unopened, CellState.UNOPENED, minefield)  # type: ignore
-            self._ui_grid = np.where(self._flagged, CellState.FLAG, self._ui_grid)  # type: ignore
-
-            self._redraw_event.set()
+    def _new_minefield(self, x: int, y: int):
+        super()._new_minefield(x, y)
+        self._save(Interaction(x, y, Action.OPEN), self.get_grid())
+
+    def _apply_interaction(self, act: Interaction) -> bool:
+        """Makes the action and records it. Returns False if it was ignored."""
+        if not self._make_interaction(act.x, act.y, act.action):
+            return False
+        self._save(act)
+        return True
@@ -1,7 +1,8 @@
 import os
-from typing import Tuple, Union
+from typing import Dict, List, Tuple, Union
+import numpy as np
 from numpy.typing import NDArray
-from .utils import Action, GameState, Interaction
+from .utils import Action, CellState, GameState, Interaction
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"  # Silence the stupid pygame import print...
 import pygame
@@ -21,6 +22,11 @@ class MinesweeperUI:
 
         self._block_size = self._images[str(0)].get_height()
 
+        # Images indexed by the CellState codes of the visible grid, codes without an image show the grid background
+        blank = pygame.Surface((self._block_size, self._block_size))
+        blank.fill((132, 132, 132))
+        self._tiles: List[pygame.Surface] = [self._images.get(self._image_name(state), blank) for state in CellState]
+
         self._screen_width = (width + 2) * self._block_size
         self._screen_height = (height + 3) * self._block_size
         self._click_location = (-1, -1)
@@ -28,6 +34,27 @@ class MinesweeperUI:
 
         self._screen = pygame.display.set_mode((self._screen_width, self._screen_height))
 
+        # State of the previous frame, only the parts that differ from it are drawn
+        self._prev_grid: Union[NDArray, None] = None
+        self._prev_hud: Union[Tuple[GameState, int], None] = None
+        self._hud_rect = pygame.Rect(0, 0, self._screen_width, 2 * self._block_size)
+        self._text_cache: Dict[Tuple[int, str, Tuple[int, int, int]], pygame.Surface] = {}
+        # The cached texts that only the current game uses, which are dropped on a new game
+        self._game_texts: List[Tuple[int, str, Tuple[int, int, int]]] = []
+
+        # Posted by other threads to wake up wait_interaction, other unused events are not queued at all
+        self._wake_event_type = pygame.event.custom_type()
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(
+            [pygame.QUIT, pygame.MOUSEBUTTONUP, pygame.KEYDOWN, pygame.WINDOWEXPOSED, self._wake_event_type]
+        )
+
+    @staticmethod
+    def _image_name(state: CellState) -> str:
+        """Returns the name of the image file used for the given cell state"""
+        code = state.num()
+        return str(code) if code < 9 else str(state)
+
     def _map_pos_to_gridpoint(self, x: int, y: int) -> Tuple[int, int]:
         """Returns the cell coordinates from pixel coordinates"""
         i = j = -1
@@ -39,14 +66,31 @@ class MinesweeperUI:
 
         return i, j
 
-    def _render_text(self, mines_left: int):
-        """Renders the text that are visible on every frame"""
+    def _text(
+        self, font: pygame.font.Font, text: str, color: Tuple[int, int, int], per_game: bool = False
+    ) -> pygame.Surface:
+        """
+        Renders the text, reusing the surface if the same text has been rendered before.
+
+        Args:
+            per_game: The text is only kept until a new game starts, e.g. the amount of mines left.
+        """
+        key = (id(font), text, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            surface = self._text_cache[key] = font.render(text, True, color)
+            if per_game:
+                self._game_texts.append(key)
+        return surface
+
+    def _render_text(self, gamestate: GameState, mines_left: int):
+        """Renders the texts above the grid"""
 
         color = (19, 120, 161)
 
-        instructions_esc = self._font_small.render("Quit the game: esc", True, color)
-        instructions_space = self._font_small.render("New game: space", True, color)
-        mines_left_text = self._font_big.render(f"{mines_left}", True, color)
+        instructions_esc = self._text(self._font_small, "Quit the game: esc", color)
+        instructions_space = self._text(self._font_small, "New game: space", color)
+        mines_left_text = self._text(self._font_big, f"{mines_left}", color, per_game=True)
 
         self._screen.blit(instructions_esc, (self._block_size, 0))
         self._screen.blit(instructions_space, (self._block_size, self._block_size))
@@ -55,50 +99,103 @@ class MinesweeperUI:
             (self._screen_width - mines_left_text.get_width() - self._block_size, 0),
         )
 
-    def draw_frame(self, visible_grid: NDArray, gamestate: GameState, mines: int):
-        """Draws one frame with the given parameters"""
-
-        self._screen.fill((10, 0, 0))
-        grid_background = (self._block_size, 2 * self._block_size, *self._grid_size_px)
-        self._screen.fill((132, 132, 132), grid_background)
-
-        self._render_text(mines)
-
         if gamestate == GameState.LOST:
-            lost_text = self._font_big.render("GAME OVER", True, (160, 20, 20))
+            lost_text = self._text(self._font_big, "GAME OVER", (160, 20, 20))
             self._screen.blit(lost_text, ((self._screen_width - lost_text.get_width()) // 2, 0))
         if gamestate == GameState.WON:
-            lost_text = self._font_big.render("WIN", True, (19, 161, 69))
+            lost_text = self._text(self._font_big, "WIN", (19, 161, 69))
             self._screen.blit(lost_text, ((self._screen_width - lost_text.get_width()) // 2, 0))
 
-        for j, row in enumerate(visible_grid):
-            for i, value in enumerate(row):
-                key = value.num()
-                if key >= 9:
-                    key = value
-                self._screen.blit(self._images[str(key)], ((1 + i) * self._block_size, (2 + j) * self._block_size))
+    def _draw_hud(self, gamestate: GameState, mines: int) -> pygame.Rect:
+        """Redraws the area above the grid, without letting the texts overflow to the grid"""
+        self._screen.set_clip(self._hud_rect)
+        self._screen.fill((10, 0, 0), self._hud_rect)
+        self._render_text(gamestate, mines)
+        self._screen.set_clip(None)
+        return self._hud_rect
+
+    def _draw_cells(self, visible_grid: NDArray, cells: NDArray) -> List[pygame.Rect]:
+        """Draws the given (y, x) cells of the grid"""
+        rects = []
+        for j, i in cells.tolist():
+            pos = ((1 + i) * self._block_size, (2 + j) * self._block_size)
+            rects.append(self._screen.blit(self._tiles[visible_grid[j, i]], pos))
+        return rects
+
+    @property
+    def invalidated(self) -> bool:
+        """Tells if the next frame redraws the whole screen"""
+        return self._prev_grid is None
+
+    def invalidate(self):
+        """Makes the next frame redraw the whole screen"""
+        self._prev_grid = None
+        self._prev_hud = None
 
-        pygame.display.flip()
+    def draw_frame(self, visible_grid: NDArray, gamestate: GameState, mines: int):
+        """Draws one frame with the given parameters, updating only the parts of the screen that changed"""
+
+        if self._prev_grid is None or self._prev_grid.shape != visible_grid.shape:
+            self._screen.fill((10, 0, 0))
+            grid_background = (self._block_size, 2 * self._block_size, *self._grid_size_px)
+            self._screen.fill((132, 132, 132), grid_background)
+
+            self._draw_hud(gamestate, mines)
+            self._draw_cells(visible_grid, np.argwhere(np.ones(visible_grid.shape, dtype=np.bool)))
+            pygame.display.flip()
+        else:
+            rects = self._draw_cells(visible_grid, np.argwhere(visible_grid != self._prev_grid))
+            if gamestate == GameState.NOT_STARTED and self._prev_hud[0] != GameState.NOT_STARTED:  # type: ignore
+                # A new game, the amounts of mines left of the old one are rendered again when they are needed
+                for key in self._game_texts:
+                    del self._text_cache[key]
+                self._game_texts.clear()
+            if (gamestate, mines) != self._prev_hud:
+                rects.append(self._draw_hud(gamestate, mines))
+            if rects:
+                pygame.display.update(rects)
+
+        self._prev_grid = visible_grid.copy()
+        self._prev_hud = (gamestate, mines)
 
     def get_interaction(self) -> Union[Interaction, None]:
         """Catches mouse and keyboard events and translates them into instances of the Interaction class"""
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # The window is closed
+            act = self._translate_event(event)
+            if act is not None:
+                return act
+
+    def wait_interaction(self) -> Union[Interaction, None]:
+        """Blocks until the next event. Returns None if the event was not an interaction, e.g. a wake-up."""
+        return self._translate_event(pygame.event.wait())
+
+    def wake(self):
+        """Wakes up a call to wait_interaction, can be called from any thread"""
+        pygame.event.post(pygame.event.Event(self._wake_event_type))
+
+    def _translate_event(self, event: pygame.event.Event) -> Union[Interaction, None]:
+        """Translates a mouse or keyboard event into an instance of the Interaction class"""
+        if event.type == pygame.QUIT:  # The window is closed
+            return Interaction(-1, -1, Action.EXIT)
+
+        if event.type == pygame.WINDOWEXPOSED:  # The contents of the window may have been lost
+            self.invalidate()
+
+        if event.type == pygame.MOUSEBUTTONUP:
+            x, y = self._map_pos_to_gridpoint(*event.pos)
+            if -1 in {x, y}:
+                return None
+            if event.button == 1:
+                return Interaction(x, y, Action.OPEN)
+            elif event.button == 3:
+                return Interaction(x, y, Action.FLAG)
+
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
                 return Interaction(-1, -1, Action.EXIT)
 
-            if event.type == pygame.MOUSEBUTTONUP:
-                x, y = self._map_pos_to_gridpoint(*event.pos)
-                if -1 in {x, y}:
-                    continue
-                if event.button == 1:
-                    return Interaction(x, y, Action.OPEN)
-                elif event.button == 3:
-                    return Interaction(x, y, Action.FLAG)
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    return Interaction(-1, -1, Action.EXIT)
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    return Interaction(-1, -1, Action.NEW_GAME)
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                return Interaction(-1, -1, Action.NEW_GAME)
+
+        return None
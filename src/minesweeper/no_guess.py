@@ -0,0 +1,386 @@
+"""
+Boards that can be solved from the first click by deduction alone, and a pool of them generated in the background.
+
+Generating such a board means generating boards until the solver wins one without a guess, which takes many attempts
+on dense boards. The pool keeps ready boards in files per grid spec and start cell, so that a game can start at once.
+A board made for one start cell also fits every other first click in the empty area around the start, as that click
+opens the same cells, so boards are generated for start cells spread over the grid and looked up by the first click.
+
+A pool file has a fixed-size header, the amount of boards in it and a fixed amount of board slots, each of which holds
+a mine layout bit-packed in row-major order. All values are little-endian, and the file is used through a memory map.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+import logging
+import mmap
+import os
+import struct
+from threading import Event, Lock, Thread
+from typing import Dict, Iterable, List, Set, Tuple, Union
+import numpy as np
+from numpy.typing import NDArray
+from .batch import label_empty_areas
+from .minefield import MineField
+from .minesweeper_ import MinesweeperHeadless
+from .solver import Solver
+from .utils import Action, CellState, GameState, Interaction
+
+MAGIC = b"MSWPPOOL"
+VERSION = 1
+
+# magic, version, width, height, n_mines, x, y, capacity
+_HEADER = struct.Struct("<8sHIIIiiI")
+_COUNT = struct.Struct("<I")
+
+_MINE = CellState.MINE.num()
+
+type StartCell = Tuple[int, int]
+
+logger = logging.getLogger(__name__)
+
+
+def is_no_guess(mines: NDArray, x: int, y: int) -> bool:
+    """Tells if the solver wins the boolean mine layout from the given first click without guessing"""
+    height, width = mines.shape
+    game = MinesweeperHeadless(width, height, int(np.count_nonzero(mines)))
+    game.set_next_minefield(mines)
+    game.make_interaction(Interaction(x, y, Action.OPEN))
+    solver = Solver(game)
+    while game.gamestate == GameState.PLAYING:
+        if not solver.safe_cells() or not solver.step():
+            return False
+    return game.gamestate == GameState.WON
+
+
+def generate_no_guess(
+    width: int,
+    height: int,
+    n_mines: int,
+    x: int,
+    y: int,
+    rng: Union[np.random.Generator, None] = None,
+    max_attempts: int = 10_000,
+) -> NDArray:
+    """
+    Generates boards until one can be solved from the first click without guessing.
+
+    Args:
+        width: The width of the minefield.
+        height: The height of the minefield.
+        n_mines: The amount of mines in the minefield.
+        x: The x coordinate of the first click.
+        y: The y coordinate of the first click.
+        rng: The random number generator used to place the mines.
+        max_attempts: The amount of boards tried before giving up with a RuntimeError.
+
+    Returns:
+        The boolean mine layout of shape (height, width).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    for _ in range(max_attempts):
+        mines = MineField(width, height, n_mines, x, y, rng=rng).get_minefield()[1:-1, 1:-1] == _MINE
+        if is_no_guess(mines, x, y):
+            return mines
+    raise RuntimeError(f"No board without guessing found in {max_attempts} attempts.")
+
+
+def _generate(
+    width: int, height: int, n_mines: int, x: int, y: int, entropy: int, index: int, max_attempts: int
+) -> bytes:
+    """Generates a board in a worker process, seeded from the root entropy and the index of the board"""
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(index,)))
+    return np.packbits(generate_no_guess(width, height, n_mines, x, y, rng, max_attempts)).tobytes()
+
+
+def empty_areas(mines: NDArray) -> NDArray:
+    """
+    Labels the areas of empty cells, that have no mine in their 3x3 neighbourhood, in a stack of mine layouts.
+
+    Returns:
+        The labels of label_empty_areas, of the same shape as the layouts of shape (n, height, width).
+    """
+    n, height, width = mines.shape
+    padded = np.zeros((n, height + 2, width + 2), dtype=np.bool)
+    padded[:, 1:-1, 1:-1] = mines
+    near = np.zeros_like(mines)
+    for dy in range(3):
+        for dx in range(3):
+            near |= padded[:, dy : dy + height, dx : dx + width]
+    return label_empty_areas(~near)
+
+
+def default_starts(width: int, height: int, spacing: int = 3) -> List[StartCell]:
+    """Start cells on a lattice over the top left quarter of the grid, one per area of spacing x spacing cells"""
+    xs = range(min(spacing // 2, (width - 1) // 2), (width + 1) // 2, spacing)
+    ys = range(min(spacing // 2, (height - 1) // 2), (height + 1) // 2, spacing)
+    return [(x, y) for y in ys for x in xs]
+
+
+class BoardFile:
+    """A stack of mine layouts with the same grid specs and start cell, kept in a memory mapped file"""
+
+    def __init__(
+        self, path: Union[str, os.PathLike], width: int, height: int, n_mines: int, x: int, y: int, capacity: int = 64
+    ):
+        """
+        Args:
+            path: The file of the boards. An existing file is opened and must have the same specs.
+            width: The width of the boards.
+            height: The height of the boards.
+            n_mines: The amount of mines of the boards.
+            x: The x coordinate of the first click the boards are made for.
+            y: The y coordinate of the first click.
+            capacity: The amount of boards the file holds, if it is created.
+        """
+        self._shape = (height, width)
+        self._record_size = -(-width * height // 8)
+        self._offset = _HEADER.size + _COUNT.size
+
+        if os.path.exists(path):
+            self._file = open(path, "r+b")
+            header = _HEADER.unpack(self._file.read(_HEADER.size))
+            if header[:2] != (MAGIC, VERSION) or header[2:7] != (width, height, n_mines, x, y):
+                self._file.close()
+                raise ValueError(f"{path} is not a board file of {width}x{height} with {n_mines} mines from {x},{y}.")
+            capacity = header[7]
+        else:
+            self._file = open(path, "w+b")
+            self._file.write(_HEADER.pack(MAGIC, VERSION, width, height, n_mines, x, y, capacity))
+            self._file.write(_COUNT.pack(0))
+            self._file.truncate(self._offset + capacity * self._record_size)
+
+        self.capacity = capacity
+        self._mm = mmap.mmap(self._file.fileno(), self._offset + capacity * self._record_size)
+        (self._n_boards,) = _COUNT.unpack_from(self._mm, _HEADER.size)
+
+    def __len__(self) -> int:
+        return self._n_boards
+
+    def push(self, mines: NDArray) -> bool:
+        """Adds a boolean mine layout. Returns False if the file is full."""
+        if self._n_boards == self.capacity:
+            return False
+        start = self._offset + self._n_boards * self._record_size
+        self._mm[start : start + self._record_size] = np.packbits(mines).tobytes()
+        self._n_boards += 1
+        _COUNT.pack_into(self._mm, _HEADER.size, self._n_boards)
+        return True
+
+    def boards(self) -> NDArray:
+        """Returns all mine layouts, of shape (n, height, width)"""
+        end = self._offset + self._n_boards * self._record_size
+        bits = np.frombuffer(self._mm[self._offset : end], dtype=np.uint8).reshape(self._n_boards, self._record_size)
+        n_cells = self._shape[0] * self._shape[1]
+        return np.unpackbits(bits, axis=1, count=n_cells).astype(np.bool).reshape(self._n_boards, *self._shape)
+
+    def remove(self, i: int) -> NDArray:
+        """Removes the mine layout at the given index and returns it, moving the last layout into its place"""
+        if not 0 <= i < self._n_boards:
+            raise IndexError(f"No board {i} in a file of {self._n_boards} boards.")
+        start = self._offset + i * self._record_size
+        bits = np.frombuffer(self._mm[start : start + self._record_size], dtype=np.uint8)
+        self._n_boards -= 1
+        last = self._offset + self._n_boards * self._record_size
+        self._mm[start : start + self._record_size] = self._mm[last : last + self._record_size]
+        _COUNT.pack_into(self._mm, _HEADER.size, self._n_boards)
+        return np.unpackbits(bits, count=self._shape[0] * self._shape[1]).astype(np.bool).reshape(self._shape)
+
+    def pop(self) -> Union[NDArray, None]:
+        """Removes the most recently added mine layout and returns it, None if the file is empty"""
+        if not self._n_boards:
+            return None
+        return self.remove(self._n_boards - 1)
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+
+class NoGuessPool:
+    """
+    Boards without guessing for one grid spec, generated by background processes and kept in files per start cell.
+
+    A board that can be solved from a cell can also be solved from the mirrored cell when it is mirrored, so the boards
+    are only generated for start cells in the top left quarter of the grid. A first click takes a board, in any of its
+    mirrored forms, whose start lies in the same empty area as the click. Only if there is none, a board is generated
+    right away, and if that fails too, the game gets an ordinary board.
+    """
+
+    def __init__(
+        self,
+        folder: Union[str, os.PathLike],
+        width: int,
+        height: int,
+        n_mines: int,
+        capacity: int = 16,
+        workers: int = 1,
+        starts: Union[Iterable[StartCell], None] = None,
+        seed: Union[int, None] = None,
+        max_attempts: int = 10_000,
+    ):
+        """
+        Args:
+            folder: The folder of the board files, which is created if needed.
+            width: The width of the minefields.
+            height: The height of the minefields.
+            n_mines: The amount of mines.
+            capacity: The amount of boards kept per start cell.
+            workers: The amount of background processes.
+            starts: The start cells to generate boards for, a lattice over the grid by default, see default_starts.
+            seed: The root seed of the generated boards, random if not given.
+            max_attempts: The amount of boards tried per board without guessing, before the generation gives up.
+        """
+        os.makedirs(folder, exist_ok=True)
+        self._folder = folder
+        self._width = width
+        self._height = height
+        self._n_mines = min(n_mines, width * height - 1)
+        self._capacity = capacity
+        self._workers = workers
+        self._max_attempts = max_attempts
+        self._entropy = int(np.random.SeedSequence(seed).entropy)  # type: ignore
+        self._rng = np.random.default_rng(np.random.SeedSequence(self._entropy, spawn_key=(0,)))
+        self._n_submitted = 0
+
+        self._lock = Lock()
+        self._wake = Event()
+        self._closed = Event()
+        self._files: Dict[StartCell, BoardFile] = {}
+        for x, y in starts if starts is not None else default_starts(width, height):
+            self._board_file(self._canonical(x, y))
+        self._thread: Union[Thread, None] = None
+
+    def _canonical(self, x: int, y: int) -> StartCell:
+        return min(x, self._width - 1 - x), min(y, self._height - 1 - y)
+
+    def _board_file(self, start: StartCell) -> BoardFile:
+        board_file = self._files.get(start)
+        if board_file is None:
+            name = f"{self._width}x{self._height}x{self._n_mines}_{start[0]}_{start[1]}.bin"
+            board_file = BoardFile(
+                os.path.join(self._folder, name), self._width, self._height, self._n_mines, *start, self._capacity
+            )
+            self._files[start] = board_file
+        return board_file
+
+    def __len__(self) -> int:
+        """The amount of ready boards for all start cells"""
+        with self._lock:
+            return sum(len(board_file) for board_file in self._files.values())
+
+    def start(self):
+        """Starts filling the pool in the background"""
+        if self._thread is None:
+            self._thread = Thread(target=self._fill, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stops the background generation and closes the files, keeping the ready boards for later"""
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            for board_file in self._files.values():
+                board_file.close()
+            self._files.clear()
+
+    def __enter__(self) -> "NoGuessPool":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def take(self, x: int, y: int) -> NDArray:
+        """
+        Returns a boolean mine layout for the given first click, which can be solved without guessing if possible.
+
+        A ready board is used if one fits the click, otherwise one is generated right away. If that fails, an ordinary
+        board is returned.
+        """
+        with self._lock:
+            mines = self._find_board(x, y)
+        self._wake.set()
+        if mines is not None:
+            return mines
+
+        specs = (self._width, self._height, self._n_mines, x, y)
+        try:
+            return generate_no_guess(*specs, rng=self._rng, max_attempts=self._max_attempts)
+        except RuntimeError:
+            logger.warning("No board without guessing found for %d,%d, using an ordinary board.", x, y)
+            return MineField(*specs, rng=self._rng).get_minefield()[1:-1, 1:-1] == _MINE
+
+    def _find_board(self, x: int, y: int) -> Union[NDArray, None]:
+        """Removes a ready board whose start is in the same empty area as the click, mirrored to match it"""
+        # The boards made for the click itself are tried first
+        canonical = self._canonical(x, y)
+        for start, board_file in sorted(self._files.items(), key=lambda item: item[0] != canonical):
+            if not len(board_file):
+                continue
+            labels = empty_areas(board_file.boards())
+            start_labels = labels[:, start[1], start[0]]
+            for fx, fy in ((False, False), (True, False), (False, True), (True, True)):
+                # The click in the frame of the stored boards, which are mirrored back afterwards
+                cx, cy = self._mirror(x, y, fx, fy)
+                fits = np.flatnonzero((labels[:, cy, cx] == start_labels) & (start_labels < self._width * self._height))
+                if len(fits):
+                    mines = board_file.remove(int(fits[0]))
+                    return np.ascontiguousarray(mines[:: -1 if fy else 1, :: -1 if fx else 1])
+        return None
+
+    def _mirror(self, x: int, y: int, fx: bool, fy: bool) -> StartCell:
+        return (self._width - 1 - x if fx else x), (self._height - 1 - y if fy else y)
+
+    def _fill(self):
+        """Fills the pool until it is closed, starting over with new processes if the workers break"""
+        while not self._closed.is_set():
+            try:
+                self._fill_with_workers()
+            except Exception:
+                logger.exception("Generating boards without guessing failed, restarting the workers.")
+                self._closed.wait(1.0)
+
+    def _fill_with_workers(self):
+        """Keeps a few boards per worker in generation for the start cells whose files aren't full"""
+        pending: Dict[Future, StartCell] = {}
+        in_flight: Dict[StartCell, int] = {}
+        with ProcessPoolExecutor(self._workers) as executor:
+            while not self._closed.is_set():
+                with self._lock:
+                    for start, board_file in self._files.items():
+                        while len(pending) < 2 * self._workers and (
+                            len(board_file) + in_flight.get(start, 0) < self._capacity
+                        ):
+                            self._n_submitted += 1
+                            specs = (self._width, self._height, self._n_mines)
+                            seed = (self._entropy, self._n_submitted, self._max_attempts)
+                            future = executor.submit(_generate, *specs, *start, *seed)
+                            pending[future] = start
+                            in_flight[start] = in_flight.get(start, 0) + 1
+
+                if not pending:
+                    self._wake.wait()
+                    self._wake.clear()
+                    continue
+
+                done: Set[Future]
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start = pending.pop(future)
+                    in_flight[start] -= 1
+                    try:
+                        bits = np.frombuffer(future.result(), dtype=np.uint8)
+                    except RuntimeError as e:
+                        # Only this board failed, it is tried again with another seed
+                        logger.warning("Generating a board without guessing from %d,%d failed: %s", *start, e)
+                        continue
+                    mines = np.unpackbits(bits, count=self._width * self._height).astype(np.bool)
+                    with self._lock:
+                        if start in self._files:
+                            self._files[start].push(mines.reshape(self._height, self._width))
+
+            for future in pending:
+                future.cancel()
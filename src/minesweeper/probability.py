@@ -0,0 +1,348 @@
+from collections import OrderedDict
+from itertools import product
+from math import lgamma
+import time
+from typing import Dict, List, NamedTuple, Tuple, Union
+import numpy as np
+from numpy.typing import NDArray
+from .minefield import count_neighbour_mines
+from .minesweeper_ import MinesweeperHeadless
+from .utils import GameState
+
+_NBR_OFFSETS = tuple(product((-1, 0, 1), repeat=2))
+
+type _Constraint = Tuple[Tuple[int, ...], int]
+# The flat indices of the unopened neighbours of a number on the board and the number
+type _BoardConstraint = Tuple[List[int], int]
+type _ShapeKey = Tuple[Tuple[Tuple[int, int], ...], Tuple[_Constraint, ...]]
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class ComponentResult(NamedTuple):
+    """
+    The configurations of a frontier component by their amount of mines, relative to the most frequent amount.
+
+    counts[k] is the relative number of configurations with k mines and mine_counts[k, i] the relative number of those
+    with a mine in cell i.
+    """
+
+    counts: NDArray
+    mine_counts: NDArray
+    exact: bool
+
+
+def _bfs_order(n_cells: int, constraints: Tuple[_Constraint, ...]) -> List[int]:
+    """Orders the cells along the constraints, which keeps few constraints open at a time during the enumeration"""
+    neighbours: List[List[int]] = [[] for _ in range(n_cells)]
+    for cells, _ in constraints:
+        for i in cells:
+            neighbours[i].extend(cells)
+
+    order = []
+    seen = [False] * n_cells
+    for start in range(n_cells):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = [start]
+        for i in queue:
+            order.append(i)
+            for n in neighbours[i]:
+                if not seen[n]:
+                    seen[n] = True
+                    queue.append(n)
+    return order
+
+
+def enumerate_component(
+    n_cells: int, constraints: Tuple[_Constraint, ...], max_states: int = 20_000, deadline: float = float("inf")
+) -> ComponentResult:
+    """
+    Counts the mine configurations of the cells that satisfy all constraints, by their amount of mines.
+
+    The cells are assigned one after another. Once a constraint has no unassigned cells left, it is checked, so the
+    state of the enumeration after i cells is the remaining mines of the open constraints. Equal states are solved only
+    once.
+
+    Args:
+        n_cells: The amount of cells.
+        constraints: Pairs of cell indices and the amount of mines among them.
+        max_states: The enumeration gives up after this many distinct states.
+        deadline: The enumeration gives up after this perf_counter() time.
+
+    Raises:
+        _BudgetExceeded: If the budget ran out.
+    """
+    order = _bfs_order(n_cells, constraints)
+    position = {cell: i for i, cell in enumerate(order)}
+
+    # For every position, the constraints of its cell and how many of their cells come after it
+    cell_constraints: List[List[Tuple[int, int]]] = [[] for _ in range(n_cells)]
+    first = []
+    last = []
+    for c, (cells, _) in enumerate(constraints):
+        positions = sorted(position[i] for i in cells)
+        for n_after, p in enumerate(reversed(positions)):
+            cell_constraints[p].append((c, n_after))
+        first.append(positions[0])
+        last.append(positions[-1])
+
+    # The constraints that have assigned and unassigned cells before every position
+    starts: List[List[int]] = [[] for _ in range(n_cells + 1)]
+    for c in range(len(constraints)):
+        if first[c] < last[c]:
+            starts[first[c] + 1].append(c)
+    active = []
+    current: Dict[int, None] = {}
+    for i in range(n_cells + 1):
+        for c in starts[i]:
+            current[c] = None
+        active.append(tuple(c for c in current if last[c] >= i))
+        current = dict.fromkeys(active[-1])
+
+    needs = [value for _, value in constraints]
+    memo: Dict[Tuple[int, Tuple[int, ...]], Tuple[NDArray, NDArray]] = {}
+
+    def solve(i: int) -> Tuple[NDArray, NDArray]:
+        if i == n_cells:
+            return np.ones(1), np.zeros((1, 0))
+        key = (i, tuple([needs[c] for c in active[i]]))
+        result = memo.get(key)
+        if result is not None:
+            return result
+        if len(memo) >= max_states or (len(memo) & 255 == 0 and time.perf_counter() > deadline):
+            raise _BudgetExceeded
+
+        n_rest = n_cells - i
+        counts = np.zeros(n_rest + 1)
+        mine_counts = np.zeros((n_rest + 1, n_rest))
+        n_k = 1
+        for mine in (0, 1):
+            valid = True
+            for c, n_after in cell_constraints[i]:
+                needs[c] -= mine
+                valid = valid and 0 <= needs[c] <= n_after
+            if valid:
+                child_counts, child_mine_counts = solve(i + 1)
+                k = len(child_counts)
+                counts[mine : mine + k] += child_counts
+                mine_counts[mine : mine + k, 1:] += child_mine_counts
+                if mine:
+                    mine_counts[1 : 1 + k, 0] += child_counts
+                n_k = max(n_k, mine + k)
+            for c, _ in cell_constraints[i]:
+                needs[c] += mine
+
+        result = counts[:n_k], mine_counts[:n_k]
+        memo[key] = result
+        return result
+
+    counts, mine_counts = solve(0)
+    scale = counts.max()
+    if scale == 0:
+        raise ValueError("The constraints can't be satisfied.")
+
+    # Back from the enumeration order to the order of the cells
+    return ComponentResult(counts / scale, mine_counts[:, [position[i] for i in range(n_cells)]] / scale, True)
+
+
+def _approximate_component(n_cells: int, constraints: Tuple[_Constraint, ...]) -> ComponentResult:
+    """Averages the mine density of the constraints of every cell, as if the cells were independent"""
+    density = np.zeros(n_cells)
+    n_constraints = np.zeros(n_cells)
+    for cells, value in constraints:
+        density[list(cells)] += value / len(cells)
+        n_constraints[list(cells)] += 1
+    probabilities = density / np.maximum(n_constraints, 1)
+    k = int(round(probabilities.sum()))
+    counts = np.zeros(k + 1)
+    counts[k] = 1.0
+    mine_counts = np.zeros((k + 1, n_cells))
+    mine_counts[k] = probabilities
+    return ComponentResult(counts, mine_counts, False)
+
+
+class ProbabilityEngine:
+    """
+    Computes the exact probability of a mine in every cell of a headless game from its visible state.
+
+    The unopened cells next to numbers form the frontier, which is split into components that share no numbers. The
+    configurations of every component are enumerated separately and combined with the amount of mines left, where each
+    combination is weighted by the number of ways to place the remaining mines in the cells away from the frontier.
+
+    Components with the same shape, which recur often as the frontier changes little between moves, are taken from a
+    cache. Components exceeding the budget are estimated from the densities of their numbers instead.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 1024,
+        max_states: int = 20_000,
+        max_component_cells: int = 400,
+        time_budget: Union[float, None] = None,
+    ):
+        """
+        Args:
+            cache_size: The amount of component shapes whose results are kept.
+            max_states: The maximum amount of enumeration states of a single component.
+            max_component_cells: Larger components are estimated without enumerating them.
+            time_budget: Seconds one call may spend enumerating, after which the remaining components are estimated.
+        """
+        self._cache: OrderedDict[_ShapeKey, ComponentResult] = OrderedDict()
+        self._cache_size = cache_size
+        self._max_states = max_states
+        self._max_component_cells = max_component_cells
+        self._time_budget = time_budget
+        self.exact = True
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _frontier_components(self, game: MinesweeperHeadless) -> List[Tuple[List[int], List[_BoardConstraint]]]:
+        """Splits the constraints of the visible numbers into components of flat cell indices"""
+        unopened = game.unopened
+        height, width = unopened.shape
+        ys, xs = np.nonzero(~unopened & (count_neighbour_mines(unopened) > 0))
+        values = game.observe()[ys, xs].tolist()
+
+        # The flat indices of the unopened neighbours of every number, -1 for the others
+        padded = np.zeros((height + 2, width + 2), dtype=np.bool)
+        padded[1:-1, 1:-1] = unopened
+        neighbours = np.full((len(ys), 9), -1)
+        for n, (dy, dx) in enumerate(_NBR_OFFSETS):
+            neighbours[:, n] = np.where(padded[ys + 1 + dy, xs + 1 + dx], (ys + dy) * width + xs + dx, -1)
+
+        constraints: List[_BoardConstraint] = []
+        cell_constraints: Dict[int, List[int]] = {}
+        for row, value in zip(neighbours.tolist(), values):
+            number_cells = [cell for cell in row if cell >= 0]
+            for cell in number_cells:
+                cell_constraints.setdefault(cell, []).append(len(constraints))
+            constraints.append((number_cells, value))
+
+        components: List[Tuple[List[int], List[_BoardConstraint]]] = []
+        seen = [False] * len(constraints)
+        for start in range(len(constraints)):
+            if seen[start]:
+                continue
+            seen[start] = True
+            queue = [start]
+            component_cells: Dict[int, None] = {}
+            for c in queue:
+                for cell in constraints[c][0]:
+                    component_cells[cell] = None
+                    for other in cell_constraints[cell]:
+                        if not seen[other]:
+                            seen[other] = True
+                            queue.append(other)
+            components.append((list(component_cells), [constraints[c] for c in queue]))
+        return components
+
+    def _solve_component(self, cells: List[int], constraints: List[_BoardConstraint], width: int, deadline: float):
+        """Returns the result of the component in the order of the given cells, through the cache of shapes"""
+        # Translation invariant shape: the cells in row-major order relative to the top left cell
+        coords = sorted((cell // width, cell % width) for cell in cells)
+        y0 = coords[0][0]
+        x0 = min(x for _, x in coords)
+        shape_cells = tuple((y - y0, x - x0) for y, x in coords)
+        index = {y * width + x: i for i, (y, x) in enumerate(coords)}
+        shape_constraints = tuple(sorted((tuple(sorted(index[c] for c in cs)), value) for cs, value in constraints))
+        key = (shape_cells, shape_constraints)
+
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            try:
+                if len(cells) > self._max_component_cells:
+                    raise _BudgetExceeded
+                result = enumerate_component(len(cells), shape_constraints, self._max_states, deadline)
+                self._cache[key] = result
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+            except _BudgetExceeded:
+                result = _approximate_component(len(cells), shape_constraints)
+
+        return result._replace(mine_counts=result.mine_counts[:, [index[c] for c in cells]])
+
+    def probabilities(self, game: MinesweeperHeadless) -> NDArray:
+        """
+        Returns the probability of a mine in every cell as a float array of shape (height, width).
+
+        Opened cells have the probability 0. Flags are ignored. The attribute exact tells whether every component was
+        enumerated.
+
+        Raises:
+            ValueError: If the visible state can't be the result of any mine layout, e.g. after a loss.
+        """
+        height, width = game.unopened.shape
+        n_mines = game.n_mines
+        if game.gamestate == GameState.LOST:
+            raise ValueError("The game is lost.")
+        if game.gamestate == GameState.NOT_STARTED:
+            self.exact = True
+            return np.full((height, width), n_mines / (width * height))
+
+        deadline = time.perf_counter() + self._time_budget if self._time_budget is not None else float("inf")
+        components = self._frontier_components(game)
+        results = [self._solve_component(cells, constraints, width, deadline) for cells, constraints in components]
+        self.exact = all(result.exact for result in results)
+
+        n_unopened = int(game.n_unopened)
+        n_interior = n_unopened - sum(len(cells) for cells, _ in components)
+
+        # Distributions of the mines in all components and in all but one, through prefix and suffix products
+        prefix = [np.ones(1)]
+        for result in results:
+            prefix.append(np.convolve(prefix[-1], result.counts))
+        suffix = [np.ones(1)]
+        for result in reversed(results):
+            suffix.append(np.convolve(suffix[-1], result.counts))
+        suffix.reverse()
+        total = prefix[-1]
+
+        # Relative number of ways to place the other mines away from the frontier, by the amount of frontier mines
+        log_weights = np.full(len(total), -np.inf)
+        for k in range(len(total)):
+            interior_mines = n_mines - k
+            if 0 <= interior_mines <= n_interior:
+                log_weights[k] = (
+                    lgamma(n_interior + 1) - lgamma(interior_mines + 1) - lgamma(n_interior - interior_mines + 1)
+                )
+        if np.isinf(log_weights).all():
+            raise ValueError("The visible state doesn't match the amount of mines.")
+        weights = np.exp(log_weights - log_weights.max())
+
+        total_weight = total @ weights
+        if total_weight == 0:
+            raise ValueError("The visible state doesn't match the amount of mines.")
+
+        probabilities = np.zeros(height * width)
+        if n_interior:
+            interior_mines = np.clip(n_mines - np.arange(len(total)), 0, None)
+            probabilities[game.unopened.ravel()] = (total * weights) @ interior_mines / n_interior / total_weight
+
+        for c, ((cells, _), result) in enumerate(zip(components, results)):
+            others = np.convolve(prefix[c], suffix[c + 1])
+            k_weights = np.array([others @ weights[k : k + len(others)] for k in range(len(result.counts))])
+            probabilities[cells] = k_weights @ result.mine_counts / total_weight
+
+        return probabilities.reshape(height, width)
+
+    def best_cell(self, game: MinesweeperHeadless) -> Tuple[int, int]:
+        """
+        The unopened and unflagged (x, y) cell with the lowest probability of a mine.
+
+        Raises:
+            ValueError: If every unopened cell is flagged.
+        """
+        candidates = game.unopened & ~game.flagged
+        if not candidates.any():
+            raise ValueError("Every unopened cell is flagged.")
+        probabilities = np.where(candidates, self.probabilities(game), np.inf)
+        y, x = np.unravel_index(np.argmin(probabilities), probabilities.shape)
+        return int(x), int(y)
@@ -0,0 +1,280 @@
+"""
+Single-file binary recording of played sessions.
+
+The file starts with a fixed-size header, which is followed by a stream of records. Every record starts with a fixed-size
+record header, which may be followed by a payload:
+
+- A game record starts a new minefield. Its payload is the mine layout, bit-packed in row-major order.
+- An action record stores an interaction and the game state after it. Its payload is the list of cells whose state
+  changed, as uint32 values of the form flat_index << 2 | flagged << 1 | unopened.
+
+All values are little-endian. The reader memory maps the file, so the payloads are only read when they are needed.
+"""
+
+import mmap
+import os
+import struct
+from typing import Iterator, List, NamedTuple, Union
+import numpy as np
+from numpy.typing import NDArray
+from .utils import CELL_DTYPE, INTERACTION_DTYPE, Action, CellState, GameState, Interaction
+
+MAGIC = b"MSWPREC\x00"
+VERSION = 1
+
+# magic, version, flags, width, height, n_mines, seed
+_HEADER = struct.Struct("<8sHHIIIq")
+# kind, action, gamestate, reserved, x, y, payload length in bytes
+_RECORD = struct.Struct("<BBBBiiI")
+
+FLAG_SEEDED = 1
+FLAG_LEGACY_SEEDING = 2
+FLAG_DELTAS = 4
+
+KIND_GAME = 1
+KIND_ACTION = 2
+
+ACTION_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("action", "u1"), ("gamestate", "u1"), ("game", "<i4")])
+
+
+class RecordedGame(NamedTuple):
+    """A minefield of a recording"""
+
+    first_action: int
+    x: int
+    y: int
+    offset: int
+
+
+class SessionWriter:
+    """Writes a session into a single binary file, buffering the writes"""
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        width: int,
+        height: int,
+        n_mines: int,
+        rnd_seed: Union[int, None] = None,
+        legacy_seeding: bool = False,
+        deltas: bool = True,
+        buffer_size: int = 1 << 20,
+    ):
+        """
+        Args:
+            path: The file to write. An existing file is overwritten.
+            width: The width of the minefield.
+            height: The height of the minefield.
+            n_mines: The amount of mines in the minefield.
+            rnd_seed: The seed the game was started with, stored in the header.
+            legacy_seeding: Whether the game used the legacy seeding.
+            deltas: If True, the cells changed by every action are stored with the action.
+            buffer_size: Size of the write buffer in bytes.
+        """
+        self._width = width
+        self._height = height
+        self._deltas = deltas
+
+        flags = FLAG_DELTAS * deltas | FLAG_LEGACY_SEEDING * legacy_seeding | FLAG_SEEDED * (rnd_seed is not None)
+        self._file = open(path, "wb", buffering=buffer_size)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, flags, width, height, n_mines, rnd_seed or 0))
+
+        # The state after the previous action, which the deltas are computed against
+        self._unopened = np.ones(width * height, dtype=np.bool)
+        self._flagged = np.zeros(width * height, dtype=np.bool)
+
+    def __enter__(self) -> "SessionWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write_game(self, mines: NDArray, x: int, y: int):
+        """Starts a new game with the given boolean mine layout and first click"""
+        packed = np.packbits(mines.ravel()).tobytes()
+        self._file.write(_RECORD.pack(KIND_GAME, 0, 0, 0, x, y, len(packed)))
+        self._file.write(packed)
+
+    def write_action(
+        self,
+        act: Interaction,
+        gamestate: GameState,
+        unopened: Union[NDArray, None] = None,
+        flagged: Union[NDArray, None] = None,
+    ):
+        """Writes the action and, if enabled and the state is given, the cells that it changed"""
+        payload = b""
+        if self._deltas and unopened is not None and flagged is not None:
+            unopened = unopened.ravel()
+            flagged = flagged.ravel()
+            changed = np.flatnonzero((unopened != self._unopened) | (flagged != self._flagged)).astype(np.uint32)
+            deltas = (changed << 2) | (flagged[changed].astype(np.uint32) << 1) | unopened[changed]
+            payload = deltas.astype("<u4").tobytes()
+            self._unopened[:] = unopened
+            self._flagged[:] = flagged
+
+        self._file.write(_RECORD.pack(KIND_ACTION, act.action.value, gamestate.value, 0, act.x, act.y, len(payload)))
+        self._file.write(payload)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class SessionReader:
+    """Reads a session written by SessionWriter through a memory map"""
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"{path} is not a session recording.")
+        magic, version, flags, width, height, n_mines, seed = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a session recording of version {VERSION}.")
+
+        self.width: int = width
+        self.height: int = height
+        self.n_mines: int = n_mines
+        self.rnd_seed: Union[int, None] = seed if flags & FLAG_SEEDED else None
+        self.legacy_seeding = bool(flags & FLAG_LEGACY_SEEDING)
+        self.has_deltas = bool(flags & FLAG_DELTAS)
+
+        self.games: List[RecordedGame] = []
+        self._scan()
+
+    def _scan(self):
+        """Indexes the records. A record that was cut short, e.g. by a crash, ends the recording."""
+        actions = []
+        payload_offsets = []
+        offset = _HEADER.size
+        end = len(self._mm)
+        while offset + _RECORD.size <= end:
+            kind, action, gamestate, _, x, y, n_payload = _RECORD.unpack_from(self._mm, offset)
+            offset += _RECORD.size
+            if offset + n_payload > end:
+                break
+
+            if kind == KIND_GAME:
+                self.games.append(RecordedGame(len(actions), x, y, offset))
+            elif kind == KIND_ACTION:
+                actions.append((x, y, action, gamestate, len(self.games) - 1))
+                payload_offsets.append((offset, n_payload))
+            else:
+                raise ValueError(f"Unknown record kind {kind} at offset {offset - _RECORD.size}.")
+            offset += n_payload
+
+        self.actions: NDArray = np.array(actions, dtype=ACTION_DTYPE)
+        self._payloads = np.array(payload_offsets, dtype=np.int64).reshape(-1, 2)
+
+    def __enter__(self) -> "SessionReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def interaction(self, i: int) -> Interaction:
+        x, y, action, _, _ = self.actions[i]
+        return Interaction(int(x), int(y), Action(int(action)))
+
+    def interactions(self) -> Iterator[Interaction]:
+        for x, y, action, _, _ in self.actions.tolist():
+            yield Interaction(x, y, Action(action))
+
+    def gamestate(self, i: int) -> GameState:
+        """The state of the game after the action"""
+        return GameState(int(self.actions[i]["gamestate"]))
+
+    def mines(self, game: int) -> NDArray:
+        """Returns the boolean mine layout of the game"""
+        n_cells = self.width * self.height
+        packed = np.frombuffer(self._mm, dtype=np.uint8, count=(n_cells + 7) // 8, offset=self.games[game].offset)
+        return np.unpackbits(packed, count=n_cells).astype(np.bool).reshape(self.height, self.width)
+
+    def deltas(self, i: int) -> NDArray:
+        """Returns the changed cells of the action as packed uint32 values, a read-only view into the file"""
+        offset, n_bytes = self._payloads[i]
+        return np.frombuffer(self._mm, dtype="<u4", count=int(n_bytes) // 4, offset=int(offset))
+
+    def apply_deltas(self, i: int, unopened: NDArray, flagged: NDArray):
+        """Updates the given state arrays in place with the changes made by the action"""
+        apply_deltas(self.deltas(i), unopened, flagged)
+
+    def close(self):
+        try:
+            self._mm.close()
+        except BufferError:
+            # Views handed out by deltas() are still alive, the map is released when they are garbage collected
+            pass
+        self._file.close()
+
+
+def apply_deltas(deltas: NDArray, unopened: NDArray, flagged: NDArray):
+    """Updates the given state arrays in place with packed delta values"""
+    cells = deltas >> 2
+    unopened.reshape(-1)[cells] = (deltas & 1).astype(np.bool)
+    flagged.reshape(-1)[cells] = (deltas & 2).astype(np.bool)
+
+
+def load_legacy_actions(path: Union[str, os.PathLike]) -> NDArray:
+    """Loads the actions of a legacy acts.txt file of x;y;action rows as a structured array of INTERACTION_DTYPE"""
+    rows = np.loadtxt(path, delimiter=";", dtype=np.int64, ndmin=2)
+    acts = np.empty(len(rows), dtype=INTERACTION_DTYPE)
+    acts["x"], acts["y"], acts["action"] = rows.T
+    return acts
+
+
+def _load_legacy_grids(path: str) -> List[NDArray]:
+    """Loads all of the arrays appended into a legacy .npy file"""
+    grids = []
+    with open(path, "rb") as f:
+        while f.peek(1):
+            grids.append(np.load(f, allow_pickle=True))
+    return grids
+
+
+def convert_legacy_session(
+    folder: Union[str, os.PathLike], path: Union[str, os.PathLike], rnd_seed: Union[int, None] = None
+):
+    """
+    Converts a session folder of acts.txt, states.npy and minefield.npy files into a single binary recording.
+
+    Args:
+        folder: The legacy session folder.
+        path: The recording file to write.
+        rnd_seed: The seed the session was played with, if known. The legacy files don't store it.
+    """
+    from .minesweeper_ import MinesweeperHeadless
+
+    minefields = []
+    for grid in _load_legacy_grids(os.path.join(folder, "minefield.npy")):
+        if grid.dtype == object:
+            grid = np.frompyfunc(lambda cell: cell.num(), 1, 1)(grid).astype(CELL_DTYPE)
+        minefields.append(grid == CellState.MINE.num())
+
+    states = _load_legacy_grids(os.path.join(folder, "states.npy"))
+    with open(os.path.join(folder, "acts.txt"), "r") as f:
+        acts = [Interaction(int(x), int(y), Action(int(a))) for x, y, a in (row.split(";") for row in f)]
+
+    height, width = minefields[0].shape
+    n_mines = int(minefields[0].sum())
+
+    # The game states aren't stored in the legacy files, so they are replayed with the recorded minefields
+    ms = MinesweeperHeadless(width, height, n_mines)
+    n_games = 0
+    with SessionWriter(path, width, height, n_mines, rnd_seed=rnd_seed, legacy_seeding=rnd_seed is not None) as writer:
+        for i, act in enumerate(acts):
+            starts_game = act.action == Action.OPEN and ms.gamestate == GameState.NOT_STARTED
+            if starts_game:
+                writer.write_game(minefields[n_games], act.x, act.y)
+                ms.set_next_minefield(minefields[n_games])
+                n_games += 1
+
+            ms.make_interaction(act)
+            writer.write_action(act, ms.gamestate, states[2 * i], states[2 * i + 1])
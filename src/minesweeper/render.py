@@ -0,0 +1,234 @@
+"""
+Rendering of visible boards into NumPy arrays for training pipelines, without a display or SDL.
+
+The bundled tile images are decoded once into an atlas with one RGB tile per cell code, and boards are composed from
+it by gathering whole pixel rows of tiles, so that a batch of boards is rendered without a loop over the cells.
+"""
+
+from functools import cache
+import os
+import struct
+from typing import Dict, Tuple, Union
+import zlib
+import numpy as np
+from numpy.typing import DTypeLike, NDArray
+from .utils import CELL_DTYPE, CellState
+
+IMAGE_DIR = os.path.join(os.path.dirname(__file__), "images")
+
+# The colour behind the tiles of the ui, which shows through transparent pixels and is used for codes without an image
+BACKGROUND = (132, 132, 132)
+
+# The cell states of the one-hot encoding, in the order of the channels. Other codes have all channels zero.
+ONE_HOT_STATES: Tuple[CellState, ...] = (*(CellState.by_mine_amount(n) for n in range(9)),) + (
+    CellState.UNOPENED,
+    CellState.FLAG,
+    CellState.MINE,
+)
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_CHUNK = struct.Struct(">I4s")
+_IHDR = struct.Struct(">IIBBBBB")
+# Bytes per pixel of the 8 bit colour types: grayscale, RGB, palette, grayscale with alpha and RGBA
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def _unfilter(data: bytes, height: int, stride: int, bpp: int) -> NDArray:
+    """Reverses the per-row filters of decompressed PNG image data"""
+    rows = np.frombuffer(data, dtype=np.uint8).reshape(height, stride + 1)
+    out = np.zeros((height + 1, stride), dtype=np.uint8)
+    for j in range(height):
+        kind, line, prior = rows[j, 0], rows[j, 1:], out[j]
+        row = out[j + 1]
+        if kind == 0:
+            row[:] = line
+        elif kind == 1:
+            row[:] = np.cumsum(line.reshape(-1, bpp), axis=0, dtype=np.uint8).ravel()
+        elif kind == 2:
+            row[:] = line + prior
+        elif kind in (3, 4):
+            raw, up, cur = line.tolist(), prior.tolist(), [0] * (stride + bpp)
+            for i in range(stride):
+                a, b = cur[i], up[i]
+                if kind == 3:
+                    predictor = (a + b) // 2
+                else:
+                    c = up[i - bpp] if i >= bpp else 0
+                    pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - 2 * c)
+                    predictor = a if pa <= pb and pa <= pc else b if pb <= pc else c
+                cur[i + bpp] = (raw[i] + predictor) & 0xFF
+            row[:] = cur[bpp:]
+        else:
+            raise ValueError(f"Unknown PNG filter {kind}.")
+    return out[1:]
+
+
+def read_png(path: Union[str, os.PathLike]) -> NDArray:
+    """
+    Decodes a non-interlaced 8 bit PNG image.
+
+    Returns:
+        The pixels as an uint8 array of shape (height, width, 4) in RGBA.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:8] != _PNG_SIGNATURE:
+        raise ValueError(f"{path} is not a PNG image.")
+
+    chunks: Dict[bytes, bytes] = {}
+    idat = bytearray()
+    pos = 8
+    while pos < len(data):
+        length, kind = _CHUNK.unpack_from(data, pos)
+        body = data[pos + 8 : pos + 8 + length]
+        if kind == b"IDAT":
+            idat += body
+        else:
+            chunks.setdefault(kind, body)
+        pos += 12 + length
+
+    width, height, depth, color_type, _, _, interlace = _IHDR.unpack(chunks[b"IHDR"])
+    if depth != 8 or interlace or color_type not in _CHANNELS:
+        raise ValueError(f"{path} is not a non-interlaced 8 bit PNG image.")
+    channels = _CHANNELS[color_type]
+    pixels = _unfilter(zlib.decompress(idat), height, width * channels, channels).reshape(height, width, channels)
+
+    if color_type == 3:
+        palette = np.full((256, 4), 255, dtype=np.uint8)
+        colours = np.frombuffer(chunks[b"PLTE"], dtype=np.uint8).reshape(-1, 3)
+        palette[: len(colours), :3] = colours
+        alpha = np.frombuffer(chunks.get(b"tRNS", b""), dtype=np.uint8)
+        palette[: len(alpha), 3] = alpha
+        return palette[pixels[..., 0]]
+
+    rgba = np.full((height, width, 4), 255, dtype=np.uint8)
+    rgba[..., :3] = pixels[..., : 3 if channels >= 3 else 1]
+    if channels in (2, 4):
+        rgba[..., 3] = pixels[..., -1]
+    return rgba
+
+
+@cache
+def _tile_images() -> Dict[int, NDArray]:
+    """The decoded images of the cell codes that have one, read only once per process"""
+    images = {}
+    for state in CellState:
+        code = state.num()
+        path = os.path.join(IMAGE_DIR, f"{code if code < 9 else state}.png")
+        if os.path.exists(path):
+            images[code] = read_png(path)
+            images[code].flags.writeable = False
+    return images
+
+
+def make_atlas(tile_size: Union[int, None] = None, background: Tuple[int, int, int] = BACKGROUND) -> NDArray:
+    """
+    Builds the tiles of all cell codes, blended over the background colour like in the ui.
+
+    Args:
+        tile_size: The side of a tile in pixels, which must divide the side of the images. The images are shrunk by
+            averaging blocks of pixels. By default the images are used at their own size.
+        background: The RGB colour behind the tiles.
+
+    Returns:
+        An uint8 array of shape (n_codes, tile_size, tile_size, 3), indexed by the CellState codes.
+    """
+    images = _tile_images()
+    size = next(iter(images.values())).shape[0]
+    tile = size if tile_size is None else tile_size
+    if tile < 1 or size % tile:
+        raise ValueError(f"The tile size must divide the image size {size}, got {tile}.")
+
+    atlas = np.empty((len(CellState), size, size, 3), dtype=np.float64)
+    atlas[:] = background
+    for code, image in images.items():
+        alpha = image[..., 3:] / 255
+        atlas[code] = image[..., :3] * alpha + atlas[code] * (1 - alpha)
+
+    factor = size // tile
+    atlas = atlas.reshape(len(CellState), tile, factor, tile, factor, 3).mean(axis=(2, 4))
+    return np.rint(atlas).astype(np.uint8)
+
+
+class BoardRenderer:
+    """Renders visible boards into RGB images"""
+
+    def __init__(self, tile_size: Union[int, None] = None, background: Tuple[int, int, int] = BACKGROUND):
+        """
+        Args:
+            tile_size: The side of a cell in pixels, which must divide the side of the tile images (32).
+            background: The RGB colour behind the tiles.
+        """
+        self._atlas = make_atlas(tile_size, background)
+        self._atlas.flags.writeable = False
+        self.tile_size = size = self._atlas.shape[1]
+        # Every pixel row of every tile as a single item, so that a row is copied at once
+        self._tile_rows = self._atlas.reshape(-1, size * 3).view(np.dtype((np.void, size * 3)))[:, 0]
+        self._rows = np.arange(size)[:, None]
+
+    @property
+    def atlas(self) -> NDArray:
+        return self._atlas
+
+    def render(self, boards: NDArray, out: Union[NDArray, None] = None) -> NDArray:
+        """
+        Renders a board of CellState codes, or a batch of boards with any leading dimensions.
+
+        Args:
+            boards: An integer array of shape (..., height, width).
+            out: An uint8 array of shape (..., height * tile_size, width * tile_size, 3) to render into, which can be
+                reused to avoid allocating a new image for every frame.
+
+        Returns:
+            An uint8 array of shape (..., height * tile_size, width * tile_size, 3).
+        """
+        boards = np.asarray(boards)
+        if boards.ndim < 2:
+            raise ValueError(f"Expected boards of shape (..., height, width), got {boards.shape}.")
+        if boards.size and (boards.min() < 0 or boards.max() >= len(self._atlas)):
+            raise ValueError("The boards contain invalid cell codes.")
+
+        *batch, height, width = boards.shape
+        size = self.tile_size
+        shape = (*batch, height * size, width * size, 3)
+        if out is None:
+            out = np.empty(shape, dtype=np.uint8)
+        elif out.shape != shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise ValueError(f"Expected a contiguous uint8 array of shape {shape} to render into.")
+
+        # The rows of the image in memory order are indexed by (..., height, size, width): the cell row, the pixel row
+        # and the cell column
+        rows = boards.astype(np.intp)[..., :, None, :] * size + self._rows
+        image_rows = out.reshape(*batch, height, size, width, size * 3).view(self._tile_rows.dtype)[..., 0]
+        np.take(self._tile_rows, rows, out=image_rows, mode="clip")
+        return out
+
+
+def one_hot(boards: NDArray, dtype: DTypeLike = np.uint8, channels_last: bool = False) -> NDArray:
+    """
+    Encodes boards of CellState codes with one channel per state in ONE_HOT_STATES.
+
+    Args:
+        boards: An integer array of shape (..., height, width).
+        dtype: The type of the encoding.
+        channels_last: Put the channels after the cells, instead of before them.
+
+    Returns:
+        An array of shape (..., len(ONE_HOT_STATES), height, width), or (..., height, width, len(ONE_HOT_STATES)).
+    """
+    channels = _one_hot_channels()[np.asarray(boards)]
+    if channels_last:
+        encoded = channels[..., None] == np.arange(len(ONE_HOT_STATES), dtype=CELL_DTYPE)
+    else:
+        encoded = channels[..., None, :, :] == np.arange(len(ONE_HOT_STATES), dtype=CELL_DTYPE)[:, None, None]
+    return encoded.astype(dtype, copy=False)
+
+
+@cache
+def _one_hot_channels() -> NDArray:
+    """The channel of every cell code, or one past the last channel for codes without one"""
+    channels = np.full(len(CellState), len(ONE_HOT_STATES), dtype=CELL_DTYPE)
+    for channel, state in enumerate(ONE_HOT_STATES):
+        channels[state.num()] = channel
+    channels.flags.writeable = False
+    return channels
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Union
+import numpy as np
+from .minesweeper_ import GameSnapshot, MinesweeperHeadless
+from .recording import SessionReader, convert_legacy_session
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of replaying one recorded session"""
+
+    path: str
+    n_actions: int
+    n_games: int
+    mismatches: List[int]
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches
+
+
+class Replay:
+    """Replays a recorded session with random access to the state after any amount of actions"""
+
+    def __init__(self, path: Union[str, os.PathLike], keyframe_interval: int = 64, verify: bool = True):
+        """
+        Args:
+            path: A session.msr recording, a folder containing one, or a folder of a legacy session.
+            keyframe_interval: A keyframe is stored every this many actions, which bounds the actions stepped by a
+                seek. With 0, only the initial state is kept.
+            verify: If True, the replayed states are compared against the changes stored in the recording while
+                the keyframes are built.
+        """
+        self._tmp_dir = None
+        self.path = str(path)
+        if os.path.isdir(path):
+            if os.path.exists(os.path.join(path, "session.msr")):
+                path = os.path.join(path, "session.msr")
+            else:
+                self._tmp_dir = tempfile.TemporaryDirectory()
+                converted = os.path.join(self._tmp_dir.name, "session.msr")
+                convert_legacy_session(path, converted)
+                path = converted
+
+        self._reader = SessionReader(path)
+        self._interval = keyframe_interval
+
+        # Games start on the action given by the recording, with the recorded mine layout
+        self._game_starts: Dict[int, int] = {game.first_action: i for i, game in enumerate(self._reader.games)}
+
+        self._game = MinesweeperHeadless(self._reader.width, self._reader.height, self._reader.n_mines)
+        self._position = 0
+        self._keyframes: List[GameSnapshot] = []
+        self.mismatches: List[int] = []
+        self._build_keyframes(verify)
+
+    def __enter__(self) -> "Replay":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._reader)
+
+    @property
+    def reader(self) -> SessionReader:
+        return self._reader
+
+    @property
+    def position(self) -> int:
+        """The amount of actions applied to the replayed game"""
+        return self._position
+
+    @property
+    def game(self) -> MinesweeperHeadless:
+        """The replayed game at the current position. It must not be modified."""
+        return self._game
+
+    def _restore(self, keyframe: GameSnapshot, position: int):
+        self._game.restore(keyframe)
+        self._position = position
+
+    def _step(self):
+        """Applies the next recorded action"""
+        game = self._game_starts.get(self._position)
+        if game is not None:
+            self._game.set_next_minefield(self._reader.mines(game))
+        self._game.make_interaction(self._reader.interaction(self._position))
+        self._position += 1
+
+    def _build_keyframes(self, verify: bool):
+        """Steps through the whole session once, storing keyframes and comparing against the recording"""
+        verify = verify and self._reader.has_deltas
+        shape = (self._reader.height, self._reader.width)
+        exp_unopened = np.ones(shape, dtype=np.bool)
+        exp_flagged = np.zeros(shape, dtype=np.bool)
+
+        self._keyframes.append(self._game.snapshot())
+        while self._position < len(self):
+            i = self._position
+            self._step()
+
+            if verify:
+                self._reader.apply_deltas(i, exp_unopened, exp_flagged)
+                if (
+                    self._game.gamestate != self._reader.gamestate(i)
+                    or not np.array_equal(exp_unopened, self._game._unopened)
+                    or not np.array_equal(exp_flagged, self._game._flagged)
+                ):
+                    self.mismatches.append(i)
+
+            if self._interval and self._position % self._interval == 0:
+                self._keyframes.append(self._game.snapshot())
+
+    def seek(self, position: int) -> MinesweeperHeadless:
+        """
+        Moves the replay to the state after the given amount of actions.
+
+        At most keyframe_interval - 1 actions are stepped, unless the keyframes are disabled.
+
+        Returns:
+            The replayed game, which must not be modified.
+        """
+        if not 0 <= position <= len(self):
+            raise IndexError(f"Position {position} out of range 0..{len(self)}.")
+
+        keyframe = position // self._interval if self._interval else 0
+        start = keyframe * self._interval
+        if not start <= self._position <= position:
+            self._restore(self._keyframes[keyframe], start)
+
+        while self._position < position:
+            self._step()
+        return self._game
+
+    def close(self):
+        self._reader.close()
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+
+
+def stream_replays(paths: Iterable[Union[str, os.PathLike]], verify: bool = True) -> Iterator[ReplayResult]:
+    """Replays the sessions one after another without keyframes, yielding the result of each"""
+    for path in paths:
+        with Replay(path, keyframe_interval=0, verify=verify) as replay:
+            yield ReplayResult(str(path), len(replay), len(replay.reader.games), replay.mismatches)
@@ -0,0 +1,269 @@
+"""
+Asyncio server hosting headless games for many clients over a line-delimited JSON protocol.
+
+Every request is one JSON object on a line, and every request gets one response line in the same order, which echoes
+the "id" of the request if it has one. Responses have "ok": true, or "ok": false with an "error" message.
+
+- {"op": "create", "width": 30, "height": 16, "n_mines": 99, "seed": 1} creates a game and returns its "game" id.
+- {"op": "act", "game": id, "actions": [[x, y, "OPEN"], ...]} makes the actions, which are OPEN, FLAG or NEW_GAME
+  given by their Action names or values, until a game is lost. A single action can also be given with "x", "y" and
+  "action". Returns the "n_opened" cells of every action made and the "gamestate" and "mines_left" after them.
+- {"op": "observe", "game": id} returns the visible "board" as rows of CellState codes, with "gamestate" and
+  "mines_left".
+- {"op": "close", "game": id} ends the game.
+
+Games aren't tied to connections, and games that haven't been used for a while are evicted.
+"""
+
+import asyncio
+from dataclasses import dataclass
+import json
+import secrets
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple, Union
+import numpy as np
+from .minesweeper_ import MinesweeperHeadless
+from .utils import INTERACTION_DTYPE, Action
+
+
+@dataclass
+class _Session:
+    game: MinesweeperHeadless
+    last_used: float
+
+
+class _Connection(asyncio.Protocol):
+    """
+    Handles the requests of one client.
+
+    All complete lines of a read are handled together and their responses are sent with a single write. While the
+    write buffer of the client is full, no more requests are read from it.
+    """
+
+    def __init__(self, server: "GameServer"):
+        self._server = server
+        self._buffer = bytearray()
+        self._transport: Union[asyncio.Transport, None] = None
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        self._transport = transport  # type: ignore
+        self._transport.set_write_buffer_limits(high=self._server.write_buffer)  # type: ignore
+        self._server._connections.add(self)
+
+    def connection_lost(self, exc: Union[Exception, None]):
+        self._server._connections.discard(self)
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    def data_received(self, data: bytes):
+        self._buffer += data
+        end = self._buffer.rfind(b"\n")
+        if end >= 0:
+            lines = bytes(self._buffer[:end]).split(b"\n")
+            del self._buffer[: end + 1]
+            responses = b"".join(self._server.handle_line(line) for line in lines if line.strip())
+            self._transport.write(responses)  # type: ignore
+
+        if len(self._buffer) > self._server.max_line:
+            self._transport.write(_encode({"ok": False, "error": "Line too long."}))  # type: ignore
+            self._transport.close()  # type: ignore
+
+    def pause_writing(self):
+        self._transport.pause_reading()  # type: ignore
+
+    def resume_writing(self):
+        self._transport.resume_reading()  # type: ignore
+
+
+def _encode(response: Dict[str, Any]) -> bytes:
+    return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+
+class GameServer:
+    """Hosts headless games for the clients of one event loop"""
+
+    def __init__(
+        self,
+        idle_timeout: float = 300.0,
+        max_games: int = 10_000,
+        max_cells: int = 1_000_000,
+        max_line: int = 1 << 20,
+        write_buffer: int = 1 << 16,
+    ):
+        """
+        Args:
+            idle_timeout: Seconds after which unused games are evicted.
+            max_games: The amount of games that can exist at once.
+            max_cells: The largest board size in cells.
+            max_line: The longest request in bytes.
+            write_buffer: Bytes of responses buffered for a client before its requests are no longer read.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_games = max_games
+        self.max_cells = max_cells
+        self.max_line = max_line
+        self.write_buffer = write_buffer
+        self._sessions: Dict[str, _Session] = {}
+        self._server: Union[asyncio.Server, None] = None
+        self._connections: Set[_Connection] = set()
+        self._evictor: Union[asyncio.Task, None] = None
+        self._ops: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "create": self._create,
+            "act": self._act,
+            "observe": self._observe,
+            "close": self._close,
+        }
+
+    @property
+    def n_games(self) -> int:
+        return len(self._sessions)
+
+    async def start(
+        self, host: Union[str, None] = None, port: int = 0, path: Union[str, None] = None
+    ) -> asyncio.Server:
+        """
+        Starts listening on a TCP port, or on a Unix socket if a path is given. With port 0, the system chooses one.
+
+        Returns:
+            The listening server, whose sockets tell the port if it was chosen by the system.
+        """
+        loop = asyncio.get_running_loop()
+        if path is not None:
+            server = await loop.create_unix_server(lambda: _Connection(self), path)
+        else:
+            server = await loop.create_server(lambda: _Connection(self), host, port)
+        self._server = server
+        self._evictor = asyncio.create_task(self._evict_periodically())
+        return server
+
+    async def stop(self):
+        """Stops listening, closes the connections and drops all games"""
+        if self._evictor is not None:
+            self._evictor.cancel()
+        if self._server is not None:
+            self._server.close()
+            for connection in list(self._connections):
+                connection.close()
+            await self._server.wait_closed()
+        self._sessions.clear()
+
+    async def _evict_periodically(self):
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 0.01))
+            self.evict_idle()
+
+    def evict_idle(self, now: Union[float, None] = None) -> int:
+        """Drops the games that haven't been used within the idle timeout. Returns the amount of games dropped."""
+        deadline = (time.monotonic() if now is None else now) - self.idle_timeout
+        idle = [game_id for game_id, session in self._sessions.items() if session.last_used < deadline]
+        for game_id in idle:
+            del self._sessions[game_id]
+        return len(idle)
+
+    def handle_line(self, line: bytes) -> bytes:
+        """Handles one request line and returns the response line"""
+        try:
+            request = json.loads(line)
+        except (ValueError, RecursionError):
+            # Too deeply nested input exhausts the recursion of the decoder
+            return _encode({"ok": False, "error": "Invalid JSON."})
+        if not isinstance(request, dict):
+            return _encode({"ok": False, "error": "Requests must be JSON objects."})
+        return _encode(self.handle_request(request))
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Handles one request and returns the response"""
+        response: Dict[str, Any] = {"id": request["id"]} if "id" in request else {}
+        op = self._ops.get(request.get("op")) if isinstance(request.get("op"), str) else None  # type: ignore
+        if op is None:
+            response.update(ok=False, error=f"Unknown op {request.get('op')!r}.")
+            return response
+
+        try:
+            response.update(op(request))
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            message = f"Missing field {e}." if isinstance(e, KeyError) else str(e)
+            response.update(ok=False, error=message)
+            return response
+        response["ok"] = True
+        return response
+
+    def _session(self, request: Dict[str, Any]) -> _Session:
+        session = self._sessions.get(request["game"])
+        if session is None:
+            raise ValueError(f"Unknown game {request['game']!r}.")
+        session.last_used = time.monotonic()
+        return session
+
+    def _create(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        width, height, n_mines = int(request["width"]), int(request["height"]), int(request["n_mines"])
+        if width < 1 or height < 1 or width * height > self.max_cells or n_mines < 0:
+            raise ValueError(f"Invalid board of {width}x{height} cells with {n_mines} mines.")
+        if len(self._sessions) >= self.max_games:
+            self.evict_idle()
+            if len(self._sessions) >= self.max_games:
+                raise ValueError("Too many games.")
+
+        seed = request.get("seed")
+        game = MinesweeperHeadless(width, height, n_mines, rnd_seed=None if seed is None else int(seed))
+        game_id = secrets.token_hex(8)
+        self._sessions[game_id] = _Session(game, time.monotonic())
+        return {"game": game_id}
+
+    def _act(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        game = self._session(request).game
+        if "actions" in request:
+            rows = [_parse_action(*action) for action in request["actions"]]
+        else:
+            rows = [_parse_action(request["x"], request["y"], request["action"])]
+        outcomes = game.make_interactions(np.array(rows, dtype=INTERACTION_DTYPE))
+        return {
+            "n_opened": outcomes["n_opened"].tolist(),
+            "gamestate": game.gamestate.name,
+            "mines_left": game.mines_left,
+        }
+
+    def _observe(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        game = self._session(request).game
+        return {"board": game.observe().tolist(), "gamestate": game.gamestate.name, "mines_left": game.mines_left}
+
+    def _close(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self._sessions.pop(request["game"], None) is None:
+            raise ValueError(f"Unknown game {request['game']!r}.")
+        return {}
+
+
+# The actions clients can make, saving and exiting only mean something for a game with a window
+_PLAYABLE = {action.name: action for action in (Action.OPEN, Action.FLAG, Action.NEW_GAME)}
+
+
+def _parse_action(x: int, y: int, action: Union[str, int]) -> Tuple[int, int, int]:
+    """Converts a playable action given by its name or value into a row of INTERACTION_DTYPE"""
+    parsed = _PLAYABLE.get(action) if isinstance(action, str) else Action(int(action))
+    if parsed is None or parsed.name not in _PLAYABLE:
+        raise ValueError(f"Unknown action {action!r}.")
+    return int(x), int(y), parsed.value
+
+
+def parse_address(address: str) -> Dict[str, Any]:
+    """Parses "host:port" or "unix:path" into the keyword arguments of GameServer.start"""
+    if address.startswith("unix:"):
+        return {"path": address[len("unix:") :]}
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Expected host:port or unix:path, got {address!r}.")
+    return {"host": host or None, "port": int(port)}
+
+
+async def serve(address: str, **kwargs):
+    """Runs a GameServer on the given "host:port" or "unix:path" address until cancelled"""
+    server = GameServer(**kwargs)
+    listener = await server.start(**parse_address(address))
+    names: List[str] = [str(sock.getsockname()) for sock in listener.sockets]
+    print(f"Serving games on {', '.join(names)}", flush=True)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.stop()
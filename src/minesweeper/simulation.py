@@ -0,0 +1,220 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+import json
+import os
+import secrets
+import sys
+import time
+from typing import Annotated, Any, Callable, Dict, Iterator, Set, Tuple, Union
+import numpy as np
+from numpy.typing import NDArray
+import typer
+from .minesweeper_ import MinesweeperHeadless
+from .solver import Solver
+from .utils import Action, GameState, Interaction
+
+type Strategy = Callable[[MinesweeperHeadless, np.random.Generator], int]
+
+GAME_DTYPE = np.dtype(
+    [("index", "<i8"), ("won", "?"), ("n_actions", "<i4"), ("n_revealed", "<i4"), ("duration", "<f8")]
+)
+
+app = typer.Typer()
+
+
+def solver_strategy(game: MinesweeperHeadless, rng: np.random.Generator) -> int:
+    """Plays the game to the end with the constraint solver and returns the amount of actions made"""
+    solver = Solver(game)
+    n_actions = 0
+    while game.gamestate in (GameState.NOT_STARTED, GameState.PLAYING):
+        n_actions += solver.step()
+    return n_actions
+
+
+def random_strategy(game: MinesweeperHeadless, rng: np.random.Generator) -> int:
+    """Opens random unopened cells until the game ends and returns the amount of actions made"""
+    n_actions = 0
+    while game.gamestate in (GameState.NOT_STARTED, GameState.PLAYING):
+        ys, xs = np.nonzero(game.unopened)
+        i = rng.integers(len(xs))
+        game.make_interaction(Interaction(int(xs[i]), int(ys[i]), Action.OPEN))
+        n_actions += 1
+    return n_actions
+
+
+STRATEGIES: Dict[str, Strategy] = {"solver": solver_strategy, "random": random_strategy}
+
+
+def _game_seed(entropy: int, index: int) -> np.random.SeedSequence:
+    """The seed of a game, which only depends on the root entropy and the index of the game"""
+    return np.random.SeedSequence(entropy, spawn_key=(index,))
+
+
+def play_chunk(
+    width: int, height: int, n_mines: int, strategy: Strategy, entropy: int, start: int, stop: int
+) -> NDArray:
+    """
+    Plays the games start..stop of a simulation, each with its own seed.
+
+    Returns:
+        A structured array of GAME_DTYPE with one row per game.
+    """
+    results = np.zeros(stop - start, dtype=GAME_DTYPE)
+    for row, index in zip(results, range(start, stop)):
+        game_seed, strategy_seed = _game_seed(entropy, index).generate_state(2)
+        game = MinesweeperHeadless(width, height, n_mines, rnd_seed=int(game_seed))
+        begin = time.perf_counter()
+        n_actions = strategy(game, np.random.default_rng(strategy_seed))
+        row["duration"] = time.perf_counter() - begin
+        row["index"] = index
+        row["won"] = game.gamestate == GameState.WON
+        row["n_actions"] = n_actions
+        row["n_revealed"] = game.n_revealed
+    return results
+
+
+@dataclass
+class SimulationStats:
+    """Aggregated results of the games of a simulation that have finished so far"""
+
+    entropy: int
+    n_games: int = 0
+    n_won: int = 0
+    total_actions: int = 0
+    total_revealed: int = 0
+    total_duration: float = 0.0
+    wall_time: float = 0.0
+    # Histogram of the game lengths in actions
+    lengths: NDArray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    def add(self, results: NDArray):
+        self.n_games += len(results)
+        self.n_won += int(results["won"].sum())
+        self.total_actions += int(results["n_actions"].sum())
+        self.total_revealed += int(results["n_revealed"].sum())
+        self.total_duration += float(results["duration"].sum())
+        counts = np.bincount(results["n_actions"])
+        if len(counts) > len(self.lengths):
+            self.lengths = np.pad(self.lengths, (0, len(counts) - len(self.lengths)))
+        self.lengths[: len(counts)] += counts
+
+    @property
+    def win_rate(self) -> float:
+        return self.n_won / self.n_games if self.n_games else 0.0
+
+    def length_percentile(self, q: float) -> int:
+        """The game length in actions below which q percent of the games are"""
+        if not self.n_games:
+            return 0
+        return int(np.searchsorted(np.cumsum(self.lengths), q / 100 * self.n_games))
+
+    def as_dict(self) -> Dict[str, Any]:
+        n_games = max(self.n_games, 1)
+        return {
+            "entropy": self.entropy,
+            "n_games": self.n_games,
+            "n_won": self.n_won,
+            "win_rate": self.win_rate,
+            "mean_actions": self.total_actions / n_games,
+            "median_actions": self.length_percentile(50),
+            "p95_actions": self.length_percentile(95),
+            "mean_revealed": self.total_revealed / n_games,
+            "mean_game_ms": self.total_duration / n_games * 1000,
+            "wall_time": self.wall_time,
+            "games_per_s": self.n_games / self.wall_time if self.wall_time > 0 else 0.0,
+        }
+
+
+def simulate(
+    n_games: int,
+    width: int,
+    height: int,
+    n_mines: int,
+    strategy: Strategy = solver_strategy,
+    seed: Union[int, None] = None,
+    workers: Union[int, None] = None,
+    chunk_size: int = 64,
+) -> Iterator[Tuple[SimulationStats, NDArray]]:
+    """
+    Plays games in a process pool and yields the aggregated stats with the results of every chunk as it finishes.
+
+    Every game is seeded from the root seed and its index, so the results don't depend on the amount of workers or the
+    chunk size. Only the timings and the order in which the chunks finish do.
+
+    Args:
+        n_games: The amount of games to play.
+        width: The width of the minefields.
+        height: The height of the minefields.
+        n_mines: The amount of mines.
+        strategy: Plays a game to the end. It must be picklable, e.g. a module level function.
+        seed: The root seed. A random one is drawn if not given, which can be read from the stats.
+        workers: The amount of processes, os.cpu_count() by default. With 1, the games are played in this process.
+        chunk_size: The amount of games a worker plays per task.
+    """
+    # A random root seed is drawn like SeedSequence does, as an integer that is reported in the stats
+    entropy = seed if seed is not None else secrets.randbits(128)
+    stats = SimulationStats(entropy)
+    chunks = ((start, min(start + chunk_size, n_games)) for start in range(0, n_games, chunk_size))
+    start_time = time.perf_counter()
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for start, stop in chunks:
+            results = play_chunk(width, height, n_mines, strategy, entropy, start, stop)
+            stats.add(results)
+            stats.wall_time = time.perf_counter() - start_time
+            yield stats, results
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        # A few chunks per worker are kept in flight, so that the results of huge runs don't pile up
+        pending: Set[Future] = set()
+        for start, stop in chunks:
+            pending.add(executor.submit(play_chunk, width, height, n_mines, strategy, entropy, start, stop))
+            if len(pending) < 4 * workers:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stats.add(future.result())
+                stats.wall_time = time.perf_counter() - start_time
+                yield stats, future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stats.add(future.result())
+                stats.wall_time = time.perf_counter() - start_time
+                yield stats, future.result()
+
+
+def run_simulation(*args, **kwargs) -> SimulationStats:
+    """Runs simulate() to the end and returns the final stats"""
+    stats = None
+    for stats, _ in simulate(*args, **kwargs):
+        pass
+    if stats is None:
+        raise ValueError("No games to simulate.")
+    return stats
+
+
+@app.command()
+def run(
+    n_games: Annotated[int, typer.Argument(help="The amount of games.", min=1)] = 1000,
+    width: Annotated[int, typer.Option(help="The width of the grid.", min=3)] = 30,
+    height: Annotated[int, typer.Option(help="The height of the grid.", min=3)] = 16,
+    n_mines: Annotated[int, typer.Option(help="The amount of mines.", min=0)] = 99,
+    strategy: Annotated[str, typer.Option(help=f"One of: {', '.join(STRATEGIES)}.")] = "solver",
+    seed: Annotated[Union[int, None], typer.Option(help="The root seed, random if not given.")] = None,
+    workers: Annotated[Union[int, None], typer.Option(help="Processes, all cores by default.", min=1)] = None,
+    chunk_size: Annotated[int, typer.Option(help="Games per task.", min=1)] = 64,
+):
+    """Plays games with a strategy in parallel and prints the running stats as JSON lines"""
+    if strategy not in STRATEGIES:
+        raise typer.BadParameter(f"Unknown strategy {strategy}, choose from: {', '.join(STRATEGIES)}")
+
+    for stats, _ in simulate(n_games, width, height, n_mines, STRATEGIES[strategy], seed, workers, chunk_size):
+        print(json.dumps(stats.as_dict()), flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(app())
@@ -0,0 +1,354 @@
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple, Union
+from .minesweeper_ import MinesweeperHeadless
+from .probability import ProbabilityEngine
+from .utils import Action, GameState, Interaction
+
+_UNKNOWN = 0
+_OPENED = 1
+_MINE = 2
+_SAFE = 3
+
+
+@lru_cache(maxsize=16)
+def _neighbour_table(width: int, height: int) -> Tuple[Tuple[int, ...], ...]:
+    """The flat indices of the neighbours of every cell"""
+    table = []
+    for y in range(height):
+        for x in range(width):
+            table.append(
+                tuple(
+                    j * width + i
+                    for j in range(max(y - 1, 0), min(y + 2, height))
+                    for i in range(max(x - 1, 0), min(x + 2, width))
+                    if (i, j) != (x, y)
+                )
+            )
+    return tuple(table)
+
+
+class Solver:
+    """
+    Deduces safe cells and mines of a headless game from its visible state.
+
+    Every opened number with unknown neighbours is a constraint: the amount of mines among those neighbours. The
+    constraints are kept up to date incrementally. When cells are opened or deduced, only the constraints containing
+    them are examined again, with the single-constraint rules (no mines left, or as many mines as cells) and the
+    pairwise rule between overlapping constraints, which covers the subset rule.
+
+    The solver is plain Python and plays a few hundred expert games a second on one core. Larger amounts of games are
+    played in parallel processes with minesweeper-sim.
+    """
+
+    def __init__(self, game: MinesweeperHeadless, engine: Union[ProbabilityEngine, None] = None):
+        """
+        Args:
+            game: The game to watch. update() needs to be called after every action made outside of the solver.
+            engine: If given, guesses are made with the exact mine probabilities instead of the quick estimates.
+        """
+        self.game = game
+        self.engine = engine
+        self._width = game.width
+        self._height = game.height
+        self._n_mines = game.n_mines
+        self._nbrs = _neighbour_table(self._width, self._height)
+        self._reset()
+        self.update()
+
+    def _reset(self):
+        n_cells = self._width * self._height
+        self._state = bytearray(n_cells)
+        self._unknown: Set[int] = set(range(n_cells))
+        self._n_unopened = n_cells
+        # Constraints by the cell of their number: [unknown neighbours, mines among them]
+        self._constraints: Dict[int, list] = {}
+        # The constraints every unknown cell is part of
+        self._cell_constraints: List[Set[int]] = [set() for _ in range(n_cells)]
+        # Constraints that changed, and those of them that weren't compared with their overlapping constraints yet
+        self._dirty: Set[int] = set()
+        self._unpaired: Set[int] = set()
+        self._safe: Dict[int, None] = {}
+        self._mines: List[int] = []
+
+    def update(self):
+        """Takes the cells opened since the last update into account and deduces what follows from them"""
+        self._update(self.game.last_opened)
+
+    def _update(self, opened: List[Tuple[int, int]]):
+        game = self.game
+        if game.gamestate == GameState.NOT_STARTED:
+            if self._n_unopened != self._width * self._height:
+                self._reset()
+            return
+        if game.gamestate == GameState.LOST:
+            return
+
+        width = self._width
+        state = self._state
+        new = [y * width + x for x, y in opened if state[y * width + x] != _OPENED]
+        if game.n_unopened != self._n_unopened - len(new):
+            # Actions were made without an update in between, or a new game was started
+            self._reset()
+            new = [int(i) for i in (~game.unopened).ravel().nonzero()[0]]
+
+        # All new cells are opened before their constraints are built, so that these only contain unknown cells
+        state = self._state
+        for i in new:
+            if state[i] == _UNKNOWN:
+                self._remove_unknown(i)
+            elif state[i] == _SAFE:
+                self._safe.pop(i, None)
+            state[i] = _OPENED
+        self._n_unopened -= len(new)
+
+        obs = game.observe()
+        for i in new:
+            value = obs.item(i // width, i % width)
+            # The neighbours of empty cells are always opened with them
+            if value:
+                self._add_constraint(i, value)
+        self._propagate()
+
+    def _add_constraint(self, i: int, value: int):
+        state = self._state
+        cells = set()
+        for n in self._nbrs[i]:
+            s = state[n]
+            if s == _UNKNOWN:
+                cells.add(n)
+            elif s == _MINE:
+                value -= 1
+        if cells:
+            self._constraints[i] = [cells, value]
+            cell_constraints = self._cell_constraints
+            for n in cells:
+                cell_constraints[n].add(i)
+            self._dirty.add(i)
+
+    def _remove_unknown(self, i: int):
+        """Takes the cell out of the constraints it is part of"""
+        self._unknown.discard(i)
+        constraints = self._constraints
+        for c in self._cell_constraints[i]:
+            constraints[c][0].discard(i)
+            self._dirty.add(c)
+        self._cell_constraints[i].clear()
+
+    def _mark_safe(self, i: int):
+        if self._state[i] != _UNKNOWN:
+            return
+        self._remove_unknown(i)
+        self._state[i] = _SAFE
+        self._safe[i] = None
+
+    def _mark_mine(self, i: int):
+        if self._state[i] != _UNKNOWN:
+            return
+        constraints = self._constraints
+        for c in self._cell_constraints[i]:
+            constraints[c][1] -= 1
+        self._remove_unknown(i)
+        self._state[i] = _MINE
+        self._mines.append(i)
+
+    def _propagate(self):
+        """Applies the rules to the changed constraints until nothing more can be deduced"""
+        constraints = self._constraints
+        dirty = self._dirty
+        unpaired = self._unpaired
+        while dirty or unpaired:
+            # The single-constraint rules are cheap, so they are exhausted before any pairs are compared
+            while dirty:
+                c = dirty.pop()
+                constraint = constraints.get(c)
+                if constraint is None:
+                    continue
+                cells, count = constraint
+                if not cells:
+                    del constraints[c]
+                elif count == 0:
+                    for n in list(cells):
+                        self._mark_safe(n)
+                elif count == len(cells):
+                    for n in list(cells):
+                        self._mark_mine(n)
+                else:
+                    unpaired.add(c)
+
+            if unpaired:
+                self._compare_pairs(unpaired.pop())
+
+        # The total amount of mines decides the rest when all of them or none are left
+        mines_left = self._n_mines - len(self._mines)
+        if self._unknown and (mines_left == 0 or mines_left == len(self._unknown)):
+            mark = self._mark_safe if mines_left == 0 else self._mark_mine
+            for n in list(self._unknown):
+                mark(n)
+            self._propagate()
+
+    def _compare_pairs(self, c: int):
+        """Deduces from the constraint and an overlapping one, of which the subset rule is a special case"""
+        constraint = self._constraints.get(c)
+        if constraint is None or not constraint[0]:
+            return
+        cells, count = constraint
+        constraints = self._constraints
+        cell_constraints = self._cell_constraints
+
+        others = set()
+        for n in cells:
+            others |= cell_constraints[n]
+        others.discard(c)
+        for o in others:
+            other_cells, other_count = constraints[o]
+            # The mines only in the other constraint minus the mines only in this one is the difference of counts
+            only_other = other_cells - cells
+            only_this = cells - other_cells
+            difference = other_count - count
+            if difference == len(only_other):
+                mines, safe = only_other, only_this
+            elif -difference == len(only_this):
+                mines, safe = only_this, only_other
+            else:
+                continue
+            if mines or safe:
+                for n in mines:
+                    self._mark_mine(n)
+                for n in safe:
+                    self._mark_safe(n)
+                return
+
+    def safe_cells(self) -> List[Tuple[int, int]]:
+        """The unopened (x, y) cells that are known to be safe"""
+        return [(i % self._width, i // self._width) for i in self._safe]
+
+    def known_mines(self) -> List[Tuple[int, int]]:
+        """The (x, y) cells that are known to be mines"""
+        return [(i % self._width, i // self._width) for i in self._mines]
+
+    def mine_probability(self, x: int, y: int) -> float:
+        """
+        A quick estimate of the probability of a mine in the cell.
+
+        Cells at the frontier use their most constraining number, other cells the density of the mines left.
+        """
+        i = y * self._width + x
+        state = self._state[i]
+        if state != _UNKNOWN:
+            return float(state == _MINE)
+
+        if self._cell_constraints[i]:
+            constraints = self._constraints
+            return max(constraints[c][1] / len(constraints[c][0]) for c in self._cell_constraints[i])
+        return (self._n_mines - len(self._mines)) / len(self._unknown)
+
+    def best_guess(self) -> Tuple[int, int]:
+        """
+        The unknown and unflagged (x, y) cell with the lowest estimated mine probability, the centre before the first
+        move.
+
+        Raises:
+            ValueError: If every cell left to guess is flagged.
+        """
+        if self.game.gamestate == GameState.NOT_STARTED:
+            return self._width // 2, self._height // 2
+        width = self._width
+        flagged = self.game.flagged
+        candidates = [i for i in self._unknown if not flagged.item(i // width, i % width)]
+        if not candidates:
+            raise ValueError("Every cell left to guess is flagged.")
+        if self.engine is not None:
+            return self.engine.best_cell(self.game)
+        i = min(candidates, key=lambda i: self.mine_probability(i % width, i // width))
+        return i % width, i // width
+
+    def next_moves(self) -> List[Interaction]:
+        """Opens of all known safe cells, or a guess if there are none, or nothing if every cell left is flagged"""
+        if self._safe:
+            return [Interaction(x, y, Action.OPEN) for x, y in self.safe_cells()]
+        try:
+            return [Interaction(*self.best_guess(), Action.OPEN)]
+        except ValueError:
+            return []
+
+    def step(self) -> int:
+        """
+        Opens the known safe cells, or makes a guess if none of them can be opened.
+
+        Safe cells flagged outside of the solver are left alone and forgotten, as opening them would be ignored.
+
+        Returns:
+            The amount of actions made, 0 if the game is over or every cell left to guess is flagged.
+        """
+        game = self.game
+        if game.gamestate in (GameState.WON, GameState.LOST):
+            return 0
+        if self._safe:
+            n_actions = self._open_safe()
+            if n_actions or game.gamestate != GameState.PLAYING:
+                return n_actions
+
+        try:
+            guess = self.best_guess()
+        except ValueError:
+            return 0
+        self._make(Interaction(*guess, Action.OPEN))
+        return 1
+
+    def _open_safe(self) -> int:
+        # The safe cells are opened without updating in between, as opening them can't reveal anything unexpected
+        game = self.game
+        unopened = game.unopened
+        flagged = game.flagged
+        opened = []
+        n_actions = 0
+        for x, y in self.safe_cells():
+            if flagged.item(y, x):
+                del self._safe[y * self._width + x]
+            elif unopened.item(y, x):
+                game.make_interaction(Interaction(x, y, Action.OPEN))
+                opened += game.last_opened
+                n_actions += 1
+                if game.gamestate != GameState.PLAYING:
+                    break
+        self._update(opened)
+        return n_actions
+
+    def _make(self, act: Interaction):
+        self.game.make_interaction(act)
+        self.update()
+
+    def play(self) -> GameState:
+        """
+        Plays the current game until it is won or lost and returns the final state.
+
+        The game stays in play if only cells flagged outside of the solver are left to open.
+        """
+        while self.game.gamestate in (GameState.NOT_STARTED, GameState.PLAYING):
+            if not self.step():
+                break
+        return self.game.gamestate
+
+
+def play_games(
+    n_games: int,
+    width: int,
+    height: int,
+    n_mines: int,
+    rnd_seed: Union[int, None] = None,
+    engine: Union[ProbabilityEngine, None] = None,
+) -> Tuple[int, int]:
+    """
+    Lets the solver play games on a single headless instance, guessing with the probability engine if given.
+
+    Returns:
+        The amounts of games won and lost.
+    """
+    game = MinesweeperHeadless(width, height, n_mines, rnd_seed=rnd_seed)
+    solver = Solver(game, engine)
+    won = 0
+    for _ in range(n_games):
+        won += solver.play() == GameState.WON
+        game.make_interaction(Interaction(-1, -1, Action.NEW_GAME))
+        solver.update()
+    return won, n_games - won
@@ -0,0 +1,82 @@
+from dataclasses import asdict, dataclass, field
+import time
+from typing import Any, Callable, Dict, Union
+from .utils import Action, GameState, Interaction
+
+type ActionHook = Callable[[Any, Interaction, int], None]
+
+
+@dataclass
+class GameStats:
+    """Counters of one or more instrumented games"""
+
+    actions: Dict[str, int] = field(default_factory=lambda: {action.name: 0 for action in Action})
+    generation_time: float = 0.0
+    flood_fill_time: float = 0.0
+    win_check_time: float = 0.0
+    open_actions: int = 0
+    cells_revealed: int = 0
+    max_cells_revealed: int = 0
+    games_won: int = 0
+    games_lost: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = asdict(self)
+        stats["cells_revealed_per_open"] = self.cells_revealed / self.open_actions if self.open_actions else 0.0
+        return stats
+
+
+class Instrumentation:
+    """Collects the counters of the current game and of all games of an instrumented game instance"""
+
+    def __init__(self, hook: Union[ActionHook, None] = None):
+        """
+        Args:
+            hook: Called after every action with the game, the interaction and the amount of cells it revealed.
+        """
+        self.hook = hook
+        self.game = GameStats()
+        self.total = GameStats()
+        self._start = time.perf_counter()
+
+    def new_game(self):
+        self.game = GameStats()
+
+    def add_generation_time(self, duration: float):
+        self.game.generation_time += duration
+        self.total.generation_time += duration
+
+    def add_flood_fill_time(self, duration: float):
+        self.game.flood_fill_time += duration
+        self.total.flood_fill_time += duration
+
+    def add_win_check_time(self, duration: float):
+        self.game.win_check_time += duration
+        self.total.win_check_time += duration
+
+    def record_action(self, game: Any, act: Interaction, n_revealed: int, gamestate_before: GameState):
+        """Counts the action and the cells it revealed, and the end of the game if the action ended it"""
+        for stats in (self.game, self.total):
+            stats.actions[act.action.name] += 1
+            if act.action == Action.OPEN:
+                stats.open_actions += 1
+                stats.cells_revealed += n_revealed
+                stats.max_cells_revealed = max(stats.max_cells_revealed, n_revealed)
+
+            if gamestate_before != game.gamestate:
+                stats.games_won += game.gamestate == GameState.WON
+                stats.games_lost += game.gamestate == GameState.LOST
+
+        if self.hook is not None:
+            self.hook(game, act, n_revealed)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters of the current game and the totals as dictionaries"""
+        elapsed = time.perf_counter() - self._start
+        n_games = self.total.games_won + self.total.games_lost
+        return {
+            "game": self.game.as_dict(),
+            "total": self.total.as_dict(),
+            "elapsed": elapsed,
+            "games_per_s": n_games / elapsed if elapsed > 0 else 0.0,
+        }
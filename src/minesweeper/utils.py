@@ -1,6 +1,11 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
+from typing import Sequence, Tuple, Union
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+CELL_DTYPE = np.int8
 
 
 class CellState(Enum):
@@ -49,13 +54,28 @@ class CellState(Enum):
         return self.num() == value
 
     def num(self) -> int:
-        return [i.value for i in CellState].index(self.value)
+        """Returns the fixed integer code used for this state in the grid arrays"""
+        return _CELL_CODES[self.value]
+
+    @classmethod
+    def by_num(cls, code: int) -> CellState:
+        """Returns the state for the given integer code"""
+        return _CELL_STATES[code]
 
     @classmethod
     def by_mine_amount(cls, value: int) -> CellState:
         return CellState(f"square open{value}")
 
 
+_CELL_STATES: Tuple[CellState, ...] = tuple(CellState)
+_CELL_CODES = {state.value: code for code, state in enumerate(_CELL_STATES)}
+
+
+def as_cellstates(grid: NDArray) -> NDArray:
+    """Converts an array of integer cell codes into an object array of CellState members"""
+    return np.array(_CELL_STATES, dtype=object)[grid]
+
+
 class Action(Enum):
     """Enumeration for the possible actions to make in the game"""
 
@@ -75,6 +95,41 @@ class Interaction:
     action: Action
 
 
+# Actions as rows of a structured array, with the Action values
+INTERACTION_DTYPE = np.dtype([("x", "<i4"), ("y", "<i4"), ("action", "u1")])
+
+# Actions as a structured array like INTERACTION_DTYPE, or as Interactions or (x, y, action) tuples, where the action is
+# an Action or its value
+type InteractionsLike = Union[ArrayLike, Sequence[Union[Interaction, Tuple[int, int, Union[Action, int]]]]]
+
+# What an action did: the amount of cells it opened and the game state values and mines left after it
+OUTCOME_DTYPE = np.dtype([("n_opened", "<i4"), ("gamestate", "u1"), ("mines_left", "<i4")])
+
+
+def as_interaction_array(acts: InteractionsLike) -> NDArray:
+    """
+    Converts actions into a structured array of INTERACTION_DTYPE.
+
+    Args:
+        acts: A structured array with the fields x, y and action, or a sequence of Interactions or (x, y, action)
+            tuples, where the action is an Action or its value.
+    """
+    if isinstance(acts, np.ndarray) and acts.dtype.names is not None:
+        result = np.empty(len(acts), dtype=INTERACTION_DTYPE)
+        for name in INTERACTION_DTYPE.names:  # type: ignore
+            result[name] = acts[name]
+        return result
+
+    rows = []
+    for act in acts:  # type: ignore
+        if isinstance(act, Interaction):
+            rows.append((act.x, act.y, act.action.value))
+        else:
+            x, y, action = act
+            rows.append((x, y, action.value if isinstance(action, Action) else action))
+    return np.array(rows, dtype=INTERACTION_DTYPE)
+
+
 class GameState(Enum):
     """Enumeration fo the possible states of the game"""
 
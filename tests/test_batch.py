@@ -0,0 +1,102 @@
+import unittest
+import numpy as np
+from src.minesweeper.batch import MinesweeperBatch, label_empty_areas
+from src.minesweeper.minefield import MineField
+from src.minesweeper.minesweeper_ import MinesweeperHeadless
+from src.minesweeper.utils import Action, CellState, GameState, Interaction
+
+_MINE = CellState.MINE.num()
+_UNOPENED = CellState.UNOPENED.num()
+
+
+class _FixedMinesHeadless(MinesweeperHeadless):
+    """Headless game that uses the mine layout it is given instead of generating one"""
+
+    mines = np.zeros((0, 0), dtype=np.bool)
+
+    def _new_minefield(self, x: int, y: int):
+        self._mf = MineField.from_mines(self.mines)
+
+
+class TestMinesweeperBatch(unittest.TestCase):
+    """Tests for the MinesweeperBatch class"""
+
+    def test_matches_headless(self):
+        """Plays random actions in a batch and in headless games with the same layouts"""
+        self._play_against_headless(16, 9, 9, 10, open_rate=0.8)
+
+    def test_matches_headless_wins(self):
+        """Wins on small boards with many flags, some of which flood fills open"""
+        self._play_against_headless(32, 7, 3, 2, open_rate=0.5)
+
+    def _play_against_headless(self, n_games: int, width: int, height: int, n_mines: int, open_rate: float):
+        rng = np.random.default_rng(1)
+        batch = MinesweeperBatch(n_games, width, height, n_mines, rnd_seed=1, auto_reset=False)
+        games = [_FixedMinesHeadless(width, height, n_mines) for _ in range(n_games)]
+
+        for _ in range(300):
+            xs = rng.integers(0, width, n_games)
+            ys = rng.integers(0, height, n_games)
+            actions = np.where(rng.random(n_games) < open_rate, Action.OPEN.value, Action.FLAG.value)
+            previous = batch.gamestates
+            done = previous >= GameState.LOST.value
+            actions[done] = Action.NEW_GAME.value
+
+            obs, gamestates, rewards = batch.step(xs, ys, actions)
+
+            for i, ms in enumerate(games):
+                ms.mines = batch._values[i] == _MINE
+                ms.make_interaction(Interaction(int(xs[i]), int(ys[i]), Action(int(actions[i]))))
+
+                self.assertEqual(gamestates[i], ms.gamestate.value)
+                self.assertTrue((obs[i] == ms.observe()).all())
+                self.assertEqual(batch.mines_left[i], ms.mines_left)
+                ended = not done[i] and ms.gamestate.value != previous[i]
+                self.assertEqual(
+                    rewards[i], {GameState.WON: 1, GameState.LOST: -1}.get(ms.gamestate, 0) if ended else 0
+                )
+
+    def test_first_click_is_safe(self):
+        batch = MinesweeperBatch(64, 30, 16, 99, rnd_seed=0)
+        rng = np.random.default_rng(0)
+        xs = rng.integers(0, 30, 64)
+        ys = rng.integers(0, 16, 64)
+        _, gamestates, _ = batch.step(xs, ys, Action.OPEN.value)
+
+        mines = batch._values == _MINE
+        self.assertTrue((mines.sum(axis=(1, 2)) == 99).all())
+        for i in range(64):
+            self.assertFalse(mines[i, max(ys[i] - 1, 0) : ys[i] + 2, max(xs[i] - 1, 0) : xs[i] + 2].any())
+        self.assertTrue(np.isin(gamestates, (GameState.PLAYING.value, GameState.WON.value)).all())
+
+    def test_auto_reset(self):
+        batch = MinesweeperBatch(2, 3, 3, 0, rnd_seed=0)
+        _, gamestates, rewards = batch.step(0, 0, Action.OPEN.value)
+        self.assertTrue((gamestates == GameState.WON.value).all())
+        self.assertTrue((rewards == 1).all())
+
+        obs, gamestates, rewards = batch.step(0, 0, Action.OPEN.value)
+        self.assertTrue((gamestates == GameState.NOT_STARTED.value).all())
+        self.assertTrue((obs == _UNOPENED).all())
+        self.assertTrue((rewards == 0).all())
+
+    def test_label_empty_areas(self):
+        empty = np.array(
+            [
+                [1, 1, 0, 0, 1],
+                [0, 0, 0, 0, 1],
+                [0, 1, 0, 1, 0],
+                [1, 0, 0, 0, 0],
+            ],
+            dtype=np.bool,
+        )
+        n = 20
+        expected = np.array(
+            [
+                [0, 0, n, n, 4],
+                [n, n, n, n, 4],
+                [n, 11, n, 4, n],
+                [11, n, n, n, n],
+            ]
+        )
+        self.assertTrue((label_empty_areas(empty[None]) == expected).all())
@@ -0,0 +1,32 @@
+import json
+import os
+import tempfile
+import unittest
+from src.minesweeper.benchmark import run_benchmarks
+
+
+class TestBenchmark(unittest.TestCase):
+    """Tests for the benchmark suite"""
+
+    def test_run_benchmarks(self):
+        results = list(run_benchmarks(["beginner"], repeat=1))
+        names = {result["benchmark"] for result in results}
+        self.assertTrue(
+            {"minefield", "interactions", "flood_fill", "solver", "replay", "replay_bulk", "render"} <= names
+        )
+        for result in results:
+            n_ops, best_s, mean_s = result["n_ops"], result["best_s"], result["mean_s"]
+            assert isinstance(n_ops, int) and isinstance(best_s, float) and isinstance(mean_s, float)
+            self.assertGreater(n_ops, 0)
+            self.assertLessEqual(best_s, mean_s)
+            self.assertEqual(json.loads(json.dumps(result)), result)
+
+    def test_sessions_found_outside_repo(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                names = {result["benchmark"] for result in run_benchmarks(["beginner"], repeat=1)}
+            finally:
+                os.chdir(cwd)
+        self.assertIn("replay", names)
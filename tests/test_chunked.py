@@ -0,0 +1,103 @@
+import time
+import unittest
+import numpy as np
+from src.minesweeper.batch import _dilate
+from src.minesweeper.chunked import ChunkedMineField, MinesweeperChunked, index_empty_areas
+from src.minesweeper.minesweeper_ import MinesweeperHeadless
+from src.minesweeper.utils import Action, CellState, GameState, Interaction
+
+_FLAG = CellState.FLAG.num()
+
+
+class TestMinesweeperChunked(unittest.TestCase):
+    """Tests for the chunked game for large boards"""
+
+    def test_matches_headless(self):
+        width, height, n_mines = 13, 11, 20
+        rng = np.random.default_rng(0)
+        for game in range(20):
+            mines = np.zeros(width * height, dtype=np.bool)
+            mines[rng.choice(width * height, n_mines, replace=False)] = True
+            mines = mines.reshape(height, width)
+
+            headless = MinesweeperHeadless(width, height, n_mines)
+            chunked = MinesweeperChunked(width, height, n_mines, chunk_size=4)
+            headless.set_next_minefield(mines)
+            chunked.set_next_minefield(mines)
+
+            safe = np.argwhere(~mines)[rng.integers(int((~mines).sum()))]
+            acts = [Interaction(int(safe[1]), int(safe[0]), Action.OPEN)]
+            for _ in range(60):
+                action = Action.FLAG if rng.random() < 0.2 else Action.OPEN
+                acts.append(Interaction(int(rng.integers(width)), int(rng.integers(height)), action))
+
+            for act in acts:
+                headless.make_interaction(act)
+                chunked.make_interaction(act)
+                self.assertEqual(chunked.gamestate, headless.gamestate)
+                self.assertEqual(sorted(chunked.last_opened), sorted(headless.last_opened))
+                self.assertEqual(
+                    (chunked.n_unopened, chunked.n_revealed, chunked.n_correct_flags, chunked.mines_left),
+                    (headless.n_unopened, headless.n_revealed, headless.n_correct_flags, headless.mines_left),
+                )
+                self.assertTrue((chunked.observe(0, 0, width, height) == headless.observe()).all())
+                self.assertEqual(chunked.cell(act.x, act.y), headless.observe()[act.y, act.x])
+
+    def test_generated_layout(self):
+        seed = np.random.SeedSequence(5)
+        mf = ChunkedMineField(50, 37, 400, 20, 10, seed, chunk_size=8)
+        keys = [(cx, cy) for cy in range(5) for cx in range(7)]
+        mines = np.block([[mf.chunk_mines((cx, cy)) for cx in range(7)] for cy in range(5)])
+        self.assertEqual(mines.shape, (37, 50))
+        self.assertEqual(mines.sum(), 400)
+        self.assertFalse(mines[9:12, 19:22].any())
+
+        # The layout doesn't depend on the order in which the chunks are generated
+        other = ChunkedMineField(50, 37, 400, 20, 10, seed, chunk_size=8)
+        for key in reversed(keys):
+            self.assertTrue((other.chunk_mines(key) == mf.chunk_mines(key)).all())
+
+    def test_index_empty_areas(self):
+        """The listed cells of every area are the area and its border, in the chunk padded by a ring of cells"""
+        mines = np.random.default_rng(3).random((12, 10)) < 0.15
+        mf = ChunkedMineField.from_mines(mines, chunk_size=16)
+        labels = mf.chunk_labels((0, 0))
+        area_labels, starts, cells = index_empty_areas(labels)
+        self.assertEqual(sorted(area_labels.tolist()), sorted(np.unique(labels[labels < 120]).tolist()))
+        for k, label in enumerate(area_labels.tolist()):
+            padded = np.zeros((14, 12), dtype=np.bool)
+            padded[1:-1, 1:-1] = labels == label
+            expected = np.flatnonzero(_dilate(padded))
+            self.assertEqual(sorted(cells[starts[k] : starts[k + 1]].tolist()), expected.tolist())
+
+    def test_out_of_bounds(self):
+        ms = MinesweeperChunked(100, 100, 1000, rnd_seed=1, chunk_size=32)
+        self.assertFalse(ms.is_unbounded)
+        ms.make_interaction(Interaction(50, 50, Action.OPEN))
+        n_unopened = ms.n_unopened
+        n_chunks = ms.n_chunks_materialized
+        for x, y in ((-1, 50), (-40, 50), (50, -1), (100, 50), (50, 100)):
+            for action in (Action.OPEN, Action.FLAG):
+                with self.assertRaises(ValueError):
+                    ms.make_interaction(Interaction(x, y, action))
+        self.assertEqual(n_unopened, ms.n_unopened)
+        self.assertEqual(n_chunks, ms.n_chunks_materialized)
+        self.assertEqual(GameState.PLAYING, ms.gamestate)
+
+    def test_huge_board(self):
+        ms = MinesweeperChunked(10_000, 10_000, 20_000_000, rnd_seed=0)
+        start = time.perf_counter()
+        ms.make_interaction(Interaction(5000, 5000, Action.OPEN))
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(ms.gamestate, GameState.PLAYING)
+        self.assertGreaterEqual(ms.n_revealed, 9)
+        self.assertEqual(len(ms.last_opened), ms.n_revealed)
+        self.assertEqual(ms.n_unopened, 10_000 * 10_000 - ms.n_revealed)
+        self.assertLessEqual(ms.n_chunks_materialized, 4)
+
+        n_chunks = ms.n_chunks_materialized
+        ms.make_interaction(Interaction(9999, 0, Action.FLAG))
+        self.assertEqual(ms.n_chunks_materialized, n_chunks + 1)
+        self.assertEqual(ms.cell(9999, 0), _FLAG)
+        self.assertEqual(ms.mines_left, 20_000_000 - 1)
+        self.assertEqual(ms.observe(4999, 4999, 3, 3)[1, 1], ms.cell(5000, 5000))
@@ -0,0 +1,150 @@
+from queue import Queue
+from threading import Thread
+import time
+from typing import Tuple, Union
+import unittest
+import numpy as np
+from numpy.typing import NDArray
+from src.minesweeper.frames import FrameBuffer
+from src.minesweeper.minesweeper_ import Minesweeper
+from src.minesweeper.utils import CELL_DTYPE, Action, CellState, GameState, Interaction
+
+
+class TestFrameBuffer(unittest.TestCase):
+    """Tests the handoff of frames from the game thread to the ui thread"""
+
+    def test_first_frame(self):
+        frames = FrameBuffer((3, 4), 5)
+        out = np.zeros((3, 4), dtype=CELL_DTYPE)
+        frame = frames.read(out)
+        assert frame is not None
+        self.assertEqual(0, frame.version)
+        self.assertEqual(GameState.NOT_STARTED, frame.gamestate)
+        self.assertEqual(5, frame.mines_left)
+        self.assertTrue((out == CellState.UNOPENED.num()).all())
+
+    def test_read_skips_stale_frames(self):
+        frames = FrameBuffer((2, 2), 1)
+        out = np.empty((2, 2), dtype=CELL_DTYPE)
+        for value in range(1, 4):
+            frames.publish(np.full((2, 2), value, dtype=CELL_DTYPE), GameState.PLAYING, value, input_time=value)
+
+        frame = frames.read(out)
+        assert frame is not None
+        self.assertEqual(3, frame.version)
+        self.assertEqual(3, frame.mines_left)
+        self.assertEqual(3, frame.input_time)
+        self.assertTrue((out == 3).all())
+        self.assertIsNone(frames.read(out, frame.version))
+
+    def test_published_board_is_a_copy(self):
+        frames = FrameBuffer((2, 2), 1)
+        grid = np.zeros((2, 2), dtype=CELL_DTYPE)
+        frames.publish(grid, GameState.PLAYING, 1)
+        grid[:] = 7
+        out = np.empty((2, 2), dtype=CELL_DTYPE)
+        frames.read(out)
+        self.assertTrue((out == 0).all())
+
+    def test_concurrent_reads_never_tear(self):
+        shape = (64, 64)
+        frames = FrameBuffer(shape, 0)
+        n_frames = 2000
+
+        def publish():
+            grid = np.empty(shape, dtype=CELL_DTYPE)
+            for version in range(1, n_frames + 1):
+                grid[:] = version % 100
+                frames.publish(grid, GameState.PLAYING, version)
+
+        writer = Thread(target=publish)
+        writer.start()
+        out = np.empty(shape, dtype=CELL_DTYPE)
+        version = 0
+        while version < n_frames:
+            frame = frames.read(out, version)
+            if frame is None:
+                continue
+            self.assertGreater(frame.version, version)
+            self.assertTrue((out == frame.mines_left % 100).all())
+            version = frame.version
+        writer.join()
+
+
+class _FakeUI:
+    """Stand-in for the ui, which takes its events from a queue and records the frames it draws"""
+
+    def __init__(self):
+        self.events: Queue[Union[Interaction, None]] = Queue()
+        self.frames: Queue[Tuple[NDArray, GameState, int]] = Queue()
+        self.invalidated = True
+
+    def draw_frame(self, visible_grid: NDArray, gamestate: GameState, mines: int):
+        self.invalidated = False
+        self.frames.put((visible_grid.copy(), gamestate, mines))
+
+    def get_interaction(self) -> Union[Interaction, None]:
+        return None if self.events.empty() else self.events.get()
+
+    def wait_interaction(self) -> Union[Interaction, None]:
+        return self.events.get(timeout=5)
+
+    def wake(self):
+        self.events.put(None)
+
+
+class TestGameLoop(unittest.TestCase):
+    """Tests that the game thread makes bursts of input and publishes frames of them"""
+
+    def test_burst_is_published_once(self):
+        ms = Minesweeper(9, 9, 10, rnd_seed=1)
+        ms._running = True
+        for act in [Interaction(4, 4, Action.OPEN), Interaction(0, 0, Action.FLAG), Interaction(0, 0, Action.FLAG)]:
+            ms._interactions.append((act, time.perf_counter()))
+        first_input = ms._interactions[0][1]
+        ms._input_event.set()
+
+        game = Thread(target=ms._run)
+        game.start()
+        deadline = time.monotonic() + 5
+        while ms._frames.latest.version == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        ms._running = False
+        ms._send_interaction(Interaction(-1, -1, Action.EXIT))
+        game.join(timeout=5)
+
+        frame = ms._frames.latest
+        self.assertEqual(1, frame.version)
+        self.assertEqual(first_input, frame.input_time)
+        self.assertEqual(ms.gamestate, frame.gamestate)
+        out = np.empty((9, 9), dtype=CELL_DTYPE)
+        ms._frames.read(out)
+        self.assertTrue((out == ms.observe()).all())
+
+    def test_event_driven_ui(self):
+        """The ui draws the first frame before it waits for input, and is woken up for the frames of the input"""
+        ms = Minesweeper(9, 9, 10, rnd_seed=1, event_driven=True)
+        ui = _FakeUI()
+        ms._ui_class = lambda width, height: ui
+        ms._running = True
+        ui_thread = Thread(target=ms._update_ui)
+        ui_thread.start()
+
+        grid, gamestate, mines = ui.frames.get(timeout=5)
+        self.assertEqual(GameState.NOT_STARTED, gamestate)
+        self.assertEqual(10, mines)
+        self.assertTrue((grid == CellState.UNOPENED.num()).all())
+
+        game_thread = Thread(target=ms._run)
+        game_thread.start()
+        ui.events.put(Interaction(4, 4, Action.OPEN))
+        grid, gamestate, _ = ui.frames.get(timeout=5)
+        self.assertEqual(GameState.PLAYING, gamestate)
+        self.assertTrue((grid == ms.observe()).all())
+        self.assertEqual(1, ms.latency_stats()["n"])
+
+        ui.events.put(Interaction(-1, -1, Action.EXIT))
+        ui_thread.join(timeout=5)
+        game_thread.join(timeout=5)
+        self.assertFalse(ui_thread.is_alive() or game_thread.is_alive())
+        self.assertTrue(ui.frames.empty())
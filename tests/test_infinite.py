@@ -0,0 +1,188 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.minesweeper.infinite import InfiniteMineField, MinesweeperInfinite
+from src.minesweeper.minefield import count_neighbour_mines
+from src.minesweeper.utils import Action, CellState, GameState, Interaction
+
+_CELL_0 = CellState.CELL_0.num()
+_UNOPENED = CellState.UNOPENED.num()
+_FLAG = CellState.FLAG.num()
+_MINE = CellState.MINE.num()
+
+
+def _region(chunks, x0: int, y0: int, width: int, height: int, size: int):
+    """Stitches the chunks returned by chunks(key) into a region of the board"""
+    cxs = range(x0 // size, (x0 + width - 1) // size + 1)
+    cys = range(y0 // size, (y0 + height - 1) // size + 1)
+    block = np.block([[chunks((cx, cy)) for cx in cxs] for cy in cys])
+    left = x0 - cxs[0] * size
+    top = y0 - cys[0] * size
+    return block[top : top + height, left : left + width]
+
+
+def _minefield(ms: MinesweeperInfinite) -> InfiniteMineField:
+    """The minefield of the started game"""
+    assert isinstance(ms._mf, InfiniteMineField)
+    return ms._mf
+
+
+class TestMinesweeperInfinite(unittest.TestCase):
+    """Tests for the unbounded board"""
+
+    def _open_empty(self, ms: MinesweeperInfinite, x: int, y: int):
+        """Opens an empty cell of the chunk containing the given cell"""
+        size = ms._chunk_size
+        key = (x // size, y // size)
+        j, i = np.argwhere(_minefield(ms).chunk_values(key) == _CELL_0)[0]
+        ms.make_interaction(Interaction(int(key[0] * size + i), int(key[1] * size + j), Action.OPEN))
+
+    def test_values(self):
+        mf = InfiniteMineField(0.3, (7, 0), 0, 0, chunk_size=8)
+        mines = _region(mf.chunk_mines, -21, -13, 42, 30, 8)
+        values = _region(mf.chunk_values, -20, -12, 40, 28, 8)
+        expected = np.where(mines[1:-1, 1:-1], _MINE, count_neighbour_mines(mines)[1:-1, 1:-1])
+        self.assertTrue((values == expected).all())
+        self.assertFalse(_region(mf.chunk_mines, -1, -1, 3, 3, 8).any())
+
+    def test_deterministic(self):
+        first = InfiniteMineField(0.2, (3, 1), 0, 0, chunk_size=16)
+        second = InfiniteMineField(0.2, (3, 1), 0, 0, chunk_size=16, cache_size=2)
+        keys = [(0, 0), (5, -3), (-100, 42), (1, 1)]
+        layouts = [first.chunk_mines(key).copy() for key in keys]
+        for key, mines in reversed(list(zip(keys, layouts))):
+            self.assertTrue((second.chunk_mines(key) == mines).all())
+        self.assertFalse((first.chunk_mines((0, 1)) == first.chunk_mines((1, 0))).all())
+
+        other = InfiniteMineField(0.2, (3, 2), 0, 0, chunk_size=16)
+        self.assertFalse((other.chunk_mines((5, -3)) == layouts[1]).all())
+
+    def test_flood_fill_crosses_chunks(self):
+        ms = MinesweeperInfinite(0.12, rnd_seed=4, chunk_size=4)
+        ms.make_interaction(Interaction(-3, -5, Action.OPEN))
+        self.assertEqual(ms.gamestate, GameState.PLAYING)
+
+        opened = np.array(ms.last_opened)
+        self.assertEqual(len(opened), ms.n_revealed)
+        self.assertGreater(len({(x // 4, y // 4) for x, y in opened.tolist()}), 4)
+        x0, y0 = opened.min(axis=0) - 2
+        width, height = opened.max(axis=0) - (x0, y0) + 3
+
+        visible = ms.observe(int(x0), int(y0), int(width), int(height))
+        values = _region(_minefield(ms).chunk_values, int(x0), int(y0), int(width), int(height), 4)
+        is_open = visible != _UNOPENED
+        self.assertEqual(np.count_nonzero(is_open), len(opened))
+        self.assertTrue((visible[is_open] == values[is_open]).all())
+        self.assertFalse((values[is_open] == _MINE).any())
+
+        # Every opened empty cell has all its neighbours opened, and every opened cell borders an opened empty cell
+        empty = np.pad(is_open & (values == _CELL_0), 1)
+        near_empty = count_neighbour_mines(empty)[1:-1, 1:-1] > 0
+        self.assertTrue(is_open[near_empty].all())
+        self.assertTrue(near_empty[is_open].all())
+
+    def test_flood_fill_limit(self):
+        ms = MinesweeperInfinite(0.01, rnd_seed=0, chunk_size=32, max_chunks=64, max_flood_cells=5000)
+        ms.make_interaction(Interaction(0, 0, Action.OPEN))
+        self.assertGreaterEqual(ms.n_revealed, 5000)
+        self.assertLess(ms.n_revealed, 5000 + 64 * 32 * 32)
+        self.assertLessEqual(ms.n_chunks_materialized, 64)
+        self.assertTrue(ms.flood_fill_pending)
+
+    def test_flood_fill_continues(self):
+        """Continuing a flood fill that stopped at the limit opens the same cells as a fill without a limit"""
+        full = MinesweeperInfinite(0.12, rnd_seed=3, chunk_size=16, max_chunks=1024, max_flood_cells=10**9)
+        full.make_interaction(Interaction(0, 0, Action.OPEN))
+        self.assertFalse(full.flood_fill_pending)
+        self.assertEqual(full.continue_flood_fill(), 0)
+
+        ms = MinesweeperInfinite(0.12, rnd_seed=3, chunk_size=16, max_chunks=1024, max_flood_cells=200)
+        ms.make_interaction(Interaction(0, 0, Action.OPEN))
+        self.assertTrue(ms.flood_fill_pending)
+        n_steps = 0
+        while ms.flood_fill_pending:
+            revealed = ms.n_revealed
+            n_opened = ms.continue_flood_fill()
+            self.assertEqual(ms.n_revealed - revealed, n_opened)
+            self.assertEqual(len(ms.last_opened), n_opened)
+            n_steps += 1
+        self.assertGreater(n_steps, 1)
+        self.assertEqual(ms.n_revealed, full.n_revealed)
+        self.assertTrue((ms.observe(-200, -200, 400, 400) == full.observe(-200, -200, 400, 400)).all())
+
+        ms.make_interaction(Interaction(0, 0, Action.NEW_GAME))
+        self.assertFalse(ms.flood_fill_pending)
+
+    def test_spill_budget(self):
+        with tempfile.TemporaryDirectory() as folder:
+            ms = MinesweeperInfinite(
+                0.15, rnd_seed=2, chunk_size=8, max_chunks=4, spill_dir=folder, max_spilled_bytes=200
+            )
+            ms.make_interaction(Interaction(0, 0, Action.OPEN))
+            for step in range(1, 30):
+                self._open_empty(ms, 1000 * step, -700 * step)
+                self.assertLessEqual(ms.spilled_bytes, 200)
+            self.assertGreater(ms.spilled_bytes, 0)
+            (spill_dir,) = os.listdir(folder)
+            self.assertTrue(os.listdir(os.path.join(folder, spill_dir)))
+            ms.close()
+            self.assertFalse(os.listdir(folder))
+
+    def test_eviction_restores(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for spill_dir, max_spilled_bytes in ((None, 2**20), (folder, 0)):
+                ms = MinesweeperInfinite(
+                    0.15,
+                    rnd_seed=2,
+                    chunk_size=8,
+                    max_chunks=4,
+                    spill_dir=spill_dir,
+                    max_spilled_bytes=max_spilled_bytes,
+                )
+                ms.make_interaction(Interaction(0, 0, Action.OPEN))
+                for x, y in np.argwhere(ms.observe(-20, -20, 40, 40) == _UNOPENED)[::7, ::-1].tolist():
+                    ms.make_interaction(Interaction(x - 20, y - 20, Action.FLAG))
+                before = ms.observe(-20, -20, 40, 40)
+                states = {key: (ms._unopened[key].copy(), ms._flagged[key].copy()) for key in ms._unopened}
+                revealed = ms.n_revealed
+
+                for step in range(1, 30):
+                    self._open_empty(ms, 1000 * step, -700 * step)
+                    self.assertLessEqual(ms.n_chunks_materialized, 4)
+                self.assertGreater(ms.n_evictions, 0)
+                self.assertGreater(ms.n_revealed, revealed)
+
+                self.assertTrue((ms.observe(-20, -20, 40, 40) == before).all())
+                for key, (unopened, flagged) in states.items():
+                    ms.cell(key[0] * 8, key[1] * 8)
+                    self.assertTrue((ms._unopened[key] == unopened).all())
+                    self.assertTrue((ms._flagged[key] == flagged).all())
+                self.assertEqual(ms.mines_left, -int((before == _FLAG).sum()))
+
+                ms.make_interaction(Interaction(0, 0, Action.NEW_GAME))
+                self.assertTrue((ms.observe(-20, -20, 40, 40) == _UNOPENED).all())
+                ms.close()
+
+    def test_bounded_memory(self):
+        ms = MinesweeperInfinite(0.2, rnd_seed=1, chunk_size=16, max_chunks=8)
+        ms.make_interaction(Interaction(0, 0, Action.OPEN))
+        for step in range(1, 300):
+            self._open_empty(ms, 100 * step, 37 * step)
+            self.assertEqual(ms.gamestate, GameState.PLAYING)
+            self.assertLessEqual(ms.n_chunks_materialized, 8)
+            self.assertLessEqual(len(_minefield(ms)._mines), 8)
+
+    def test_not_winnable(self):
+        ms = MinesweeperInfinite(0.2)
+        self.assertTrue(ms.is_unbounded)
+        with self.assertRaises(ValueError):
+            ms.n_unopened
+        with self.assertRaises(ValueError):
+            ms.set_next_minefield(np.zeros((3, 3), dtype=np.bool))
+        with self.assertRaises(ValueError):
+            MinesweeperInfinite(1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
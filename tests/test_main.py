@@ -0,0 +1,16 @@
+import unittest
+from typer.testing import CliRunner
+from src.minesweeper.main import MAX_UI_HEIGHT, MAX_UI_WIDTH, app
+
+
+class TestMain(unittest.TestCase):
+    """Tests for the command line interface"""
+
+    def test_no_clamp_rejects_boards_too_large_for_a_window(self):
+        result = CliRunner().invoke(app, [str(MAX_UI_WIDTH + 1), str(MAX_UI_HEIGHT), "10", "--no-clamp"])
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("MinesweeperChunked", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()
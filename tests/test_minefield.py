@@ -1,7 +1,7 @@
 import unittest
 import numpy as np
 from numpy.typing import NDArray
-from src.minesweeper.minefield import CellState, MineField
+from src.minesweeper.minefield import CellState, MineField, count_neighbour_mines
 
 _W = CellState.WALL
 _M = CellState.MINE
@@ -31,6 +31,13 @@ class TestCellState(unittest.TestCase):
         self.assertEqual(_8, CellState.by_mine_amount(8))
         self.assertRaises(ValueError, lambda: CellState.by_mine_amount(9))
 
+    def test_cellstate_codes(self):
+        for code, state in enumerate(CellState):
+            self.assertEqual(state.num(), code)
+            self.assertIs(CellState.by_num(code), state)
+        self.assertEqual(_M, CellState.MINE.num())
+        self.assertEqual(MineField(6, 4, 4, 0, 0).get_minefield().dtype, np.int8)
+
 
 class TestMinesField(unittest.TestCase):
     """Tests for the MineField class"""
@@ -42,8 +49,7 @@ class TestMinesField(unittest.TestCase):
                 self.assertEqual(value, result[j][i])
 
     def test_neighbours(self):
-        np.random.seed(41)
-        mf = MineField(6, 4, 4, 0, 0)
+        mf = MineField(6, 4, 4, 0, 0, rnd_seed=41, legacy_seeding=True)
 
         nbs = mf.neighbours(0, 0)
         res = np.array(
@@ -66,8 +72,7 @@ class TestMinesField(unittest.TestCase):
         self.assert_arrays_equal(nbs, res)
 
     def test_define_cell_values(self):
-        np.random.seed(41)
-        mf = MineField(6, 4, 4, 0, 0)
+        mf = MineField(6, 4, 4, 0, 0, rnd_seed=41, legacy_seeding=True)
 
         expected = np.array(
             [
@@ -81,10 +86,18 @@ class TestMinesField(unittest.TestCase):
         )
         self.assert_arrays_equal(expected, mf._mf)
 
+    def test_count_neighbour_mines(self):
+        rng = np.random.default_rng(0)
+        mines = rng.random((3, 7, 9)) < 0.3
+        counts = count_neighbour_mines(mines)
+        self.assertEqual(counts.shape, mines.shape)
+        for b, j, i in np.ndindex(*mines.shape):
+            expected = mines[b, max(j - 1, 0) : j + 2, max(i - 1, 0) : i + 2].sum() - mines[b, j, i]
+            self.assertEqual(counts[b, j, i], expected)
+
     def test_new_minefield_many_mines(self):
         """Tests that the minefield is generated correctly when there are a bit too many mines"""
-        np.random.seed(42)
-        mf = MineField(5, 5, 5 * 5, 2, 2)
+        mf = MineField(5, 5, 5 * 5, 2, 2, rnd_seed=42, legacy_seeding=True)
         expected = np.array(
             [
                 [_W, _W, _W, _W, _W, _W, _W],
@@ -98,8 +111,7 @@ class TestMinesField(unittest.TestCase):
         )
         self.assert_arrays_equal(expected, mf.get_minefield())
 
-        np.random.seed(42)
-        mf = MineField(5, 5, 5 * 5, 0, 0)
+        mf = MineField(5, 5, 5 * 5, 0, 0, rnd_seed=42, legacy_seeding=True)
         expected = np.array(
             [
                 [_W, _W, _W, _W, _W, _W, _W],
@@ -113,8 +125,7 @@ class TestMinesField(unittest.TestCase):
         )
         self.assert_arrays_equal(expected, mf.get_minefield())
 
-        np.random.seed(42)
-        mf = MineField(5, 5, 5 * 5 - 9, 2, 2)
+        mf = MineField(5, 5, 5 * 5 - 9, 2, 2, rnd_seed=42, legacy_seeding=True)
         expected = np.array(
             [
                 [_W, _W, _W, _W, _W, _W, _W],
@@ -128,8 +139,7 @@ class TestMinesField(unittest.TestCase):
         )
         self.assert_arrays_equal(expected, mf.get_minefield())
 
-        np.random.seed(42)
-        mf = MineField(5, 5, 5 * 5 - 8, 2, 2)
+        mf = MineField(5, 5, 5 * 5 - 8, 2, 2, rnd_seed=42, legacy_seeding=True)
         expected = np.array(
             [
                 [_W, _W, _W, _W, _W, _W, _W],
@@ -142,3 +152,28 @@ class TestMinesField(unittest.TestCase):
             ]
         )
         self.assert_arrays_equal(expected, mf.get_minefield())
+
+    def test_generator_mine_placement(self):
+        """Tests the placement of mines with an instance-local numpy Generator"""
+        for width, height, n_mines, x, y in [
+            (30, 16, 99, 0, 0),
+            (30, 16, 99, 29, 15),
+            (9, 9, 10, 4, 4),
+            (5, 5, 24, 2, 2),
+        ]:
+            mf = MineField(width, height, n_mines, x, y, rnd_seed=3)
+            mines = mf.get_minefield()[1:-1, 1:-1] == _M.num()
+            self.assertEqual(mines.sum(), n_mines)
+            self.assertFalse(mines[y, x])
+            if n_mines <= width * height - 9:
+                self.assertFalse(mines[max(y - 1, 0) : y + 2, max(x - 1, 0) : x + 2].any())
+
+        # Same seed gives the same layout regardless of other generators in the process
+        mf1 = MineField(30, 16, 99, 5, 5, rnd_seed=7)
+        _ = MineField(30, 16, 99, 5, 5, rnd_seed=8)
+        mf2 = MineField(30, 16, 99, 5, 5, rng=np.random.default_rng(7))
+        self.assertTrue((mf1.get_minefield() == mf2.get_minefield()).all())
+
+    def test_generator_large_board(self):
+        mf = MineField(2000, 2000, 800_000, 1000, 1000, rnd_seed=0)
+        self.assertEqual((mf.get_minefield() == _M.num()).sum(), 800_000)
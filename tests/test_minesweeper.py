@@ -1,9 +1,13 @@
 import os
+import subprocess
+import sys
+import tempfile
 import unittest
 import numpy as np
 from numpy.typing import NDArray
-from src.minesweeper.minesweeper_ import MinesweeperHeadless
-from src.minesweeper.utils import Action, GameState, Interaction
+from src.minesweeper.minesweeper_ import Minesweeper, MinesweeperHeadless
+from src.minesweeper.recording import SessionReader, load_legacy_actions
+from src.minesweeper.utils import Action, CellState, GameState, Interaction
 
 
 class TestMinesweeperHeadlessGameplay(unittest.TestCase):
@@ -15,6 +19,19 @@ class TestMinesweeperHeadlessGameplay(unittest.TestCase):
             for i, value in enumerate(row):
                 self.assertEqual(value, result[j][i])
 
+    def assert_counters_consistent(self, mf: MinesweeperHeadless):
+        self.assertEqual(mf.n_unopened, mf._unopened.sum())
+        if mf.gamestate == GameState.NOT_STARTED:
+            self.assertTrue((mf.observe() == CellState.UNOPENED.num()).all())
+            return
+        visible = np.where(mf._unopened, CellState.UNOPENED.num(), mf.get_grid())
+        visible[mf._flagged] = CellState.FLAG.num()
+        self.assert_arrays_equal(visible, mf.observe())
+        mines = mf.get_grid() == CellState.MINE.num()
+        self.assertEqual(mf.n_revealed, (~mf._unopened & ~mines).sum())
+        self.assertEqual(mf.n_correct_flags, (mf._flagged & mines).sum())
+        self.assertEqual(mf.mines_left, mf._n_mines - mf._flagged.sum())
+
     def _get_minefield_from_file(self, folder_path: str, i: int):
         with open(os.path.join(folder_path, "minefield.npy"), "rb") as f:
             for _ in range(i):
@@ -22,7 +39,7 @@ class TestMinesweeperHeadlessGameplay(unittest.TestCase):
             return np.load(f, allow_pickle=True)
 
     def _run_test_folder(self, folder_path: str):
-        mf = MinesweeperHeadless(30, 16, 99, rnd_seed=42)
+        mf = MinesweeperHeadless(30, 16, 99, rnd_seed=42, legacy_seeding=True)
 
         acts = []
         with open(os.path.join(folder_path, "acts.txt"), "r") as f:
@@ -44,6 +61,7 @@ class TestMinesweeperHeadlessGameplay(unittest.TestCase):
                     self.assert_arrays_equal(exp_minefield, mf.get_grid())
                     self.assert_arrays_equal(exp_unnopened, mf._unopened)
                     self.assert_arrays_equal(exp_flags, mf._flagged)
+                    self.assert_counters_consistent(mf)
                 except AssertionError as e:
                     e.args = (*e.args, f"Action number: {i}, act = {act}")
                     raise e
@@ -55,6 +73,32 @@ class TestMinesweeperHeadlessGameplay(unittest.TestCase):
                     game_num += 1
                     exp_minefield = self._get_minefield_from_file(folder_path, game_num)
 
+    def _run_test_recording(self, path: str):
+        with SessionReader(path) as reader:
+            mf = MinesweeperHeadless(
+                reader.width,
+                reader.height,
+                reader.n_mines,
+                rnd_seed=reader.rnd_seed,
+                legacy_seeding=reader.legacy_seeding,
+            )
+            exp_unopened = np.ones((reader.height, reader.width), dtype=np.bool)
+            exp_flags = np.zeros((reader.height, reader.width), dtype=np.bool)
+            for i, act in enumerate(reader.interactions()):
+                mf.make_interaction(act)
+                reader.apply_deltas(i, exp_unopened, exp_flags)
+
+                game = reader.actions[i]["game"]
+                try:
+                    if game >= 0 and mf.gamestate != GameState.NOT_STARTED:
+                        self.assertTrue((reader.mines(game) == (mf.get_grid() == CellState.MINE.num())).all())
+                    self.assertEqual(mf.gamestate, reader.gamestate(i))
+                    self.assert_arrays_equal(exp_unopened, mf._unopened)
+                    self.assert_arrays_equal(exp_flags, mf._flagged)
+                except AssertionError as e:
+                    e.args = (*e.args, f"Action number: {i}, act = {act}")
+                    raise e
+
     def test_gameplay_with_headless(self):
         """Replays games that atleast looked to follow all of the proper rules when they were played..."""
         # self._run_test_folder(os.path.join("tests", "resources", "session_0"))
@@ -65,11 +109,90 @@ class TestMinesweeperHeadlessGameplay(unittest.TestCase):
                 continue
             print(f"dir: {dir}")
             path = os.path.join("tests", "resources", dir)
-            self._run_test_folder(path)
+            if os.path.exists(os.path.join(path, "session.msr")):
+                self._run_test_recording(os.path.join(path, "session.msr"))
+            else:
+                self._run_test_folder(path)
+
+    def test_recording_round_trip(self):
+        """Records games like scripts/generate_test_games.py does and replays the recording"""
+        rng = np.random.default_rng(7)
+        with tempfile.TemporaryDirectory() as folder:
+            ms = Minesweeper(30, 16, 99, rnd_seed=42, save_path=folder, legacy_seeding=True)
+            for _ in range(3):
+                ms._apply_interaction(Interaction(15, 8, Action.OPEN))
+                for _ in range(40):
+                    action = Action.FLAG if rng.random() < 0.2 else Action.OPEN
+                    ms._apply_interaction(Interaction(int(rng.integers(30)), int(rng.integers(16)), action))
+                ms._apply_interaction(Interaction(-1, -1, Action.NEW_GAME))
+            ms._recorder.close()  # type: ignore
+
+            self._run_test_recording(os.path.join(folder, "session.msr"))
+
+    def test_ui_game_matches_headless(self):
+        """The game behind the ui makes actions like the headless game, and tells which of them were ignored"""
+        rng = np.random.default_rng(3)
+        ms = Minesweeper(9, 9, 10, rnd_seed=5)
+        headless = MinesweeperHeadless(9, 9, 10, rnd_seed=5)
+        for _ in range(200):
+            action = Action.NEW_GAME if rng.random() < 0.05 else Action.FLAG if rng.random() < 0.3 else Action.OPEN
+            act = Interaction(int(rng.integers(9)), int(rng.integers(9)), action)
+            gamestate = headless.gamestate
+            flagged = bool(headless.flagged[act.y, act.x])
+            made = ms._apply_interaction(act)
+            headless.make_interaction(act)
+
+            if action == Action.OPEN:
+                playing = gamestate in (GameState.PLAYING, GameState.NOT_STARTED)
+                self.assertEqual(made, playing and not flagged)
+            elif action == Action.FLAG:
+                self.assertEqual(made, gamestate == GameState.PLAYING)
+            self.assertEqual(ms.gamestate, headless.gamestate)
+            self.assertTrue((ms.observe() == headless.observe()).all())
+        self.assertFalse(ms._apply_interaction(Interaction(-1, -1, Action.EXIT)))
+
+    def test_make_interactions(self):
+        """Test that a bulk replay of a session matches making the actions one at a time"""
+        for folder in ("session_0", "session_1"):
+            acts = load_legacy_actions(os.path.join("tests", "resources", folder, "acts.txt"))
+            single = MinesweeperHeadless(30, 16, 99, rnd_seed=42, legacy_seeding=True)
+            expected = []
+            for x, y, action in acts.tolist():
+                n_unopened = single.n_unopened
+                single.make_interaction(Interaction(x, y, Action(action)))
+                expected.append((max(n_unopened - single.n_unopened, 0), single.gamestate.value, single.mines_left))
+
+            bulk = MinesweeperHeadless(30, 16, 99, rnd_seed=42, legacy_seeding=True)
+            outcomes = bulk.make_interactions(acts, stop_on_loss=False)
+            self.assertEqual(outcomes.tolist(), expected)
+            self.assert_arrays_equal(single._unopened, bulk._unopened)
+            self.assert_arrays_equal(single._flagged, bulk._flagged)
+            self.assert_counters_consistent(bulk)
+
+    def test_make_interactions_stop_on_loss(self):
+        mf = MinesweeperHeadless(3, 3, 7, rnd_seed=42, legacy_seeding=True)
+        outcomes = mf.make_interactions([(0, 0, Action.OPEN), (1, 1, 0), Interaction(2, 2, Action.FLAG)])
+        self.assertEqual(len(outcomes), 2)
+        self.assertEqual(outcomes["gamestate"].tolist(), [GameState.PLAYING.value, GameState.LOST.value])
+        self.assertEqual(outcomes["n_opened"].tolist(), [1, 1])
+        self.assertEqual(mf.mines_left, 7)
+
+    def test_make_interactions_validation(self):
+        mf = MinesweeperHeadless(9, 9, 10, rnd_seed=0)
+        with self.assertRaises(ValueError):
+            mf.make_interactions([(4, 4, Action.OPEN), (9, 0, Action.FLAG)])
+        with self.assertRaises(ValueError):
+            mf.make_interactions([(4, 4, Action.OPEN), (0, 0, 9)])
+        self.assertEqual(mf.gamestate, GameState.NOT_STARTED)
+
+        # Coordinates of actions that don't target a cell aren't checked
+        outcomes = mf.make_interactions([(4, 4, Action.OPEN), (-1, -1, Action.NEW_GAME)])
+        self.assertEqual(outcomes["gamestate"].tolist(), [GameState.PLAYING.value, GameState.NOT_STARTED.value])
+        self.assertEqual(len(mf.make_interactions([])), 0)
 
     def test_loss_condition(self):
         """Test that game is lost correctly"""
-        mf = MinesweeperHeadless(3, 3, 7, rnd_seed=42)
+        mf = MinesweeperHeadless(3, 3, 7, rnd_seed=42, legacy_seeding=True)
         self.assertEqual(mf.gamestate, GameState.NOT_STARTED)
 
         mf.make_interaction(Interaction(0, 0, Action.OPEN))
@@ -80,7 +203,7 @@ class TestMinesweeperHeadlessGameplay(unittest.TestCase):
 
     def test_win_condition(self):
         """Test that game is won correctly"""
-        mf = MinesweeperHeadless(3, 3, 7, rnd_seed=42)
+        mf = MinesweeperHeadless(3, 3, 7, rnd_seed=42, legacy_seeding=True)
         self.assertEqual(mf.gamestate, GameState.NOT_STARTED)
 
         mf.make_interaction(Interaction(0, 0, Action.OPEN))
@@ -89,6 +212,170 @@ class TestMinesweeperHeadlessGameplay(unittest.TestCase):
         mf.make_interaction(Interaction(1, 0, Action.OPEN))
         self.assertEqual(mf.gamestate, GameState.WON)
 
+    def test_instrumentation(self):
+        """Test the counters collected by the instrumentation"""
+        calls = []
+        mf = MinesweeperHeadless(3, 3, 7, rnd_seed=42, legacy_seeding=True)
+        self.assertRaises(RuntimeError, mf.stats)
+        mf.enable_instrumentation(hook=lambda game, act, n_revealed: calls.append((act.action, n_revealed)))
+
+        mf.make_interaction(Interaction(0, 0, Action.OPEN))
+        mf.make_interaction(Interaction(2, 2, Action.FLAG))
+        mf.make_interaction(Interaction(1, 1, Action.OPEN))
+        self.assertEqual(calls, [(Action.OPEN, 1), (Action.FLAG, 0), (Action.OPEN, 1)])
+
+        stats = mf.stats()
+        self.assertEqual(stats["game"]["actions"]["OPEN"], 2)
+        self.assertEqual(stats["game"]["actions"]["FLAG"], 1)
+        self.assertEqual(stats["game"]["cells_revealed"], 2)
+        self.assertEqual(stats["game"]["games_lost"], 1)
+        self.assertGreater(stats["game"]["generation_time"], 0)
+
+        mf.make_interaction(Interaction(-1, -1, Action.NEW_GAME))
+        mf.make_interaction(Interaction(0, 0, Action.OPEN))
+        for y, x in zip(*np.nonzero(mf.get_grid() != CellState.MINE.num())):
+            mf.make_interaction(Interaction(int(x), int(y), Action.OPEN))
+        stats = mf.stats()
+        self.assertEqual(stats["game"]["actions"]["OPEN"], 3)
+        self.assertEqual(stats["game"]["games_won"], 1)
+        self.assertEqual(stats["total"]["actions"]["OPEN"], 5)
+        self.assertEqual(stats["total"]["games_won"] + stats["total"]["games_lost"], 2)
+        self.assertGreater(stats["games_per_s"], 0)
+
+        mf.disable_instrumentation()
+        self.assertRaises(RuntimeError, mf.stats)
+
+    def test_out_of_bounds(self):
+        ms = MinesweeperHeadless(5, 5, 3, rnd_seed=2)
+        with self.assertRaises(ValueError):
+            ms.make_interaction(Interaction(5, 0, Action.OPEN))
+        ms.make_interaction(Interaction(0, 0, Action.OPEN))
+        board = ms.observe().copy()
+        n_unopened = ms.n_unopened
+        for x, y in ((-1, 2), (2, -1), (5, 2), (2, 5)):
+            for action in (Action.OPEN, Action.FLAG):
+                with self.assertRaises(ValueError):
+                    ms.make_interaction(Interaction(x, y, action))
+        self.assertTrue((ms.observe() == board).all())
+        self.assertEqual(n_unopened, ms.n_unopened)
+        ms.make_interaction(Interaction(-1, -1, Action.NEW_GAME))
+        self.assertEqual(GameState.NOT_STARTED, ms.gamestate)
+
+    def test_observe(self):
+        mf = MinesweeperHeadless(9, 9, 10, rnd_seed=3)
+        view = mf.observe()
+        with self.assertRaises(ValueError):
+            view[0, 0] = 0
+
+        mf.make_interaction(Interaction(4, 4, Action.OPEN))
+        x, y = (int(i) for i in np.argwhere(mf.unopened)[0][::-1])
+        mf.make_interaction(Interaction(x, y, Action.FLAG))
+        self.assertEqual(view[y, x], CellState.FLAG.num())
+        self.assert_counters_consistent(mf)
+
+        out = np.empty((9, 9), dtype=np.int8)
+        self.assertIs(mf.observe(out), out)
+        self.assertTrue((out == view).all())
+
+        mf.make_interaction(Interaction(0, 0, Action.NEW_GAME))
+        self.assertTrue((view == CellState.UNOPENED.num()).all())
+        self.assertEqual(out[y, x], CellState.FLAG.num())
+
+    def test_flood_fill_keeps_flags(self):
+        """A flagged cell opened by a flood fill stays flagged on the visible board"""
+        mines = np.zeros((6, 8), dtype=np.bool)
+        mines[:, 4] = True
+        mf = MinesweeperHeadless(8, 6, int(mines.sum()))
+        mf.set_next_minefield(mines)
+        for act in [Interaction(3, 0, Action.OPEN), Interaction(0, 0, Action.FLAG), Interaction(1, 1, Action.OPEN)]:
+            mf.make_interaction(act)
+
+        self.assertTrue(mf.flagged[0, 0])
+        self.assertEqual(mf.observe()[0, 0], CellState.FLAG.num())
+        self.assert_counters_consistent(mf)
+        visible = mf.observe().copy()
+        mf.restore(mf.snapshot())
+        self.assert_arrays_equal(visible, mf.observe())
+
+    def test_win_drops_opened_flags(self):
+        """A win shows the numbers of flagged cells that a flood fill opened, as their flags are dropped"""
+        mines = np.zeros((3, 7), dtype=np.bool)
+        mines[:, 3] = True
+        mf = MinesweeperHeadless(7, 3, int(mines.sum()))
+        mf.set_next_minefield(mines)
+        for act in [Interaction(0, 0, Action.OPEN), Interaction(5, 1, Action.FLAG), Interaction(6, 1, Action.OPEN)]:
+            mf.make_interaction(act)
+
+        self.assertEqual(GameState.WON, mf.gamestate)
+        self.assertFalse(mf.flagged[1, 5])
+        self.assertEqual(mf.observe()[1, 5], 0)
+        self.assert_counters_consistent(mf)
+        visible = mf.observe().copy()
+        mf.restore(mf.snapshot())
+        self.assert_arrays_equal(visible, mf.observe())
+
+    def test_snapshot_restore(self):
+        mf = MinesweeperHeadless(30, 16, 99, rnd_seed=5)
+        empty = mf.snapshot()
+        mf.make_interaction(Interaction(15, 8, Action.OPEN))
+        x, y = (int(i) for i in np.argwhere(mf.unopened)[0][::-1])
+        mf.make_interaction(Interaction(x, y, Action.FLAG))
+        snapshot = mf.snapshot()
+        self.assertEqual(len(snapshot.cells), 2 * 30 * 16 // 8)
+        unopened, flagged, visible = mf._unopened.copy(), mf._flagged.copy(), mf.observe().copy()
+        counters = (mf.gamestate, mf.mines_left, mf.n_unopened, mf.n_revealed, mf.n_correct_flags)
+
+        for i, j in np.argwhere(mf.unopened)[:20]:
+            mf.make_interaction(Interaction(int(j), int(i), Action.OPEN))
+        mf.restore(snapshot)
+        self.assert_arrays_equal(unopened, mf._unopened)
+        self.assert_arrays_equal(flagged, mf._flagged)
+        self.assert_arrays_equal(visible, mf.observe())
+        self.assertEqual((mf.gamestate, mf.mines_left, mf.n_unopened, mf.n_revealed, mf.n_correct_flags), counters)
+
+        mf.restore(empty)
+        self.assertEqual(mf.gamestate, GameState.NOT_STARTED)
+        self.assert_counters_consistent(mf)
+        with self.assertRaises(ValueError):
+            MinesweeperHeadless(9, 9, 10).restore(snapshot)
+
+    def test_clone(self):
+        mf = MinesweeperHeadless(16, 16, 40, rnd_seed=2)
+        mf.make_interaction(Interaction(8, 8, Action.OPEN))
+        clone = mf.clone()
+        self.assertIs(clone._mf, mf._mf)
+        with self.assertRaises(ValueError):
+            mf.get_grid()[0, 0] = 0
+
+        n_unopened = mf.n_unopened
+        for i, j in np.argwhere(clone.unopened)[:10]:
+            clone.make_interaction(Interaction(int(j), int(i), Action.FLAG))
+        self.assertEqual(mf.n_unopened, n_unopened)
+        self.assertFalse(mf.flagged.any())
+        self.assertEqual(clone.flagged.sum(), 10)
+        self.assert_counters_consistent(mf)
+        self.assert_counters_consistent(clone)
+
+        # Both continue with the same minefields
+        for game in (mf, clone):
+            game.make_interaction(Interaction(0, 0, Action.NEW_GAME))
+            game.make_interaction(Interaction(3, 3, Action.OPEN))
+        self.assert_arrays_equal(mf.get_grid(), clone.get_grid())
+
+    def test_large_flood_fill(self):
+        """Test that a huge empty area is opened without hitting the recursion limit"""
+        mf = MinesweeperHeadless(300, 200, 1, rnd_seed=42)
+        mf.make_interaction(Interaction(0, 0, Action.OPEN))
+        self.assertEqual(mf.gamestate, GameState.WON)
+        self.assertEqual(mf._unopened.sum(), 1)
+
+        mf = MinesweeperHeadless(9, 9, 0)
+        mf._new_minefield(4, 4)
+        opened = mf._open_cell(4, 4)
+        self.assertEqual(len(opened), 81)
+        self.assertEqual(len(set(opened)), 81)
+        self.assertFalse(mf._unopened.any())
+
 
 class TestMinesweeperHeadless(unittest.TestCase):
     """Tests for the MinesweeperHeadless class"""
@@ -100,6 +387,7 @@ class TestMinesweeperHeadless(unittest.TestCase):
         self.assertEqual(ms._width, width)
         self.assertEqual(ms._height, height)
         self.assertEqual(ms._n_mines, width * height - 1)
+        self.assertEqual((ms.width, ms.height, ms.n_mines), (width, height, width * height - 1))
 
         ms = MinesweeperHeadless(width, height, 0)
         self.assertEqual(ms._width, width)
@@ -110,3 +398,17 @@ class TestMinesweeperHeadless(unittest.TestCase):
         self.assertEqual(ms._width, width)
         self.assertEqual(ms._height, height)
         self.assertEqual(ms._n_mines, 10)
+
+
+class TestImports(unittest.TestCase):
+    """Tests that the headless parts of the package stay light to import"""
+
+    def test_headless_import_does_not_load_ui(self):
+        code = (
+            "import sys\n"
+            "from src.minesweeper import MinesweeperHeadless, MinesweeperBatch\n"
+            "heavy = [name for name in ('pygame', 'typer') if name in sys.modules]\n"
+            "print(','.join(heavy))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "", "Heavy modules imported by the headless package")
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from src.minesweeper import no_guess
+from src.minesweeper.minesweeper_ import MinesweeperHeadless
+from src.minesweeper.no_guess import BoardFile, NoGuessPool, generate_no_guess, is_no_guess
+from src.minesweeper.solver import Solver
+from src.minesweeper.utils import Action, GameState, Interaction
+
+
+class TestNoGuess(unittest.TestCase):
+    """Tests for the boards without guessing and their pool"""
+
+    def test_generate(self):
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            mines = generate_no_guess(16, 16, 40, 3, 12, rng=rng)
+            self.assertEqual(mines.sum(), 40)
+            self.assertFalse(mines[11:14, 2:5].any())
+            self.assertTrue(is_no_guess(mines, 3, 12))
+
+        # A mine in one of the two cells at the end of a strip is a coin flip
+        mines = np.zeros((2, 4), dtype=np.bool)
+        mines[0, 3] = True
+        self.assertFalse(is_no_guess(mines, 0, 0))
+        self.assertFalse(is_no_guess(mines, 3, 0))
+
+    def test_board_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "boards.bin")
+            boards = np.random.default_rng(1).random((3, 7, 11)) < 0.2
+            board_file = BoardFile(path, 11, 7, 10, 5, 3, capacity=2)
+            self.assertIsNone(board_file.pop())
+            self.assertTrue(board_file.push(boards[0]))
+            self.assertTrue(board_file.push(boards[1]))
+            self.assertFalse(board_file.push(boards[2]))
+            board_file.close()
+
+            board_file = BoardFile(path, 11, 7, 10, 5, 3)
+            self.assertEqual((len(board_file), board_file.capacity), (2, 2))
+            self.assertTrue((board_file.pop() == boards[1]).all())
+            self.assertTrue((board_file.pop() == boards[0]).all())
+            self.assertIsNone(board_file.pop())
+            board_file.close()
+
+            with self.assertRaises(ValueError):
+                BoardFile(path, 11, 7, 11, 5, 3)
+
+    def test_pool(self):
+        with tempfile.TemporaryDirectory() as folder:
+            with NoGuessPool(folder, 9, 9, 10, capacity=2, seed=2) as pool:
+                pool.start()
+                deadline = time.monotonic() + 60
+                while len(pool) < 8 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                self.assertEqual(len(pool), 8)
+
+                game = MinesweeperHeadless(9, 9, 10)
+                game.set_board_source(pool.take)
+                solver = Solver(game)
+                for x, y in [(4, 4), (4, 4), (1, 7), (7, 1), (0, 0), (8, 3)]:
+                    game.make_interaction(Interaction(x, y, Action.OPEN))
+                    solver.update()
+                    while game.gamestate == GameState.PLAYING:
+                        self.assertTrue(solver.safe_cells())
+                        solver.step()
+                    self.assertEqual(game.gamestate, GameState.WON)
+                    game.make_interaction(Interaction(0, 0, Action.NEW_GAME))
+
+            # Boards left in the files are used again, and the mirrored start cells share them
+            with NoGuessPool(folder, 9, 9, 10, capacity=2) as pool:
+                self.assertGreater(len(pool), 0)
+                mines = pool.take(7, 7)
+                self.assertTrue(is_no_guess(mines, 7, 7))
+
+    def test_take_from_empty_area(self):
+        """A board is taken for any click in the empty area around its start, mirrored if needed"""
+        mines = np.zeros((9, 9), dtype=np.bool)
+        mines[:, 3] = True
+        with tempfile.TemporaryDirectory() as folder:
+            with NoGuessPool(folder, 9, 9, 9, starts=[(1, 1)]) as pool:
+                pool._board_file((1, 1)).push(mines)
+                pool._board_file((1, 1)).push(mines)
+                self.assertTrue((pool.take(0, 8) == mines).all())
+                self.assertTrue((pool.take(7, 4) == mines[:, ::-1]).all())
+                self.assertEqual(len(pool), 0)
+
+    def test_failures(self):
+        """Boards that can't be generated give an ordinary board, and failed fills are retried"""
+        with tempfile.TemporaryDirectory() as folder:
+            with NoGuessPool(folder, 9, 9, 60, capacity=1, starts=[(4, 4)], seed=0, max_attempts=1) as pool:
+                with self.assertLogs(no_guess.logger, "WARNING") as logs:
+                    mines = pool.take(4, 4)
+                self.assertEqual(mines.sum(), 60)
+                self.assertFalse(mines[3:6, 3:6].any())
+                self.assertIn("ordinary board", logs.output[0])
+
+                with self.assertLogs(no_guess.logger, "WARNING") as logs:
+                    pool.start()
+                    deadline = time.monotonic() + 60
+                    while len(logs.records) < 3 and time.monotonic() < deadline:
+                        time.sleep(0.05)
+                self.assertGreaterEqual(len(logs.records), 3)
+                self.assertTrue(pool._thread.is_alive())  # type: ignore
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+from itertools import combinations
+import unittest
+import numpy as np
+from src.minesweeper.minefield import count_neighbour_mines
+from src.minesweeper.minesweeper_ import MinesweeperHeadless
+from src.minesweeper.probability import ProbabilityEngine, enumerate_component
+from src.minesweeper.utils import Action, GameState, Interaction
+
+
+class TestProbabilityEngine(unittest.TestCase):
+    """Tests for the exact mine probabilities"""
+
+    def _brute_force(self, game: MinesweeperHeadless):
+        """Averages all mine layouts that match the visible numbers"""
+        unopened = game.unopened
+        opened = ~unopened
+        grid = game.get_grid()
+        total = np.zeros(unopened.shape)
+        n_layouts = 0
+        for layout in combinations(np.flatnonzero(unopened).tolist(), game._n_mines):
+            mines = np.zeros(unopened.size, dtype=np.bool)
+            mines[list(layout)] = True
+            mines = mines.reshape(unopened.shape)
+            if (count_neighbour_mines(mines)[opened] == grid[opened]).all():
+                total += mines
+                n_layouts += 1
+        return total / n_layouts
+
+    def test_matches_brute_force(self):
+        n_tested = 0
+        for seed in range(10):
+            game = MinesweeperHeadless(6, 4, 5, rnd_seed=seed)
+            game.make_interaction(Interaction(0, 0, Action.OPEN))
+            if game.gamestate != GameState.PLAYING:
+                continue
+            engine = ProbabilityEngine()
+            probabilities = engine.probabilities(game)
+            self.assertTrue(engine.exact)
+            self.assertTrue(np.allclose(probabilities, self._brute_force(game)))
+            self.assertAlmostEqual(probabilities.sum(), 5)
+            n_tested += 1
+        self.assertGreater(n_tested, 0)
+
+    def test_enumerate_component(self):
+        # Three cells in a row under the numbers 1 and 1, sharing the middle cell
+        result = enumerate_component(3, (((0, 1), 1), ((1, 2), 1)))
+        self.assertTrue(np.allclose(result.counts, [0, 1, 1]))
+        self.assertTrue(np.allclose(result.mine_counts, [[0, 0, 0], [0, 1, 0], [1, 0, 1]]))
+
+    def test_budget_fallback(self):
+        game = MinesweeperHeadless(30, 16, 99, rnd_seed=1)
+        game.make_interaction(Interaction(15, 8, Action.OPEN))
+        engine = ProbabilityEngine(max_states=1)
+        probabilities = engine.probabilities(game)
+        self.assertFalse(engine.exact)
+        self.assertTrue(((probabilities >= 0) & (probabilities <= 1)).all())
+        self.assertTrue((probabilities[~game.unopened] == 0).all())
+
+    def test_shape_cache(self):
+        engine = ProbabilityEngine()
+        game = MinesweeperHeadless(30, 16, 99, rnd_seed=1)
+        game.make_interaction(Interaction(15, 8, Action.OPEN))
+        first = engine.probabilities(game)
+        misses = engine.cache_misses
+        self.assertTrue(np.array_equal(engine.probabilities(game), first))
+        self.assertEqual(engine.cache_misses, misses)
+        self.assertGreater(engine.cache_hits, 0)
+
+    def test_not_started_and_lost(self):
+        game = MinesweeperHeadless(9, 9, 10, rnd_seed=0)
+        self.assertTrue(np.allclose(ProbabilityEngine().probabilities(game), 10 / 81))
+
+        mines = np.zeros((9, 9), dtype=np.bool)
+        mines[0, :8] = True
+        mines[8, 8] = True
+        mines[8, 0] = True
+        game.set_next_minefield(mines)
+        game.make_interaction(Interaction(4, 4, Action.OPEN))
+        game.make_interaction(Interaction(8, 8, Action.OPEN))
+        self.assertEqual(game.gamestate, GameState.LOST)
+        with self.assertRaises(ValueError):
+            ProbabilityEngine().probabilities(game)
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.minesweeper.minesweeper_ import Minesweeper
+from src.minesweeper.recording import SessionReader, SessionWriter, convert_legacy_session
+from src.minesweeper.utils import Action, CellState, GameState, Interaction
+
+_RESOURCES = os.path.join("tests", "resources")
+
+
+class TestRecording(unittest.TestCase):
+    """Tests for the binary session recordings"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _legacy_states(self, folder: str):
+        states = []
+        with open(os.path.join(folder, "states.npy"), "rb") as f:
+            while f.peek(1):
+                states.append(np.load(f))
+        return states
+
+    def test_convert_legacy_sessions(self):
+        for session in sorted(os.listdir(_RESOURCES)):
+            folder = os.path.join(_RESOURCES, session)
+            path = os.path.join(self._tmp.name, f"{session}.msr")
+            convert_legacy_session(folder, path, rnd_seed=42)
+
+            with open(os.path.join(folder, "acts.txt")) as f:
+                acts = [tuple(int(v) for v in row.split(";")) for row in f]
+            states = self._legacy_states(folder)
+
+            with SessionReader(path) as reader:
+                self.assertEqual((reader.width, reader.height, reader.n_mines), (30, 16, 99))
+                self.assertEqual(reader.rnd_seed, 42)
+                self.assertTrue(reader.legacy_seeding)
+                self.assertEqual([(a.x, a.y, a.action.value) for a in reader.interactions()], acts)
+                self.assertGreater(len(reader.games), 0)
+                for game in range(len(reader.games)):
+                    self.assertEqual(reader.mines(game).sum(), 99)
+
+                unopened = np.ones((16, 30), dtype=np.bool)
+                flagged = np.zeros((16, 30), dtype=np.bool)
+                for i in range(len(reader)):
+                    reader.apply_deltas(i, unopened, flagged)
+                    self.assertTrue((unopened == states[2 * i]).all())
+                    self.assertTrue((flagged == states[2 * i + 1]).all())
+
+    def test_write_and_read(self):
+        path = os.path.join(self._tmp.name, "session.msr")
+        mines = np.zeros((4, 5), dtype=np.bool)
+        mines[3, 4] = True
+        unopened = np.ones((4, 5), dtype=np.bool)
+        flagged = np.zeros((4, 5), dtype=np.bool)
+
+        with SessionWriter(path, 5, 4, 1) as writer:
+            writer.write_game(mines, 0, 0)
+            unopened[:2] = False
+            writer.write_action(Interaction(0, 0, Action.OPEN), GameState.PLAYING, unopened, flagged)
+            flagged[3, 4] = True
+            writer.write_action(Interaction(4, 3, Action.FLAG), GameState.PLAYING, unopened, flagged)
+
+        # A record cut short at the end of the file is ignored
+        with open(path, "ab") as f:
+            f.write(b"\x02\x00")
+
+        with SessionReader(path) as reader:
+            self.assertIsNone(reader.rnd_seed)
+            self.assertEqual(len(reader), 2)
+            self.assertTrue((reader.mines(0) == mines).all())
+            self.assertEqual(reader.games[0].first_action, 0)
+            self.assertEqual(len(reader.deltas(0)), 10)
+            self.assertEqual(len(reader.deltas(1)), 1)
+            self.assertEqual(reader.interaction(1), Interaction(4, 3, Action.FLAG))
+            self.assertEqual(reader.gamestate(1), GameState.PLAYING)
+
+    def test_minesweeper_records_session(self):
+        ms = Minesweeper(9, 9, 10, rnd_seed=1, save_path=self._tmp.name)
+        act = Interaction(4, 4, Action.OPEN)
+        ms.gamestate = GameState.PLAYING
+        ms._new_minefield(act.x, act.y)
+        ms._save(act, ms.get_grid())
+        ms._open_cell(act.x, act.y)
+        ms._save(act)
+        ms._recorder.close()  # type: ignore
+
+        with SessionReader(os.path.join(self._tmp.name, "session.msr")) as reader:
+            self.assertEqual(reader.rnd_seed, 1)
+            self.assertTrue((reader.mines(0) == (ms.get_grid() == CellState.MINE.num())).all())
+            unopened = np.ones((9, 9), dtype=np.bool)
+            flagged = np.zeros((9, 9), dtype=np.bool)
+            reader.apply_deltas(0, unopened, flagged)
+            self.assertTrue((unopened == ms._unopened).all())
@@ -0,0 +1,170 @@
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+import zlib
+import numpy as np
+from numpy.typing import NDArray
+from src.minesweeper.minesweeper_ import MinesweeperHeadless
+from src.minesweeper.render import BACKGROUND, IMAGE_DIR, ONE_HOT_STATES, BoardRenderer, make_atlas, one_hot, read_png
+from src.minesweeper.utils import CELL_DTYPE, Action, CellState, Interaction
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - 2 * c)
+    return a if pa <= pb and pa <= pc else b if pb <= pc else c
+
+
+def _filter_row(kind: int, row: NDArray, prior: NDArray, bpp: int) -> bytes:
+    """Applies a PNG filter to a row, the reverse of what a decoder does"""
+    cur, up = row.astype(int).tolist(), prior.astype(int).tolist()
+    out = []
+    for i, x in enumerate(cur):
+        a = cur[i - bpp] if i >= bpp else 0
+        b = up[i]
+        c = up[i - bpp] if i >= bpp else 0
+        predictor = [0, a, b, (a + b) // 2, _paeth(a, b, c)][kind]
+        out.append((x - predictor) & 0xFF)
+    return bytes([kind, *out])
+
+
+def _write_png(path: str, pixels: NDArray, color_type: int, palette: bytes = b""):
+    """Writes an 8 bit PNG image with every filter type in turn"""
+    height, width = pixels.shape[:2]
+    rows = pixels.reshape(height, -1)
+    bpp = rows.shape[1] // width
+    prior = np.zeros(rows.shape[1], dtype=np.uint8)
+    data = b""
+    for j, row in enumerate(rows):
+        data += _filter_row(j % 5, row, prior, bpp)
+        prior = row
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)))
+        if palette:
+            f.write(chunk(b"PLTE", palette))
+        f.write(chunk(b"IDAT", zlib.compress(data)))
+        f.write(chunk(b"IEND", b""))
+
+
+class TestReadPng(unittest.TestCase):
+    """Tests the PNG decoder against images written with every filter type"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_rgba(self):
+        pixels = self._rng.integers(0, 256, (10, 7, 4), dtype=np.uint8)
+        path = os.path.join(self._tmp.name, "rgba.png")
+        _write_png(path, pixels, 6)
+        self.assertTrue((read_png(path) == pixels).all())
+
+    def test_rgb(self):
+        pixels = self._rng.integers(0, 256, (10, 7, 3), dtype=np.uint8)
+        path = os.path.join(self._tmp.name, "rgb.png")
+        _write_png(path, pixels, 2)
+        image = read_png(path)
+        self.assertTrue((image[..., :3] == pixels).all())
+        self.assertTrue((image[..., 3] == 255).all())
+
+    def test_palette(self):
+        colours = self._rng.integers(0, 256, (16, 3), dtype=np.uint8)
+        indices = self._rng.integers(0, 16, (10, 7, 1), dtype=np.uint8)
+        path = os.path.join(self._tmp.name, "palette.png")
+        _write_png(path, indices, 3, colours.tobytes())
+        self.assertTrue((read_png(path)[..., :3] == colours[indices[..., 0]]).all())
+
+    def test_not_png(self):
+        path = os.path.join(self._tmp.name, "text.png")
+        with open(path, "wb") as f:
+            f.write(b"not an image")
+        with self.assertRaises(ValueError):
+            read_png(path)
+
+    def test_bundled_images(self):
+        for name in os.listdir(IMAGE_DIR):
+            image = read_png(os.path.join(IMAGE_DIR, name))
+            self.assertEqual((32, 32, 4), image.shape)
+
+
+class TestBoardRenderer(unittest.TestCase):
+    """Tests the composition of boards from the tile atlas"""
+
+    def setUp(self):
+        ms = MinesweeperHeadless(9, 7, 10, rnd_seed=1)
+        ms.make_interaction(Interaction(4, 3, Action.OPEN))
+        ms.make_interaction(Interaction(0, 0, Action.FLAG))
+        self.board = ms.observe().copy()
+
+    def test_atlas(self):
+        atlas = make_atlas()
+        self.assertEqual((len(CellState), 32, 32, 3), atlas.shape)
+        self.assertTrue((atlas[CellState.WALL.num()] == BACKGROUND).all())
+        self.assertFalse((atlas[CellState.FLAG.num()] == atlas[CellState.UNOPENED.num()]).all())
+
+    def test_render_board(self):
+        renderer = BoardRenderer()
+        image = renderer.render(self.board)
+        self.assertEqual((7 * 32, 9 * 32, 3), image.shape)
+        self.assertEqual(np.uint8, image.dtype)
+        for (j, i), code in np.ndenumerate(self.board):
+            tile = image[j * 32 : (j + 1) * 32, i * 32 : (i + 1) * 32]
+            self.assertTrue((tile == renderer.atlas[code]).all())
+
+    def test_render_batch(self):
+        renderer = BoardRenderer(tile_size=8)
+        boards = np.stack([self.board, np.full_like(self.board, CellState.UNOPENED.num())])
+        images = renderer.render(boards.reshape(2, 1, 7, 9))
+        self.assertEqual((2, 1, 7 * 8, 9 * 8, 3), images.shape)
+        self.assertTrue((images[0, 0] == renderer.render(self.board)).all())
+
+    def test_render_into(self):
+        renderer = BoardRenderer(tile_size=4)
+        out = np.zeros((7 * 4, 9 * 4, 3), dtype=np.uint8)
+        self.assertIs(out, renderer.render(self.board, out))
+        self.assertTrue((out == renderer.render(self.board)).all())
+        with self.assertRaises(ValueError):
+            renderer.render(self.board, np.zeros((7, 9, 3), dtype=np.uint8))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            BoardRenderer(tile_size=5)
+        renderer = BoardRenderer(tile_size=1)
+        with self.assertRaises(ValueError):
+            renderer.render(np.full((2, 2), len(CellState), dtype=CELL_DTYPE))
+        with self.assertRaises(ValueError):
+            renderer.render(np.zeros(3, dtype=CELL_DTYPE))
+
+    def test_no_sdl(self):
+        code = "import sys; import src.minesweeper.render; assert 'pygame' not in sys.modules"
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+
+class TestOneHot(unittest.TestCase):
+    """Tests the one-hot channel encoding"""
+
+    def test_channels(self):
+        boards = np.array([[[c.num() for c in ONE_HOT_STATES] + [CellState.WALL.num()]]], dtype=CELL_DTYPE)
+        encoded = one_hot(boards)
+        self.assertEqual((1, len(ONE_HOT_STATES), 1, len(ONE_HOT_STATES) + 1), encoded.shape)
+        self.assertEqual(np.uint8, encoded.dtype)
+        self.assertTrue((encoded[0, :, 0, :-1] == np.eye(len(ONE_HOT_STATES))).all())
+        self.assertFalse(encoded[0, :, 0, -1].any())
+
+    def test_channels_last(self):
+        board = np.array([[0, 9], [11, 3]], dtype=CELL_DTYPE)
+        encoded = one_hot(board, dtype=np.float32, channels_last=True)
+        self.assertEqual((2, 2, len(ONE_HOT_STATES)), encoded.shape)
+        self.assertEqual(np.float32, encoded.dtype)
+        self.assertTrue((encoded.argmax(axis=-1) == [[0, 9], [10, 3]]).all())
+        self.assertTrue((np.moveaxis(one_hot(board), 0, -1) == encoded).all())
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.minesweeper.minesweeper_ import MinesweeperHeadless
+from src.minesweeper.recording import SessionReader, convert_legacy_session
+from src.minesweeper.replay import Replay, stream_replays
+
+_RESOURCES = os.path.join("tests", "resources")
+
+
+class TestReplay(unittest.TestCase):
+    """Tests for the seekable replay of recorded sessions"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._tmp.name, "session.msr")
+        convert_legacy_session(os.path.join(_RESOURCES, "session_0"), self._path)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _state(self, ms: MinesweeperHeadless):
+        return ms._unopened.copy(), ms._flagged.copy(), ms.gamestate, ms.mines_left, ms.n_revealed
+
+    def test_seek_matches_linear_replay(self):
+        with SessionReader(self._path) as reader:
+            expected = []
+            ms = MinesweeperHeadless(reader.width, reader.height, reader.n_mines)
+            starts = {game.first_action: i for i, game in enumerate(reader.games)}
+            expected.append(self._state(ms))
+            for i, act in enumerate(reader.interactions()):
+                if i in starts:
+                    ms.set_next_minefield(reader.mines(starts[i]))
+                ms.make_interaction(act)
+                expected.append(self._state(ms))
+
+        with Replay(self._path, keyframe_interval=8) as replay:
+            self.assertEqual(replay.mismatches, [])
+            positions = np.random.default_rng(0).integers(0, len(replay) + 1, 50).tolist() + [len(replay), 0]
+            for position in positions:
+                state = self._state(replay.seek(position))
+                unopened, flagged, *rest = expected[position]
+                self.assertTrue((state[0] == unopened).all())
+                self.assertTrue((state[1] == flagged).all())
+                self.assertEqual(list(state[2:]), rest)
+
+    def test_seek_out_of_range(self):
+        with Replay(self._path) as replay:
+            with self.assertRaises(IndexError):
+                replay.seek(len(replay) + 1)
+
+    def test_stream_legacy_folders(self):
+        folders = [os.path.join(_RESOURCES, session) for session in sorted(os.listdir(_RESOURCES))]
+        results = list(stream_replays(folders))
+        self.assertEqual(len(results), len(folders))
+        for result in results:
+            self.assertTrue(result.ok)
+            self.assertGreater(result.n_actions, 0)
+            self.assertGreater(result.n_games, 0)
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+import unittest
+from src.minesweeper.server import GameServer, parse_address
+from src.minesweeper.utils import CellState
+
+
+class _Client:
+    """Stand-in client that writes requests and reads the response lines"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, *requests):
+        self.writer.write(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+        await self.writer.drain()
+        return [json.loads(await self.reader.readline()) for _ in requests]
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    """Tests for the game server"""
+
+    async def asyncSetUp(self):
+        self.server = GameServer(idle_timeout=60)
+        listener = await self.server.start("127.0.0.1", 0)
+        self.port = listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+
+    async def _connect(self) -> _Client:
+        return _Client(*await asyncio.open_connection("127.0.0.1", self.port))
+
+    async def test_game(self):
+        client = await self._connect()
+        (created,) = await client.send({"id": 1, "op": "create", "width": 9, "height": 9, "n_mines": 10, "seed": 3})
+        self.assertTrue(created["ok"])
+        self.assertEqual(created["id"], 1)
+        game = created["game"]
+
+        acted, observed = await client.send(
+            {"op": "act", "game": game, "actions": [[4, 4, "OPEN"], [0, 0, 2]]}, {"op": "observe", "game": game}
+        )
+        self.assertTrue(acted["ok"])
+        self.assertEqual(len(acted["n_opened"]), 2)
+        self.assertGreater(acted["n_opened"][0], 0)
+        self.assertEqual(acted["gamestate"], "PLAYING")
+        board = observed["board"]
+        self.assertEqual((len(board), len(board[0])), (9, 9))
+        hidden = (CellState.UNOPENED.num(), CellState.FLAG.num())
+        self.assertEqual(sum(cell not in hidden for row in board for cell in row), acted["n_opened"][0])
+
+        (closed,) = await client.send({"op": "close", "game": game})
+        self.assertTrue(closed["ok"])
+        (missing,) = await client.send({"op": "observe", "game": game})
+        self.assertFalse(missing["ok"])
+        await client.close()
+
+    async def test_errors(self):
+        client = await self._connect()
+        client.writer.write(b"not json\n[1]\n")
+        responses = [json.loads(await client.reader.readline()) for _ in range(2)]
+        self.assertEqual([response["ok"] for response in responses], [False, False])
+
+        created, *errors = await client.send(
+            {"op": "create", "width": 5, "height": 5, "n_mines": 3},
+            {"op": "fly"},
+            {"op": "create", "width": 5},
+            {"op": "create", "width": 10**4, "height": 10**4, "n_mines": 3},
+        )
+        self.assertTrue(created["ok"])
+        self.assertEqual([error["ok"] for error in errors], [False, False, False])
+
+        game = created["game"]
+        bad_actions = [[9, 9, "OPEN"]], [[0, 0, "JUMP"]], [[0, 0]]
+        responses = await client.send(*({"op": "act", "game": game, "actions": actions} for actions in bad_actions))
+        self.assertEqual([response["ok"] for response in responses], [False, False, False])
+        await client.close()
+
+    async def test_out_of_range(self):
+        """Numbers that don't fit and actions that can't be played are errors that keep the connection open"""
+        client = await self._connect()
+        (created,) = await client.send({"op": "create", "width": 5, "height": 5, "n_mines": 3})
+        game = created["game"]
+        lines = [
+            b'{"op":"create","width":1e999,"height":5,"n_mines":1}',
+            json.dumps({"op": "act", "game": game, "x": 99999999999, "y": 0, "action": "OPEN"}).encode(),
+            json.dumps({"op": "act", "game": game, "actions": [[0, 0, "SAVE"]]}).encode(),
+            json.dumps({"op": "act", "game": game, "actions": [[0, 0, "EXIT"]]}).encode(),
+            json.dumps({"op": "act", "game": game, "x": 0, "y": 0, "action": 1}).encode(),
+            b"[" * 100_000 + b"]" * 100_000,
+            b'{"op":"create","width":' + b'{"a":' * 100_000 + b"1" + b"}" * 100_000 + b"}",
+            json.dumps({"id": 7, "op": "observe", "game": game}).encode(),
+        ]
+        client.writer.write(b"\n".join(lines) + b"\n")
+        responses = [json.loads(await client.reader.readline()) for _ in lines]
+        self.assertEqual([response["ok"] for response in responses], [False] * 7 + [True])
+        self.assertEqual(responses[-1]["id"], 7)
+        self.assertEqual(responses[-1]["gamestate"], "NOT_STARTED")
+        await client.close()
+
+    async def test_many_clients(self):
+        async def play(i: int):
+            client = await self._connect()
+            (created,) = await client.send({"op": "create", "width": 16, "height": 16, "n_mines": 40, "seed": i})
+            requests = [
+                {"id": j, "op": "act", "game": created["game"], "x": j % 16, "y": j // 16, "action": 2}
+                for j in range(50)
+            ]
+            responses = await client.send(*requests)
+            await client.close()
+            return [response["id"] for response in responses]
+
+        results = await asyncio.gather(*(play(i) for i in range(50)))
+        self.assertTrue(all(ids == list(range(50)) for ids in results))
+        self.assertEqual(self.server.n_games, 50)
+
+    async def test_backpressure(self):
+        client = await self._connect()
+        (created,) = await client.send({"op": "create", "width": 100, "height": 100, "n_mines": 10})
+        request = json.dumps({"op": "observe", "game": created["game"]}).encode() + b"\n"
+
+        # The client writes without reading, so the server stops reading once the responses pile up
+        for _ in range(200):
+            client.writer.write(request)
+        await asyncio.sleep(0.2)
+        for _ in range(200):
+            response = json.loads(await client.reader.readline())
+            self.assertTrue(response["ok"])
+        await client.close()
+
+    async def test_idle_eviction(self):
+        client = await self._connect()
+        (created,) = await client.send({"op": "create", "width": 5, "height": 5, "n_mines": 3})
+        self.assertEqual(self.server.evict_idle(), 0)
+        self.assertEqual(self.server.evict_idle(now=time.monotonic() + 61), 1)
+        (response,) = await client.send({"op": "observe", "game": created["game"]})
+        self.assertFalse(response["ok"])
+        await client.close()
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are not available")
+    async def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "games.sock")
+            server = GameServer()
+            await server.start(**parse_address(f"unix:{path}"))
+            client = _Client(*await asyncio.open_unix_connection(path))
+            (created,) = await client.send({"op": "create", "width": 5, "height": 5, "n_mines": 3})
+            self.assertTrue(created["ok"])
+            await client.close()
+            await server.stop()
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("localhost:8000"), {"host": "localhost", "port": 8000})
+        self.assertEqual(parse_address(":8000"), {"host": None, "port": 8000})
+        self.assertEqual(parse_address("unix:/tmp/games.sock"), {"path": "/tmp/games.sock"})
+        with self.assertRaises(ValueError):
+            parse_address("localhost")
+
+
+if __name__ == "__main__":
+    unittest.main()
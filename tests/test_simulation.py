@@ -0,0 +1,33 @@
+import unittest
+import numpy as np
+from src.minesweeper.simulation import play_chunk, random_strategy, run_simulation, simulate, solver_strategy
+
+
+class TestSimulation(unittest.TestCase):
+    """Tests for the parallel simulation runner"""
+
+    def _results(self, **kwargs):
+        chunks = [results for _, results in simulate(40, 9, 9, 10, seed=7, **kwargs)]
+        results = np.concatenate(chunks)
+        return results[np.argsort(results["index"])][["index", "won", "n_actions", "n_revealed"]]
+
+    def test_independent_of_workers_and_chunks(self):
+        expected = self._results(workers=1, chunk_size=40)
+        self.assertTrue(np.array_equal(self._results(workers=1, chunk_size=3), expected))
+        self.assertTrue(np.array_equal(self._results(workers=2, chunk_size=5), expected))
+        self.assertTrue(np.array_equal(expected["index"], np.arange(40)))
+
+    def test_aggregation(self):
+        stats = run_simulation(30, 9, 9, 10, strategy=random_strategy, seed=1, workers=1, chunk_size=7)
+        results = play_chunk(9, 9, 10, random_strategy, stats.entropy, 0, 30)
+        self.assertEqual(stats.n_games, 30)
+        self.assertEqual(stats.n_won, results["won"].sum())
+        self.assertEqual(stats.total_actions, results["n_actions"].sum())
+        self.assertEqual(stats.lengths.sum(), 30)
+        summary = stats.as_dict()
+        self.assertAlmostEqual(summary["win_rate"], results["won"].mean())
+        self.assertEqual(summary["median_actions"], np.sort(results["n_actions"])[14])
+
+    def test_solver_strategy_wins(self):
+        stats = run_simulation(50, 9, 9, 10, strategy=solver_strategy, seed=0, workers=1)
+        self.assertGreater(stats.win_rate, 0.75)
@@ -0,0 +1,96 @@
+import unittest
+from unittest import mock
+import numpy as np
+from src.minesweeper.minesweeper_ import MinesweeperHeadless
+from src.minesweeper.probability import ProbabilityEngine
+from src.minesweeper.solver import Solver, play_games
+from src.minesweeper.utils import Action, CellState, GameState, Interaction
+
+_MINE = CellState.MINE.num()
+
+
+class TestSolver(unittest.TestCase):
+    """Tests for the constraint propagation solver"""
+
+    def test_pairwise_deduction(self):
+        # Mines at the top of the pattern 1 1 2 1 1, which needs the subset rule to be solved
+        mines = np.zeros((2, 5), dtype=np.bool)
+        mines[0, 1] = mines[0, 3] = True
+        game = MinesweeperHeadless(5, 2, 2)
+        game.set_next_minefield(mines)
+        solver = Solver(game)
+        for x in range(5):
+            game.make_interaction(Interaction(x, 1, Action.OPEN))
+            solver.update()
+
+        self.assertEqual(sorted(solver.safe_cells()), [(0, 0), (2, 0), (4, 0)])
+        self.assertEqual(sorted(solver.known_mines()), [(1, 0), (3, 0)])
+        self.assertEqual(solver.play(), GameState.WON)
+
+    def test_deductions_are_sound(self):
+        game = MinesweeperHeadless(30, 16, 99, rnd_seed=3)
+        solver = Solver(game)
+        for _ in range(20):
+            while game.gamestate in (GameState.NOT_STARTED, GameState.PLAYING):
+                solver.step()
+                if game.gamestate == GameState.PLAYING:
+                    mines = game.get_grid() == _MINE
+                    for x, y in solver.safe_cells():
+                        self.assertFalse(mines[y, x])
+                        self.assertTrue(game.unopened[y, x])
+                    for x, y in solver.known_mines():
+                        self.assertTrue(mines[y, x])
+            game.make_interaction(Interaction(0, 0, Action.NEW_GAME))
+            solver.update()
+
+    def test_resync_after_external_actions(self):
+        game = MinesweeperHeadless(16, 16, 40, rnd_seed=0)
+        solver = Solver(game)
+        game.make_interaction(Interaction(8, 8, Action.OPEN))
+        ys, xs = np.nonzero(game.unopened & (game.get_grid() != _MINE))
+        for x, y in zip(xs[:5].tolist(), ys[:5].tolist()):
+            game.make_interaction(Interaction(x, y, Action.OPEN))
+        solver.update()
+        self.assertEqual(game.gamestate, GameState.PLAYING)
+
+        fresh = Solver(game)
+        self.assertEqual(sorted(solver.safe_cells()), sorted(fresh.safe_cells()))
+        self.assertEqual(sorted(solver.known_mines()), sorted(fresh.known_mines()))
+
+    def test_flagged_safe_cell(self):
+        for engine in (None, ProbabilityEngine()):
+            mines = np.zeros((2, 5), dtype=np.bool)
+            mines[0, 1] = mines[0, 3] = True
+            game = MinesweeperHeadless(5, 2, 2)
+            game.set_next_minefield(mines)
+            solver = Solver(game, engine)
+            for x in range(5):
+                game.make_interaction(Interaction(x, 1, Action.OPEN))
+            solver.update()
+            game.make_interaction(Interaction(2, 0, Action.FLAG))
+
+            # The flagged safe cell can't be opened, so the solver stops instead of retrying it
+            self.assertEqual(solver.play(), GameState.PLAYING)
+            self.assertFalse(game.unopened[0, 0] or game.unopened[0, 4])
+            self.assertTrue(game.flagged[0, 2])
+            self.assertEqual(solver.step(), 0)
+
+    def test_hidden_minefield_unused(self):
+        for engine in (None, ProbabilityEngine()):
+            game = MinesweeperHeadless(16, 16, 40, rnd_seed=5)
+            solver = Solver(game, engine)
+            with mock.patch.object(game, "get_grid", side_effect=AssertionError("The solver read the minefield")):
+                for _ in range(5):
+                    solver.play()
+                    game.make_interaction(Interaction(-1, -1, Action.NEW_GAME))
+                    solver.update()
+
+    def test_play_games(self):
+        won, lost = play_games(100, 9, 9, 10, rnd_seed=0)
+        self.assertEqual(won + lost, 100)
+        self.assertGreater(won, 75)
+
+    def test_play_games_with_probabilities(self):
+        won, lost = play_games(50, 9, 9, 10, rnd_seed=0, engine=ProbabilityEngine())
+        self.assertEqual(won + lost, 50)
+        self.assertGreater(won, 40)
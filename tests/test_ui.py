@@ -0,0 +1,123 @@
+import os
+import unittest
+from unittest import mock
+import numpy as np
+from src.minesweeper.utils import CELL_DTYPE, CellState, GameState
+
+# The ui is drawn without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+try:
+    import pygame
+    from src.minesweeper.minesweeper_ui import MinesweeperUI
+except ModuleNotFoundError:
+    raise unittest.SkipTest("pygame is not installed")
+
+_UNOPENED = CellState.UNOPENED.num()
+_FLAG = CellState.FLAG.num()
+
+
+class TestMinesweeperUI(unittest.TestCase):
+    """Tests the drawing of frames with SDL's dummy video driver"""
+
+    def setUp(self):
+        self.ui = MinesweeperUI(9, 7)
+        self.grid = np.full((7, 9), _UNOPENED, dtype=CELL_DTYPE)
+        self.block = self.ui._block_size
+
+    def tearDown(self):
+        pygame.quit()
+
+    def _hud(self) -> np.ndarray:
+        return pygame.surfarray.array3d(self.ui._screen)[:, : 2 * self.block].copy()
+
+    def _cell(self, x: int, y: int) -> np.ndarray:
+        pixels = pygame.surfarray.array3d(self.ui._screen)
+        return pixels[(1 + x) * self.block : (2 + x) * self.block, (2 + y) * self.block : (3 + y) * self.block]
+
+    def _tile(self, code: int) -> np.ndarray:
+        tile = self.ui._tiles[code].convert(self.ui._screen)
+        self.ui._screen.blit(tile, (0, 0))
+        pixels = pygame.surfarray.array3d(self.ui._screen)[: self.block, : self.block].copy()
+        self.ui.invalidate()
+        return pixels
+
+    def test_redraws_changed_cells(self):
+        ui = self.ui
+        ui.draw_frame(self.grid, GameState.NOT_STARTED, 10)
+
+        changed = [(2, 1), (3, 1), (8, 6)]
+        grid = self.grid.copy()
+        for x, y in changed:
+            grid[y, x] = 1
+        with (
+            mock.patch.object(ui, "_draw_cells", wraps=ui._draw_cells) as draw_cells,
+            mock.patch.object(ui, "_draw_hud", wraps=ui._draw_hud) as draw_hud,
+            mock.patch("pygame.display.update") as update,
+            mock.patch("pygame.display.flip") as flip,
+        ):
+            ui.draw_frame(grid, GameState.PLAYING, 10)
+            ((_, cells),) = [call.args for call in draw_cells.call_args_list]
+            self.assertEqual(sorted(map(tuple, cells[:, ::-1].tolist())), sorted(changed))
+            draw_hud.assert_called_once()
+            flip.assert_not_called()
+            ((rects,),) = [call.args for call in update.call_args_list]
+            self.assertEqual(len(rects), len(changed) + 1)
+
+            # The same frame again draws nothing
+            update.reset_mock()
+            draw_hud.reset_mock()
+            ui.draw_frame(grid, GameState.PLAYING, 10)
+            update.assert_not_called()
+            draw_hud.assert_not_called()
+
+            # Only a flag changes, which also changes the amount of mines left
+            grid[0, 0] = _FLAG
+            ui.draw_frame(grid, GameState.PLAYING, 9)
+            self.assertEqual(draw_cells.call_args.args[1].tolist(), [[0, 0]])
+            draw_hud.assert_called_once()
+
+        one = self._tile(1)
+        for x, y in changed:
+            self.assertTrue((self._cell(x, y) == one).all())
+
+    def test_new_game_redraws_hud(self):
+        ui = self.ui
+        ui.draw_frame(self.grid, GameState.NOT_STARTED, 10)
+        new_game_hud = self._hud()
+
+        grid = self.grid.copy()
+        grid[:3] = 0
+        ui.draw_frame(grid, GameState.PLAYING, 10)
+        grid[5, 5] = _FLAG
+        ui.draw_frame(grid, GameState.LOST, 9)
+        game_over = (id(ui._font_big), "GAME OVER", (160, 20, 20))
+        mines_left = (id(ui._font_big), "9", (19, 120, 161))
+        self.assertIn(game_over, ui._text_cache)
+        self.assertIn(mines_left, ui._text_cache)
+        self.assertFalse((self._hud() == new_game_hud).all())
+        static = {key: surface for key, surface in ui._text_cache.items() if key[1] not in ("9", "10")}
+
+        with mock.patch("pygame.display.update") as update:
+            ui.draw_frame(self.grid, GameState.NOT_STARTED, 10)
+        ((rects,),) = [call.args for call in update.call_args_list]
+        self.assertEqual(len(rects), 3 * 9 + 1 + 1)
+        # Only the amounts of mines left of the old game were rendered again
+        self.assertNotIn(mines_left, ui._text_cache)
+        self.assertIn(game_over, static)
+        self.assertTrue(all(ui._text_cache[key] is surface for key, surface in static.items()))
+        self.assertTrue((self._hud() == new_game_hud).all())
+
+    def test_invalidate(self):
+        ui = self.ui
+        self.assertTrue(ui.invalidated)
+        ui.draw_frame(self.grid, GameState.NOT_STARTED, 10)
+        self.assertFalse(ui.invalidated)
+        ui.invalidate()
+        self.assertTrue(ui.invalidated)
+        with mock.patch("pygame.display.flip") as flip:
+            ui.draw_frame(self.grid, GameState.NOT_STARTED, 10)
+        flip.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()